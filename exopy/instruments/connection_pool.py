@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Pool keeping the connections to the instruments open between measurements.
+
+"""
+import logging
+from time import monotonic
+
+from atom.api import Atom, Float, Dict
+
+
+logger = logging.getLogger(__name__)
+
+
+def connection_key(selected_instrument, connection, settings):
+    """Build the key under which a connection is pooled.
+
+    Parameters
+    ----------
+    selected_instrument : tuple
+        (profile, driver, connection, settings) tuple of ids.
+
+    connection : dict
+        Connection infos used to open the connection.
+
+    settings : dict
+        Settings used to open the connection.
+
+    """
+    content = repr((sorted(connection.items()), sorted(settings.items())))
+    return tuple(selected_instrument) + (content,)
+
+
+class ConnectionPool(Atom):
+    """Pool of started drivers which can be reused by later measurements.
+
+    Drivers are stored by (profile, driver, connection, settings, content)
+    tuple, that is by the value of the selected_instrument member of the
+    instrument tasks followed by a representation of the content of the
+    connection and settings infos (see connection_key). A pooled driver is
+    reset by its starter before being reused. A driver whose infos have since
+    been edited is closed instead.
+
+    """
+    #: Time (in s) after which an unused connection is closed.
+    timeout = Float(600.)
+
+    def take(self, key):
+        """Take a driver out of the pool.
+
+        Parameters
+        ----------
+        key : tuple
+            (profile, driver, connection, settings, content) tuple identifying
+            the connection.
+
+        Returns
+        -------
+        driver_starter : tuple or None
+            (driver, starter) tuple or None if no valid connection is
+            available.
+
+        """
+        # Close the connections opened with outdated infos.
+        for k in [k for k in self._drivers
+                  if k[:-1] == key[:-1] and k != key]:
+            driver, starter, _ = self._drivers.pop(k)
+            self._stop(k, driver, starter)
+
+        if key not in self._drivers:
+            return None
+
+        driver, starter, _ = self._drivers.pop(key)
+        try:
+            starter.reset(driver)
+        except Exception:
+            logger.info('Failed to reset pooled connection to %s, reopening',
+                        key[0], exc_info=True)
+            self._stop(key, driver, starter)
+            return None
+
+        return driver, starter
+
+    def put(self, key, driver, starter):
+        """Store a driver in the pool.
+
+        If a driver is already stored for the same key, the new one is closed.
+
+        """
+        if key in self._drivers:
+            self._stop(key, driver, starter)
+        else:
+            self._drivers[key] = (driver, starter, monotonic())
+
+    def close_idle(self):
+        """Close the connections which have not been used for too long.
+
+        """
+        limit = monotonic() - self.timeout
+        self.close([k[0] for k, (_, _, t) in self._drivers.items()
+                    if t < limit])
+
+    def close(self, profiles=None):
+        """Close the pooled connections.
+
+        Parameters
+        ----------
+        profiles : iterable, optional
+            Ids of the profiles whose connections should be closed. If None
+            all connections are closed.
+
+        """
+        for key in list(self._drivers):
+            if profiles is None or key[0] in profiles:
+                driver, starter, _ = self._drivers.pop(key)
+                self._stop(key, driver, starter)
+
+    @property
+    def profiles(self):
+        """Ids of the profiles for which a connection is pooled.
+
+        """
+        return sorted({k[0] for k in self._drivers})
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Pooled drivers along with their starter and the time at which they were
+    #: returned to the pool.
+    _drivers = Dict()
+
+    def _stop(self, key, driver, starter):
+        """Close a connection, logging any failure.
+
+        """
+        try:
+            starter.stop(driver)
+        except Exception:
+            logger.exception('Failed to close connection to instr : %s',
+                             key[0])
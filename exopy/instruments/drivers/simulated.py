@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Driver simulating an instrument with a configurable latency.
+
+This driver is meant to benchmark measurements without any hardware. The
+simulated instrument stores values by name: 'NAME VALUE' messages set a value
+and 'NAME?' messages query it.
+
+The latencies are described by strings which can be:
+
+- a number : constant latency (in s)
+- uniform(a, b) : uniformly distributed between a and b
+- normal(mu, sigma) : normally distributed (negative values are clipped)
+- lognormal(mu, sigma) : log-normally distributed
+- exponential(mean) : exponentially distributed
+
+"""
+import random
+import re
+from threading import Lock
+
+from ..starters.exceptions import InstrIOError
+from ...utils.timing import precise_sleep
+
+
+#: Pattern matching a latency distribution description.
+_DISTRIBUTION = re.compile(r'^\s*(\w+)\s*\((.*)\)\s*$')
+
+#: Number of parameters expected by each supported distribution.
+_DISTRIBUTIONS = {'uniform': 2, 'normal': 2, 'lognormal': 2,
+                  'exponential': 1}
+
+
+def parse_latency(spec, rng):
+    """Build a function returning random latencies from a description.
+
+    Parameters
+    ----------
+    spec : str or float
+        Description of the distribution (see module docstring).
+
+    rng : random.Random
+        Random generator to use.
+
+    Returns
+    -------
+    latency : callable
+        Function taking no argument and returning a latency in s.
+
+    Raises
+    ------
+    ValueError :
+        If the description is not valid.
+
+    """
+    if not isinstance(spec, str):
+        spec = str(spec)
+    if not spec.strip():
+        return lambda: 0.0
+
+    match = _DISTRIBUTION.match(spec)
+    if not match:
+        value = float(spec)
+        if value < 0:
+            raise ValueError('Latency cannot be negative : %s' % spec)
+        return lambda: value
+
+    name, params = match.groups()
+    if name not in _DISTRIBUTIONS:
+        raise ValueError('Unknown distribution %s, known ones are %s' %
+                         (name, sorted(_DISTRIBUTIONS)))
+    params = [float(p) for p in params.split(',')]
+    if len(params) != _DISTRIBUTIONS[name]:
+        raise ValueError('%s expects %d parameters, got %s' %
+                         (name, _DISTRIBUTIONS[name], spec))
+
+    if name == 'uniform':
+        if min(params) < 0:
+            raise ValueError('The bounds of a uniform distribution cannot be '
+                             'negative : %s' % spec)
+        return lambda: rng.uniform(*params)
+    elif name == 'normal':
+        return lambda: max(0.0, rng.normalvariate(*params))
+    elif name == 'lognormal':
+        return lambda: rng.lognormvariate(*params)
+    else:
+        mean = params[0]
+        if mean <= 0:
+            raise ValueError('The mean of an exponential distribution must be '
+                             'positive : %s' % spec)
+        return lambda: rng.expovariate(1/mean)
+
+
+class SimulatedDriver(object):
+    """Driver of a simulated instrument.
+
+    Parameters
+    ----------
+    connection : dict
+        Connection infos. The following keys are used (all optional):
+
+        - query_latency : latency of a query
+        - set_latency : latency of a write
+        - failure_rate : probability for a communication to fail
+        - bandwidth : number of bytes per second which can be exchanged
+          (0 means unlimited)
+        - seed : seed of the random generator
+
+    settings : dict
+        Driver settings (unused).
+
+    """
+    def __init__(self, connection, settings=None):
+        seed = connection.get('seed', '')
+        self._rng = random.Random(int(seed) if str(seed).strip() else None)
+        self._query_latency = parse_latency(connection.get('query_latency',
+                                                           0), self._rng)
+        self._set_latency = parse_latency(connection.get('set_latency', 0),
+                                          self._rng)
+        self.failure_rate = float(connection.get('failure_rate') or 0)
+        self.bandwidth = float(connection.get('bandwidth') or 0)
+        if not 0 <= self.failure_rate <= 1:
+            raise ValueError('The failure rate must be between 0 and 1.')
+        if self.bandwidth < 0:
+            raise ValueError('The bandwidth cannot be negative.')
+
+        #: Values stored in the instrument.
+        self.values = {}
+
+        #: Number of queries and writes performed.
+        self.counts = {'query': 0, 'write': 0}
+
+        #: Whether the connection is open.
+        self.connected = True
+
+        self._lock = Lock()
+
+    def query(self, msg):
+        """Query a value ('NAME?'), unknown values are '0'.
+
+        """
+        name = msg.strip().rstrip('?')
+        with self._lock:
+            self._communicate(self._query_latency(), msg, 'query')
+            answer = self.values.get(name, '0')
+            self._transfer(answer)
+        return answer
+
+    def write(self, msg):
+        """Set a value ('NAME VALUE').
+
+        """
+        name, _, value = msg.strip().partition(' ')
+        with self._lock:
+            self._communicate(self._set_latency(), msg, 'write')
+            self.values[name] = value
+
+    def clear_cache(self):
+        """Present for compatibility with caching drivers.
+
+        """
+        pass
+
+    def reset(self):
+        """Forget the stored values.
+
+        """
+        with self._lock:
+            self.values = {}
+
+    def close(self):
+        """Close the simulated connection.
+
+        """
+        self.connected = False
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    def _communicate(self, latency, msg, kind):
+        """Simulate the emission of a message.
+
+        """
+        if not self.connected:
+            raise InstrIOError('The connection is closed.')
+        self.counts[kind] += 1
+        precise_sleep(latency)
+        if self.failure_rate and self._rng.random() < self.failure_rate:
+            raise InstrIOError('Simulated failure while sending %s' % msg)
+        self._transfer(msg)
+
+    def _transfer(self, data):
+        """Simulate the limited bandwidth of the connection.
+
+        """
+        if self.bandwidth:
+            precise_sleep(len(data)/self.bandwidth)
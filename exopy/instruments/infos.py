@@ -15,7 +15,7 @@ from operator import attrgetter
 
 from configobj import ConfigObj
 from atom.api import (Atom, Str, Dict, Callable, List, Property, Typed,
-                      Bool, Enum, Value)
+                      Bool, Enum, Value, Tuple)
 
 from ..utils.mapping_utils import recursive_update
 
@@ -428,6 +428,10 @@ class ProfileInfos(Atom):
     #: Dict of the settings
     settings = Dict()
 
+    #: State (modification time and size) of the file when it was loaded.
+    #: Used to avoid reloading unchanged profiles.
+    file_state = Tuple()
+
     def write_to_file(self):
         """Save the profile to a file.
 
@@ -437,6 +441,17 @@ class ProfileInfos(Atom):
                                  connections=self.connections,
                                  settings=self.settings))
         self._config.write()
+        self._dict = None
+
+    def to_dict(self):
+        """Get the content of the profile as a dictionary.
+
+        The dictionary is built once and cached so it should not be modified.
+
+        """
+        if self._dict is None:
+            self._dict = self._config.dict()
+        return self._dict
 
     def clone(self):
         """Clone this object.
@@ -467,6 +482,9 @@ class ProfileInfos(Atom):
     #: ConfigObj object associated to the profile.
     _config = Value()
 
+    #: Cached dictionary representation of the profile.
+    _dict = Value()
+
     def _default_id(self):
         """Get the id from the profile.
 
@@ -511,6 +529,7 @@ class ProfileInfos(Atom):
 
         """
         del self.id, self.model, self.connections, self.settings
+        self._dict = None
 
 
 def validate_profile_infos(infos):
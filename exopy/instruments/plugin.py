@@ -104,6 +104,9 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
     #: List of instruments for which at least one driver is declared.
     instruments = List()
 
+    #: List of the ids of the declared drivers.
+    drivers = List()
+
     #: List of registered intrument users.
     #: Only registered users can be granted the use of an instrument.
     users = List()
@@ -186,7 +189,8 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
                                              ext_class=[Driver, Drivers])
         self._drivers.start()
 
-        for contrib in ('users', 'starters', 'connections', 'settings'):
+        for contrib in ('drivers', 'users', 'starters', 'connections',
+                        'settings'):
             self._update_contribs(contrib, None)
 
         err = False
@@ -375,7 +379,7 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
 
         queried = {}
         for p in available:
-            queried[p] = self._profiles[p]._config.dict()
+            queried[p] = self._profiles[p].to_dict()
 
         return queried, unavailable
 
@@ -464,8 +468,11 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
     def _refresh_profiles(self):
         """List of profiles living in the profiles folders.
 
+        Only the files which changed since the last refresh are reloaded.
+
         """
         profiles = {}
+        known = {i.path: i for i in self._profiles.values()}
         logger = logging.getLogger(__name__)
         for path in self._profiles_folders:
             if os.path.isdir(path):
@@ -477,8 +484,15 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
                     profile_path = os.path.join(path, filename)
                     # Beware redundant names are overwritten
                     name = filename[:-len('.instr.ini')]
+                    stat = os.stat(profile_path)
+                    state = (stat.st_mtime_ns, stat.st_size)
+                    i = known.get(profile_path)
+                    if i is not None and i.file_state == state:
+                        profiles[name] = i
+                        continue
                     # TODO should be delayed and lead to a nicer report
-                    i = ProfileInfos(path=profile_path, plugin=self)
+                    i = ProfileInfos(path=profile_path, plugin=self,
+                                     file_state=state)
                     res, msg = validate_profile_infos(i)
                     if res:
                         profiles[name] = i
@@ -493,7 +507,8 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
         """Start the observers.
 
         """
-        for contrib in ('users', 'starters', 'connections', 'settings'):
+        for contrib in ('drivers', 'users', 'starters', 'connections',
+                        'settings'):
             callback = partial(self._update_contribs, contrib)
             getattr(self, '_'+contrib).observe('contributions', callback)
 
@@ -514,7 +529,8 @@ class InstrumentManagerPlugin(HasPreferencesPlugin):
         """Stop the observers.
 
         """
-        for contrib in ('users', 'starters', 'connections', 'settings'):
+        for contrib in ('drivers', 'users', 'starters', 'connections',
+                        'settings'):
             callback = partial(self._update_contribs, contrib)
             getattr(self, '_'+contrib).observe('contributions', callback)
 
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Starter for the simulated instruments.
+
+"""
+from .base_starter import BaseStarter
+from .exceptions import InstrIOError
+
+
+class SimulatedStarter(BaseStarter):
+    """Starter for the simulated instruments.
+
+    The driver class is expected to accept the connection and settings infos
+    as arguments (see exopy.instruments.drivers.simulated).
+
+    """
+    def start(self, driver_cls, connection, settings):
+        """Create the driver.
+
+        """
+        try:
+            return driver_cls(connection, settings)
+        except ValueError as e:
+            raise InstrIOError(str(e))
+
+    def check_infos(self, driver_cls, connection, settings):
+        """Check that the latencies and rates can be understood.
+
+        """
+        try:
+            driver_cls(connection, settings).close()
+        except Exception as e:
+            return False, 'Invalid simulation parameters : %s' % e
+        return True, ''
+
+    def reset(self, driver):
+        """Clear the cache of the driver.
+
+        """
+        driver.clear_cache()
+
+    def stop(self, driver):
+        """Close the simulated connection.
+
+        """
+        driver.close()
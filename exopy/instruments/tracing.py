@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Tracing of the communications with the instruments.
+
+"""
+import csv
+import threading
+from time import perf_counter
+
+from atom.api import Atom, List, Value
+
+
+#: Types whose length is counted as the number of exchanged bytes.
+_SIZED_TYPES = (bytes, bytearray, str)
+
+
+class IOTracer(Atom):
+    """Record the calls made to the instrument drivers.
+
+    Each record is a (start, profile, call, duration, bytes) tuple where start
+    and duration are expressed in s and bytes is the size of the bytes and
+    strings sent and received (-1 if no such argument or result).
+
+    Records are appended to per-thread buffers so that recording does not
+    require any locking.
+
+    """
+    def record(self, profile, call, start, duration, nbytes=-1):
+        """Record a call to a driver.
+
+        """
+        try:
+            buffer = self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = []
+            with self._lock:
+                self._buffers.append(buffer)
+        buffer.append((start, profile, call, duration, nbytes))
+
+    def wrap(self, driver, profile):
+        """Wrap a driver so that the calls to its methods are recorded.
+
+        Parameters
+        ----------
+        driver : object
+            Driver instance to trace.
+
+        profile : str
+            Id of the profile of the instrument.
+
+        """
+        return TracedDriver(driver, profile, self)
+
+    def records(self):
+        """Get all the records sorted by start time.
+
+        """
+        with self._lock:
+            buffers = list(self._buffers)
+        return sorted(r for b in buffers for r in list(b))
+
+    def summary(self):
+        """Summarize the records by instrument.
+
+        Returns
+        -------
+        summary : dict
+            Mapping between profile ids and dict containing the number of
+            calls (count), the total time spent (total) and the median (p50)
+            and 99th percentile (p99) of the duration of the calls.
+
+        """
+        durations = {}
+        for _, profile, _, duration, _ in self.records():
+            durations.setdefault(profile, []).append(duration)
+
+        summary = {}
+        for profile, values in durations.items():
+            values.sort()
+            n = len(values)
+            summary[profile] = {'count': n, 'total': sum(values),
+                                'p50': values[int(0.5*(n - 1))],
+                                'p99': values[int(0.99*(n - 1))]}
+        return summary
+
+    def flush(self, path):
+        """Write the records to a csv file and clear them.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file to write.
+
+        """
+        records = self.records()
+        start = records[0][0] if records else 0.0
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('start', 'profile', 'call', 'duration', 'bytes'))
+            for r in records:
+                writer.writerow(('%.9f' % (r[0] - start), r[1], r[2],
+                                 '%.9f' % r[3], r[4]))
+        self.clear()
+
+    def clear(self):
+        """Discard all the records.
+
+        """
+        with self._lock:
+            for buffer in self._buffers:
+                del buffer[:]
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Per-thread storage giving access to the buffer of the current thread.
+    _local = Value(factory=threading.local)
+
+    #: Buffers of all the threads which recorded calls.
+    _buffers = List()
+
+    #: Lock protecting the list of buffers.
+    _lock = Value(factory=threading.Lock)
+
+
+def format_summary(summary):
+    """Format the summary of a tracer into a readable message.
+
+    """
+    lines = ['Instruments communications :']
+    line = ('- %s : %d calls, total %.3g s, p50 %.3g ms, p99 %.3g ms')
+    for profile, s in sorted(summary.items()):
+        lines.append(line % (profile, s['count'], s['total'],
+                             1e3*s['p50'], 1e3*s['p99']))
+    return '\n'.join(lines)
+
+
+def _count_bytes(args, result):
+    """Count the number of bytes sent and received.
+
+    """
+    nbytes = -1
+    for obj in args + (result,):
+        if isinstance(obj, _SIZED_TYPES):
+            nbytes = len(obj) + (nbytes if nbytes > 0 else 0)
+    return nbytes
+
+
+def _package(obj):
+    """Top level package in which the class of an object is defined.
+
+    """
+    return type(obj).__module__.split('.', 1)[0]
+
+
+class TracedDriver(object):
+    """Proxy around a driver recording the calls to its methods and the access
+    to its attributes (which can trigger communications).
+
+    The proxy passes the isinstance checks against the class of the driver and
+    compares equal to the driver. The sub-objects of the driver (such as
+    channels) obtained as attributes or returned by its methods are traced
+    too, under a dotted name, provided their class is defined in the same
+    package as the driver. Other values (numbers, arrays, quantities, ...) are
+    returned as is.
+
+    The proxy is not the driver, so identity checks (is) fail, and the special
+    methods (operators, len, iteration, ...) are not forwarded.
+
+    """
+    __slots__ = ('_driver', '_profile', '_tracer', '_prefix', '_package')
+
+    def __init__(self, driver, profile, tracer, prefix='', package=None):
+        object.__setattr__(self, '_driver', driver)
+        object.__setattr__(self, '_profile', profile)
+        object.__setattr__(self, '_tracer', tracer)
+        object.__setattr__(self, '_prefix', prefix)
+        object.__setattr__(self, '_package', package or _package(driver))
+
+    @property
+    def __class__(self):
+        # Used by isinstance when the type of the proxy does not match.
+        return type(self._driver)
+
+    def __eq__(self, other):
+        if type(other) is TracedDriver:
+            other = other._driver
+        return self._driver == other
+
+    def __hash__(self):
+        return hash(self._driver)
+
+    def __getattr__(self, name):
+        tic = perf_counter()
+        attr = getattr(self._driver, name)
+        call = self._prefix + name
+        if not callable(attr):
+            self._tracer.record(self._profile, call, tic, perf_counter() - tic,
+                                _count_bytes((), attr))
+            return self._wrap(call, attr)
+
+        profile = self._profile
+        record = self._tracer.record
+
+        def traced(*args, **kwargs):
+            tic = perf_counter()
+            res = attr(*args, **kwargs)
+            record(profile, call, tic, perf_counter() - tic,
+                   _count_bytes(args, res))
+            return self._wrap(call, res)
+
+        return traced
+
+    def __setattr__(self, name, value):
+        tic = perf_counter()
+        setattr(self._driver, name, value)
+        self._tracer.record(self._profile, self._prefix + name + '=', tic,
+                            perf_counter() - tic, _count_bytes((value,), None))
+
+    def _wrap(self, call, value):
+        """Trace the sub-objects of the driver.
+
+        """
+        if (value is None or callable(value) or
+                _package(value) != self._package):
+            return value
+        return TracedDriver(value, self._profile, self._tracer, call + '.',
+                            self._package)
@@ -10,7 +10,7 @@
 
 """
 from atom.api import (Atom, Str, ForwardTyped, Signal, Enum, Bool, Dict,
-                      Value, List)
+                      Value, List, Float)
 from enaml.core.api import Declarative, d_, d_func
 
 
@@ -40,6 +40,12 @@ class ExecutionInfos(Atom):
     #: Boolean indicating whether the engine should run the checks of the task.
     checks = Bool(True)
 
+    #: Time (in s) during which the engine can keep the connections to the
+    #: instruments open after the execution, so that the next execution can
+    #: reuse them. Zero means the connections are closed at the end of the
+    #: execution. Engines are free to ignore this.
+    connections_timeout = Float()
+
     #: Boolean set by the engine, indicating whether or not the task was
     #: successfully executed.
     success = Bool()
@@ -62,6 +68,10 @@ class BaseEngine(Atom):
     #: Signal used to pass news about the measurement progress.
     progress = Signal()
 
+    #: Profiles of the instruments whose connections are kept open by the
+    #: engine between two executions (see ExecutionInfos.connections_timeout).
+    pooled_profiles = List()
+
     def perform(self, exec_infos):
         """Execute a given task and catch any error.
 
@@ -133,6 +143,21 @@ class BaseEngine(Atom):
         """
         raise NotImplementedError()
 
+    def close_connections(self, profiles):
+        """Close the connections kept open between two executions.
+
+        This method is called when the profiles are requested by another
+        user. It should block till the connections are closed. Engines which
+        never keep connections open do not need to implement it.
+
+        Parameters
+        ----------
+        profiles : iterable
+            Ids of the profiles whose connections should be closed.
+
+        """
+        pass
+
 
 class Engine(Declarative):
     """A declarative class for contributing an engine.
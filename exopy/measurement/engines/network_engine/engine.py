@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Engine sending the measurements to a worker over a TCP connection.
+
+"""
+import os
+import logging
+from queue import Queue
+from threading import Thread
+from threading import Event as tEvent
+from multiprocessing import Process
+
+from atom.api import Typed, Value, Bool, Str
+
+from ....utils.traceback import format_exc
+from ..base_engine import BaseEngine
+from ..utils import terminate_process
+from .protocol import MessageConnection, parse_address
+from .worker import start_local_worker
+
+logger = logging.getLogger(__name__)
+
+
+class NetworkEngine(BaseEngine):
+    """An engine executing the tasks it is sent on a worker.
+
+    The connection to the worker is opened for the first measurement and kept
+    open afterwards so that the following measurements are simply streamed to
+    the worker.
+
+    """
+    #: Address ('host:port') of the worker to which to send the measurements.
+    #: If empty, a worker is started in a local process and reached through
+    #: the loopback interface.
+    address = Str()
+
+    #: Key used to authenticate with the worker.
+    authkey = Value()
+
+    def perform(self, exec_infos):
+        """Execute a given task.
+
+        Parameters
+        ----------
+        exec_infos : ExecutionInfos
+            TaskInfos object describing the work to expected of the engine.
+
+        Returns
+        -------
+        exec_infos : ExecutionInfos
+            Input object whose values have been updated. This is simply a
+            convenience.
+
+        """
+        self.status = 'Running'
+        self._force_stop.clear()
+        self._shutdown_requested = False
+        self._running = True
+        try:
+            return self._perform(exec_infos)
+        finally:
+            self._running = False
+
+    def pause(self):
+        """Ask the engine to pause the current task execution.
+
+        """
+        self.status = 'Pausing'
+        self._send('pause')
+
+    def resume(self):
+        """Ask the engine to resume the currently paused job.
+
+        """
+        self.status = 'Resuming'
+        self._send('resume')
+
+    def stop(self, force=False):
+        """Ask the engine to stop the current job.
+
+        This method should not wait for the job to stop save if a forced stop
+        was requested.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Close the connection to the worker and terminate the local worker
+            if any. A remote worker can only ask the measurement to stop: a
+            task ignoring the stop requests keeps running on the worker, which
+            refuses new measurements till it is over.
+
+        """
+        self.status = 'Stopping'
+        self._send('stop')
+
+        if force:
+            self._force_stop.set()
+            self._disconnect(terminate=True)
+            self.status = 'Stopped'
+
+    def shutdown(self, force=False):
+        """Ask the engine to stop completely.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Force the engine to stop the performing the task (see stop).
+
+        """
+        self.status = 'Shutting down'
+        self._shutdown_requested = True
+
+        if force:
+            self.stop(force=True)
+        elif self._running:
+            self._send('stop')
+        else:
+            self._disconnect()
+            self.status = 'Stopped'
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Boolean indicating that the engine should disconnect once the current
+    #: task is over.
+    _shutdown_requested = Bool()
+
+    #: Flag signaling that a forced stop has been requested.
+    _force_stop = Value(factory=tEvent)
+
+    #: Connection to the worker.
+    _connection = Typed(MessageConnection)
+
+    #: Queue in which the results sent by the worker are put. None signals
+    #: that the connection was closed.
+    _results = Typed(Queue)
+
+    #: Thread dispatching the messages sent by the worker.
+    _reader = Typed(Thread)
+
+    #: Process running the local worker.
+    _local_worker = Typed(Process)
+
+    #: Whether a measurement is currently being performed.
+    _running = Bool()
+
+    def _perform(self, exec_infos):
+        """Send the measurement to the worker and wait for the result.
+
+        """
+        try:
+            if not self._connection:
+                self._connect()
+            args = self._build_measurement_args(exec_infos)
+            self._connection.send('measurement', args)
+        except Exception:
+            msg = 'Failed to send the measurement to the worker :\n%s'
+            logger.error(msg, format_exc())
+            self._disconnect()
+            exec_infos.success = False
+            exec_infos.errors['engine'] = msg % format_exc()
+            self.status = 'Stopped'
+            return exec_infos
+        logger.debug('Task {} sent'.format(exec_infos.id))
+
+        # Wait for the result or for the connection to be closed.
+        result = self._results.get()
+        if result is None:
+            if self._force_stop.is_set() and self.address:
+                msg = ('Connection to the worker was closed by the user. The '
+                       'measurement was asked to stop but may still be '
+                       'running on the worker.')
+            elif self._force_stop.is_set():
+                msg = 'Execution was terminated by the user.'
+            else:
+                msg = 'Connection to the worker was lost unexpectedly.'
+            logger.debug(msg)
+            self._disconnect()
+            exec_infos.success = False
+            exec_infos.errors['engine'] = msg
+            self.status = 'Stopped'
+            return exec_infos
+
+        logger.debug('Worker done performing measurement')
+        exec_infos.success, errors = result
+        exec_infos.errors.update(errors)
+
+        if self._shutdown_requested:
+            self._disconnect()
+            self.status = 'Stopped'
+        else:
+            self.status = 'Waiting'
+
+        return exec_infos
+
+    def _connect(self):
+        """Open the connection to the worker, starting a local one if needed.
+
+        """
+        if self.address:
+            address = parse_address(self.address)
+            authkey = self.authkey
+            if isinstance(authkey, str):
+                authkey = authkey.encode('utf-8')
+        else:
+            # A fresh key prevents the other users of the computer from
+            # connecting to the local worker.
+            authkey = os.urandom(32)
+            self._local_worker, address = start_local_worker(authkey)
+            logger.debug('Local worker started on port %d', address[1])
+
+        self._connection = MessageConnection.connect(address, authkey)
+        self._results = Queue()
+        self._reader = Thread(target=self._read_messages,
+                              args=(self._connection, self._results),
+                              name='exopy.NetworkEngineReader')
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _disconnect(self, terminate=False):
+        """Close the connection to the worker and stop the local worker.
+
+        Parameters
+        ----------
+        terminate : bool, optional
+            Whether to terminate the local worker instead of waiting for it to
+            exit.
+
+        """
+        # A forced stop and the thread waiting for the result can both get
+        # here, so the references are dropped before being used.
+        connection, self._connection = self._connection, None
+        reader, self._reader = self._reader, None
+        worker, self._local_worker = self._local_worker, None
+
+        if connection:
+            connection.close()
+        if reader:
+            reader.join()
+        if worker:
+            if terminate:
+                terminate_process(worker)
+            else:
+                worker.join()
+            logger.debug('Local worker joined')
+
+    def _send(self, kind):
+        """Send a message to the worker if connected.
+
+        """
+        connection = self._connection
+        if not connection:
+            return
+        try:
+            connection.send(kind)
+        except OSError:
+            logger.debug('Failed to send %s to the worker', kind)
+
+    def _read_messages(self, connection, results):
+        """Dispatch the messages sent by the worker.
+
+        This is executed in a dedicated thread.
+
+        """
+        while True:
+            try:
+                kind, payload = connection.recv()
+            except (EOFError, OSError):
+                results.put(None)
+                break
+
+            try:
+                if kind == 'log':
+                    logging.getLogger(payload.name).handle(payload)
+                elif kind == 'news':
+                    # Here progress is a Signal not an Event hence the syntax.
+                    self.progress(payload)
+                elif kind == 'paused':
+                    self.status = 'Paused'
+                elif kind == 'resumed':
+                    self.status = 'Running'
+                elif kind == 'result':
+                    results.put(payload)
+                else:
+                    logger.error('Unknown message %s', kind)
+            except Exception:
+                logger.error('Failed to handle message %s :\n%s',
+                             kind, format_exc())
+
+    def _build_measurement_args(self, exec_infos):
+        """Build the tuple to send to the worker.
+
+        """
+        exec_infos.task.update_preferences_from_members()
+        config = exec_infos.task.preferences
+        database_root_state = exec_infos.task.database.copy_node_values()
+        return (exec_infos.id, config,
+                exec_infos.build_deps,
+                exec_infos.runtime_deps,
+                exec_infos.observed_entries,
+                database_root_state,
+                exec_infos.checks)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Messages exchanged between the network engine and the worker.
+
+The messages are (kind, payload) tuples sent as length prefixed pickles by
+multiprocessing.connection, which also authenticates both ends using a shared
+key. As unpickling can execute arbitrary code, a worker should only be
+reachable by trusted hosts and should use an authentication key.
+
+Messages sent by the engine:
+
+- 'measurement' : (id, config, build, runtime, entries, database, checks)
+- 'pause', 'resume', 'stop' : no payload
+
+Messages sent by the worker:
+
+- 'log' : log record
+- 'news' : (entry, value) update of an observed entry
+- 'paused', 'resumed' : no payload
+- 'result' : (success, errors)
+
+"""
+import socket
+from threading import Lock
+from multiprocessing.connection import Listener, Client
+
+
+def parse_address(address):
+    """Convert a 'host:port' string into a (host, port) tuple.
+
+    """
+    host, _, port = address.rpartition(':')
+    return (host or '127.0.0.1', int(port))
+
+
+class MessageConnection(object):
+    """Connection exchanging (kind, payload) messages.
+
+    Sending is thread safe, receiving should be done by a single thread.
+
+    Parameters
+    ----------
+    connection : multiprocessing.connection.Connection
+        Underlying connection.
+
+    """
+    def __init__(self, connection):
+        self.connection = connection
+        self._lock = Lock()
+
+    @classmethod
+    def connect(cls, address, authkey=None):
+        """Connect to a worker listening at the specified (host, port).
+
+        """
+        return cls(Client(address, authkey=authkey))
+
+    def send(self, kind, payload=None):
+        """Send a message.
+
+        """
+        with self._lock:
+            self.connection.send((kind, payload))
+
+    def recv(self):
+        """Receive a message.
+
+        Raises
+        ------
+        EOFError :
+            If the other end closed the connection.
+
+        """
+        return self.connection.recv()
+
+    def close(self):
+        """Close the connection.
+
+        The socket is shut down first so that a thread blocked in recv is
+        woken up.
+
+        """
+        try:
+            sock = socket.socket(fileno=self.connection.fileno())
+        except OSError:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        finally:
+            sock.detach()
+        self.connection.close()
+
+
+def listen(address, authkey=None):
+    """Create a listener accepting the connections of the engines.
+
+    """
+    return Listener(address, authkey=authkey)
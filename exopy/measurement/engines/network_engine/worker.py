@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Worker executing the measurements sent by a network engine.
+
+The worker can be started on the computer connected to the instruments
+using::
+
+    exopy-worker --host 0.0.0.0 --port 8642 --authkey secret
+
+The authentication key can also be provided through the EXOPY_WORKER_AUTHKEY
+environment variable.
+
+"""
+import os
+import sys
+import logging
+import logging.config
+import argparse
+from multiprocessing import Event, Process, Pipe
+from threading import Thread
+from threading import Event as tEvent
+
+from ....utils.traceback import format_exc
+from ....app.log.tools import QueueHandler, DayRotatingTimeHandler
+from ....tasks.api import build_task_from_config
+from ...processor import errors_to_msg
+from ..utils import exit_on_terminate, stop_at_exit
+from .protocol import MessageConnection, listen
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionHandler(QueueHandler):
+    """Handler sending the log records to the engine.
+
+    """
+    def __init__(self, connection):
+        super(ConnectionHandler, self).__init__(None)
+        self.connection = connection
+
+    def enqueue(self, record):
+        """Send the record to the engine.
+
+        """
+        self.connection.send('log', record)
+
+
+class NetworkWorker(object):
+    """Server executing the measurements sent by network engines.
+
+    The engines are served one at a time and each engine can send any number
+    of measurements over its connection.
+
+    Parameters
+    ----------
+    address : tuple
+        (host, port) on which to listen. Use port 0 to pick a free port.
+
+    authkey : bytes, optional
+        Key used to authenticate the engines.
+
+    stop_timeout : float, optional
+        Time (in s) to wait for the measurement to stop when an engine
+        disconnects. A measurement still running afterwards is left behind
+        and the next engines are served but their measurements are refused
+        till it exits.
+
+    """
+    def __init__(self, address=('127.0.0.1', 0), authkey=None,
+                 stop_timeout=10):
+        self.listener = listen(address, authkey)
+        self.address = self.listener.address
+        self.stop_timeout = stop_timeout
+        self.task_pause = Event()
+        self.task_paused = Event()
+        self.task_resumed = Event()
+        self.task_stop = Event()
+        self.measuring = tEvent()
+
+    def serve(self, max_connections=None):
+        """Serve the engines connecting to the worker.
+
+        Parameters
+        ----------
+        max_connections : int, optional
+            Number of engines to serve before returning. Serve for ever if
+            None.
+
+        """
+        served = 0
+        try:
+            while max_connections is None or served < max_connections:
+                try:
+                    connection = self.listener.accept()
+                except Exception:
+                    logger.warning('Failed to accept a connection :\n%s',
+                                   format_exc())
+                    continue
+                served += 1
+                self.handle(MessageConnection(connection))
+        finally:
+            self.listener.close()
+
+    def handle(self, connection):
+        """Process the messages sent by an engine till it disconnects.
+
+        """
+        handler = ConnectionHandler(connection)
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        logger.info('Engine connected')
+
+        thread = None
+        try:
+            while True:
+                try:
+                    kind, payload = connection.recv()
+                except (EOFError, OSError):
+                    break
+
+                if kind == 'measurement':
+                    if self.measuring.is_set():
+                        connection.send('result', (False, {'engine':
+                                        'A measurement is already running.'}))
+                        continue
+                    if thread:
+                        # The previous measurement sent its result and is
+                        # simply exiting.
+                        thread.join()
+                    self.measuring.set()
+                    for event in (self.task_pause, self.task_paused,
+                                  self.task_resumed, self.task_stop):
+                        event.clear()
+                    thread = Thread(target=self.run_measurement,
+                                    args=(connection, payload))
+                    thread.daemon = True
+                    thread.start()
+
+                elif kind == 'pause':
+                    self.task_resumed.clear()
+                    self.task_paused.clear()
+                    self.task_pause.set()
+                    Thread(target=self._wait_for_pause,
+                           args=(connection,)).start()
+
+                elif kind == 'resume':
+                    self.task_pause.clear()
+
+                elif kind == 'stop':
+                    self.task_stop.set()
+
+                else:
+                    logger.error('Unknown message %s', kind)
+
+        finally:
+            # If the engine is gone, there is no point in going on.
+            self.task_stop.set()
+            if thread:
+                thread.join(self.stop_timeout)
+                if thread.is_alive():
+                    logger.warning('The measurement did not stop after the '
+                                   'engine disconnected, new measurements '
+                                   'are refused till it exits.')
+            root_logger.removeHandler(handler)
+            connection.close()
+            logger.info('Engine disconnected')
+
+    def run_measurement(self, connection, infos):
+        """Build, check and perform a measurement and send back the result.
+
+        """
+        name, config, build, runtime, entries, database, checks = infos
+        meas_handler = None
+        try:
+            # Build it by using the given build dependencies.
+            root = build_task_from_config(config, build, True)
+
+            # Set the specific root database values.
+            for k, v in database.items():
+                root.write_in_database(k, v)
+
+            # Give all runtime dependencies to the root task.
+            root.run_time = runtime
+
+            logger.info('Task built')
+
+            # Send the updates of the monitored entries.
+            if entries:
+                entries = set(entries)
+
+                def send_news(change):
+                    if change[0] in entries:
+                        try:
+                            connection.send('news', change)
+                        except Exception:
+                            logger.error('Failed to send %s :\n%s',
+                                         change, format_exc())
+
+                root.database.observe('notifier', send_news)
+
+            # Set up the logger for this specific measurement.
+            log_path = os.path.join(root.default_path, name + '.log')
+            meas_handler = DayRotatingTimeHandler(log_path)
+            aux = '%(asctime)s | %(levelname)s | %(message)s'
+            meas_handler.setFormatter(logging.Formatter(aux))
+            logging.getLogger().addHandler(meas_handler)
+
+            # Pass the events signaling the task it should stop or pause.
+            root.should_pause = self.task_pause
+            root.paused = self.task_paused
+            root.should_stop = self.task_stop
+            root.resumed = self.task_resumed
+
+            if checks:
+                check, errors = root.check()
+            else:
+                logger.info('Tests skipped')
+                check, errors = True, {}
+
+            if check:
+                logger.info('Check successful')
+                result = (root.perform(), root.errors)
+            else:
+                logger.debug('Some test failed:\n' + errors_to_msg(errors))
+                result = (False, errors)
+
+        except Exception:
+            logger.exception('Error occured during processing')
+            result = (False, {'engine': format_exc()})
+
+        finally:
+            if meas_handler:
+                logging.getLogger().removeHandler(meas_handler)
+                meas_handler.close()
+
+        self.measuring.clear()
+        try:
+            connection.send('result', result)
+        except Exception:
+            logger.error('Failed to send the result :\n%s', format_exc())
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    def _wait_for_pause(self, connection):
+        """Notify the engine when the task is paused and when it resumed.
+
+        """
+        try:
+            while not self.task_stop.is_set():
+                if self.task_paused.wait(0.1):
+                    connection.send('paused')
+                    break
+
+            while not self.task_stop.is_set():
+                if self.task_resumed.wait(0.1):
+                    connection.send('resumed')
+                    break
+        except OSError:
+            # The engine disconnected.
+            pass
+
+
+def _run_local_worker(pipe, authkey):
+    """Serve a single engine and report the port used through a pipe.
+
+    """
+    exit_on_terminate()
+    # Forget the handlers inherited from the application as the records are
+    # sent to the engine.
+    logging.config.dictConfig({'version': 1,
+                               'disable_existing_loggers': True,
+                               'root': {'level': 'INFO', 'handlers': []}})
+    worker = NetworkWorker(authkey=authkey)
+    pipe.send(worker.address)
+    pipe.close()
+    worker.serve(max_connections=1)
+
+
+def start_local_worker(authkey=None):
+    """Start a worker serving a single engine in a separate process.
+
+    Parameters
+    ----------
+    authkey : bytes, optional
+        Key used to authenticate the engine.
+
+    Returns
+    -------
+    process : multiprocessing.Process
+        Process running the worker, it ends when the engine disconnects. It
+        is not daemonic so that the tasks can start processes of their own.
+
+    address : tuple
+        (host, port) on which the worker is listening.
+
+    """
+    pipe, worker_pipe = Pipe()
+    process = Process(target=_run_local_worker, args=(worker_pipe, authkey),
+                      name='exopy.MeasureWorker')
+    process.start()
+    stop_at_exit(process)
+    address = pipe.recv()
+    pipe.close()
+    return process, address
+
+
+def main(argv=None):
+    """Run a worker till it is interrupted.
+
+    """
+    parser = argparse.ArgumentParser(description='Execute the measurements '
+                                     'sent by Exopy network engines.')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface on which to listen.')
+    parser.add_argument('--port', type=int, default=8642,
+                        help='Port on which to listen.')
+    parser.add_argument('--authkey',
+                        default=os.environ.get('EXOPY_WORKER_AUTHKEY'),
+                        help='Key used to authenticate the engines.')
+    parser.add_argument('--stop-timeout', type=float, default=10,
+                        help='Time (in s) to wait for a measurement to stop '
+                        'when its engine disconnects.')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s | %(levelname)s | %(message)s')
+    if not args.authkey:
+        logger.warning('No authentication key was provided, any host '
+                       'able to connect can run arbitrary code.')
+
+    authkey = args.authkey.encode('utf-8') if args.authkey else None
+    worker = NetworkWorker((args.host, args.port), authkey,
+                           args.stop_timeout)
+    logger.info('Listening on %s:%d', *worker.address)
+    try:
+        worker.serve()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
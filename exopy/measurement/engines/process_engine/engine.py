@@ -11,25 +11,88 @@
 """
 import logging
 from multiprocessing import Pipe, Queue, Event
-from threading import Thread
+from multiprocessing.connection import wait
+from threading import Thread, RLock
 from threading import Event as tEvent
 from pprint import pformat
 
-from atom.api import Typed, Value, Bool
+from atom.api import Typed, Value, Bool, List, Float
 
 from ....utils.traceback import format_exc
 from ....app.log.tools import QueueLoggerThread
 from ..base_engine import BaseEngine
-from ..utils import ThreadMeasureMonitor
-from .subprocess import TaskProcess
+from ..utils import ThreadMeasureMonitor, terminate_process, stop_at_exit
+from .subprocess import TaskProcess, CloseConnections
+from .serialization import InfosEncoder
 
 logger = logging.getLogger(__name__)
 
 
+def collect_preload_modules(workbench):
+    """List the modules of the tasks, interfaces and drivers known to the
+    application.
+
+    """
+    modules = set()
+
+    def add(infos):
+        modules.add(infos.cls.__module__)
+        for i in getattr(infos, 'interfaces', {}).values():
+            add(i)
+
+    try:
+        tasks = workbench.get_plugin('exopy.tasks')
+    except ValueError:
+        pass
+    else:
+        for task_id in tasks.list_tasks() or ():
+            infos = tasks.get_task_infos(task_id)
+            # Templates have no infos.
+            if infos is not None:
+                add(infos)
+
+    try:
+        instrs = workbench.get_plugin('exopy.instruments')
+    except ValueError:
+        pass
+    else:
+        for driver_id in instrs.drivers:
+            try:
+                drivers, _ = instrs.get_drivers([driver_id])
+            except KeyError:
+                # The starter of an invalid driver may be missing.
+                continue
+            for cls, _ in drivers.values():
+                modules.add(cls.__module__)
+
+    return sorted(modules)
+
+
 class ProcessEngine(BaseEngine):
     """An engine executing the tasks it is sent in a different process.
 
     """
+    #: Modules imported by the subprocess as soon as it starts so that the
+    #: first measurement does not pay for it (see collect_preload_modules).
+    preload_modules = List()
+
+    #: Whether to start a new subprocess as soon as the previous one was
+    #: terminated by a forced stop or died, so that the engine is immediately
+    #: usable.
+    hot_standby = Bool()
+
+    #: Maximal rate (in Hz) at which the subprocess sends the values of the
+    #: observed entries. Only the latest value of each entry is sent. If zero
+    #: each update is sent immediately.
+    monitor_rate = Float(20)
+
+    def prewarm(self):
+        """Start the subprocess ahead of the first measurement.
+
+        """
+        self._shutdown_requested = False
+        if not self._process or not self._process.is_alive():
+            self._start_process()
 
     def perform(self, exec_infos):
         """Execute a given task.
@@ -61,64 +124,35 @@ class ProcessEngine(BaseEngine):
         self._task_stop.clear()
         self._force_stop.clear()
         self._stop_requested = False
+        self._shutdown_requested = False
 
         # If the process does not exist or is dead create a new one.
         if not self._process or not self._process.is_alive():
+            self._start_process()
+
+        # Send the measurement. The pooled connections cannot be closed
+        # meanwhile, and none is pooled till the measurement is over.
+        with self._pipe_lock:
+            self.pooled_profiles = []
+            args = self._build_subprocess_args(exec_infos)
+            try:
+                self._pipe.send(args)
+            except Exception:
+                msg = ('Failed to send infos to subprocess :\n-infos : \n%s\n'
+                       '-errors :\n%s')
+                logger.error(msg % (pformat(args), format_exc()))
+                self._log_queue.put(None)
+                self._monitor_queue.put((None, None))
+                self._cleanup(process=True)
+                exec_infos.success = False
+                exec_infos.errors['engine'] = msg
+                self.status = 'Stopped'
+                return exec_infos
+            else:
+                logger.debug('Task {} sent'.format(exec_infos.id))
 
-            self._process_stop.clear()
-
-            # Create the subprocess and the pipe.
-            self._pipe, process_pipe = Pipe()
-            self._process = TaskProcess(process_pipe,
-                                        self._log_queue,
-                                        self._monitor_queue,
-                                        self._task_pause,
-                                        self._task_paused,
-                                        self._task_resumed,
-                                        self._task_stop,
-                                        self._process_stop)
-            self._process.daemon = True
-
-            # Create the logger thread in charge of dispatching log reports.
-            self._log_thread = QueueLoggerThread(self._log_queue)
-            self._log_thread.daemon = True
-            logger.debug('Starting logging thread.')
-            self._log_thread.start()
-
-            # Create the monitor thread dispatching engine news to the monitor.
-            self._monitor_thread = ThreadMeasureMonitor(self,
-                                                        self._monitor_queue)
-            self._monitor_thread.daemon = True
-            logger.debug('Starting monitoring thread.')
-            self._monitor_thread.start()
-
-            self._pause_thread = None
-
-            # Start process.
-            logger.debug('Starting subprocess')
-            self._process.start()
-
-        # Send the measurement.
-        args = self._build_subprocess_args(exec_infos)
-        try:
-            self._pipe.send(args)
-        except Exception:
-            msg = ('Failed to send infos to subprocess :\n-infos : \n%s\n'
-                   '-errors :\n%s')
-            logger.error(msg % (pformat(args), format_exc()))
-            self._log_queue.put(None)
-            self._monitor_queue.put((None, None))
-            self._cleanup(process=True)
-            exec_infos.success = False
-            exec_infos.errors['engine'] = msg
-            self.status = 'Stopped'
-            return exec_infos
-        else:
-            logger.debug('Task {} sent'.format(exec_infos.id))
-
-        # Check that the engine did receive the task.
-        while not self._pipe.poll(2):
-            if not self._process.is_alive():
+            # Check that the engine did receive the task.
+            if not self._wait_for_answer():
                 msg = 'Subprocess was found dead unexpectedly'
                 logger.debug(msg)
                 self._log_queue.put(None)
@@ -127,44 +161,64 @@ class ProcessEngine(BaseEngine):
                 exec_infos.success = False
                 exec_infos.errors['engine'] = msg
                 self.status = 'Stopped'
+                self._restart_standby()
                 return exec_infos
 
-        # Simply empty the pipe the subprocess always send True if it answers
-        self._pipe.recv()
+            # Simply empty the pipe the subprocess always send True if it
+            # answers
+            self._pipe.recv()
 
-        # Wait for the process to finish the measurement and check it has not
-        # been killed.
-        while not self._pipe.poll(1):
+        # Wait for the process to finish the measurement or to die (a forced
+        # stop terminates the process).
+        if not self._wait_for_answer():
             if self._force_stop.is_set():
                 msg = 'Subprocess was terminated by the user.'
                 logger.debug(msg)
                 self._cleanup(process=False)
                 exec_infos.errors['engine'] = msg
                 self.status = 'Stopped'
+                self._restart_standby()
                 return exec_infos
 
-            elif not self._process.is_alive():
-                msg = 'Subprocess was found dead unexpectedly'
-                logger.debug(msg)
-                self._log_queue.put(None)
-                self._monitor_queue.put((None, None))
-                self._cleanup(process=False)
-                exec_infos.success = False
-                exec_infos.errors['engine'] = msg
-                self.status = 'Stopped'
-                return exec_infos
+            msg = 'Subprocess was found dead unexpectedly'
+            logger.debug(msg)
+            self._log_queue.put(None)
+            self._monitor_queue.put((None, None))
+            self._cleanup(process=False)
+            exec_infos.success = False
+            exec_infos.errors['engine'] = msg
+            self.status = 'Stopped'
+            self._restart_standby()
+            return exec_infos
 
         # Here get message from process and react
-        result, errors = self._pipe.recv()
+        result, errors, pooled_profiles = self._pipe.recv()
         logger.debug('Subprocess done performing measurement')
 
         exec_infos.success = result
         exec_infos.errors.update(errors)
+        self.pooled_profiles = pooled_profiles
 
         self.status = 'Waiting'
 
         return exec_infos
 
+    def close_connections(self, profiles):
+        """Ask the subprocess to close the pooled connections.
+
+        """
+        with self._pipe_lock:
+            profiles = [p for p in profiles if p in self.pooled_profiles]
+            if (not profiles or not self._process or
+                    not self._process.is_alive()):
+                return
+
+            self._pipe.send(CloseConnections(profiles))
+            if not self._wait_for_answer():
+                self.pooled_profiles = []
+                return
+            self.pooled_profiles = self._pipe.recv()
+
     def pause(self):
         """Ask the engine to pause the current task execution.
 
@@ -205,19 +259,22 @@ class ProcessEngine(BaseEngine):
         if force:
             self._force_stop.set()
 
-            # Stop running queues
-            self._log_queue.put(None)
-            self._monitor_queue.put((None, None))
+            # Once the process is dead, the thread waiting for the measurement
+            # may start a standby process (with new queues and threads) so
+            # only the current ones are used.
+            log_queue, log_thread = self._log_queue, self._log_thread
+            monitor_queue = self._monitor_queue
+            monitor_thread = self._monitor_thread
 
-            # Terminate the process and make sure all threads stopped properly.
-            self._process.terminate()
-            self._log_thread.join()
-            self._monitor_thread.join()
+            # Terminate the process, the queues are still read while it
+            # cleans up.
+            terminate_process(self._process)
 
-            # Discard the queues as they may have been corrupted when the
-            # process was terminated.
-            self._log_queue = Queue()
-            self._monitor_queue = Queue()
+            # Stop running queues and make sure all threads stopped properly.
+            log_queue.put(None)
+            monitor_queue.put((None, None))
+            log_thread.join()
+            monitor_thread.join()
 
             self.status = 'Stopped'
 
@@ -234,6 +291,7 @@ class ProcessEngine(BaseEngine):
         """
         self.status = 'Shutting down'
         self._stop_requested = True
+        self._shutdown_requested = True
         self._task_stop.set()
 
         if not force:
@@ -250,6 +308,10 @@ class ProcessEngine(BaseEngine):
     #: Boolean indicating that the user requested the job to stop.
     _stop_requested = Bool()
 
+    #: Boolean indicating that the engine is shutting down and should not
+    #: start a standby process.
+    _shutdown_requested = Bool()
+
     #: Interprocess event used to pause the subprocess current job.
     _task_pause = Value(factory=Event)
 
@@ -275,6 +337,10 @@ class ProcessEngine(BaseEngine):
     #: ambiguous when the OS is not known)
     _pipe = Value()
 
+    #: Lock preventing to mix the exchanges about the measurements and the
+    #: pooled connections.
+    _pipe_lock = Value(factory=RLock)
+
     #: Inter-process queue used by the subprocess to transmit its log records.
     _log_queue = Value(factory=Queue)
 
@@ -294,6 +360,10 @@ class ProcessEngine(BaseEngine):
     #: pause/resume after being asked to do so.
     _pause_thread = Typed(Thread)
 
+    #: Encoder tracking the preferences and dependencies already held by the
+    #: subprocess.
+    _encoder = Typed(InfosEncoder, ())
+
     def _cleanup(self, process=True):
         """ Helper method taking care of making sure that everybody stops.
 
@@ -312,6 +382,7 @@ class ProcessEngine(BaseEngine):
             logger.debug('Subprocess joined')
         if self._pipe:
             self._pipe.close()
+        self.pooled_profiles = []
 
         if self._log_thread:
             self._log_thread.join()
@@ -327,19 +398,90 @@ class ProcessEngine(BaseEngine):
 
         self.status = 'Stopped'
 
+    def _start_process(self):
+        """Create and start the subprocess and the threads listening to it.
+
+        """
+        self._process_stop.clear()
+        self._encoder.reset()
+
+        # Use new queues as the previous ones may have been corrupted if the
+        # process was terminated.
+        self._log_queue = Queue()
+        self._monitor_queue = Queue()
+
+        # Create the subprocess and the pipe.
+        self._pipe, process_pipe = Pipe()
+        self._process = TaskProcess(process_pipe,
+                                    self._log_queue,
+                                    self._monitor_queue,
+                                    self._task_pause,
+                                    self._task_paused,
+                                    self._task_resumed,
+                                    self._task_stop,
+                                    self._process_stop,
+                                    self.preload_modules,
+                                    self.monitor_rate)
+
+        # Create the logger thread in charge of dispatching log reports.
+        self._log_thread = QueueLoggerThread(self._log_queue)
+        self._log_thread.daemon = True
+        logger.debug('Starting logging thread.')
+        self._log_thread.start()
+
+        # Create the monitor thread dispatching engine news to the monitor.
+        self._monitor_thread = ThreadMeasureMonitor(self,
+                                                    self._monitor_queue)
+        self._monitor_thread.daemon = True
+        logger.debug('Starting monitoring thread.')
+        self._monitor_thread.start()
+
+        self._pause_thread = None
+
+        # Start process.
+        logger.debug('Starting subprocess')
+        self._process.start()
+        stop_at_exit(self._process)
+
+    def _restart_standby(self):
+        """Start a new subprocess after the previous one died if a hot standby
+        is requested.
+
+        """
+        if self.hot_standby and not self._shutdown_requested:
+            logger.debug('Starting standby subprocess')
+            self._start_process()
+
+    def _wait_for_answer(self):
+        """Block till the subprocess sends a message or dies.
+
+        Returns
+        -------
+        answered : bool
+            True if a message can be read from the pipe, False if the process
+            died.
+
+        """
+        return self._pipe in wait([self._pipe, self._process.sentinel])
+
     def _build_subprocess_args(self, exec_infos):
         """Build the tuple to send to the subprocess.
 
+        The preferences and the build dependencies are only sent if the
+        subprocess does not already hold them.
+
         """
         exec_infos.task.update_preferences_from_members()
-        config = exec_infos.task.preferences
+        config, build_deps = self._encoder.encode(exec_infos.task.preferences,
+                                                  exec_infos.build_deps)
         database_root_state = exec_infos.task.database.copy_node_values()
         return (exec_infos.id, config,
-                exec_infos.build_deps,
+                build_deps,
                 exec_infos.runtime_deps,
                 exec_infos.observed_entries,
                 database_root_state,
-                exec_infos.checks
+                exec_infos.checks,
+                exec_infos.connections_timeout
                 )
 
     def _wait_for_pause(self):
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Compact encoding of the execution infos sent to the subprocess.
+
+The preferences of the task hierarchy are sent as a compressed pickle of
+plain dictionaries identified by the hash of their content. The subprocess
+keeps the last ones it received, so that when the same measurement is
+enqueued again only the hash is sent. Similarly, the build dependencies the
+subprocess already holds are not sent again.
+
+The engine mirrors the content of the subprocess caches. This works because
+both sides see the same sequence of measurements and a new subprocess (with
+empty caches) is started whenever an exchange fails.
+
+"""
+import pickle
+import zlib
+from collections import OrderedDict
+from hashlib import sha1
+
+#: Number of encoded task hierarchies kept by the subprocess.
+CONFIG_CACHE_SIZE = 16
+
+
+def encode_config(config):
+    """Encode the preferences of a task hierarchy.
+
+    Parameters
+    ----------
+    config : ConfigObj
+        Preferences of the root task.
+
+    Returns
+    -------
+    key : str
+        Hash of the encoded content.
+
+    data : bytes
+        Compressed pickle of the preferences as plain dictionaries.
+
+    """
+    data = zlib.compress(pickle.dumps(config.dict(), pickle.HIGHEST_PROTOCOL))
+    return sha1(data).hexdigest(), data
+
+
+def decode_config(data):
+    """Decode preferences encoded by encode_config.
+
+    A new dictionary is returned on each call, so that it can be consumed by
+    build_task_from_config.
+
+    """
+    return pickle.loads(zlib.decompress(data))
+
+
+def dependency_version(obj):
+    """Identify the version of a build dependency.
+
+    Classes and functions are pickled by reference so their qualified name
+    identifies them. None is returned for other objects which must hence
+    always be sent.
+
+    """
+    if isinstance(obj, type) or callable(obj):
+        name = getattr(obj, '__qualname__', None)
+        module = getattr(obj, '__module__', None)
+        if name and module:
+            return module + '.' + name
+    return None
+
+
+class InfosEncoder(object):
+    """Encode the execution infos and track what the subprocess holds.
+
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forget everything sent to the subprocess.
+
+        Should be called when a new subprocess is started.
+
+        """
+        self._configs = OrderedDict()
+        self._deps = {}
+
+    def encode(self, config, build_deps):
+        """Encode the preferences and build dependencies of a measurement.
+
+        Returns
+        -------
+        config : tuple
+            Hash of the encoded preferences and encoded preferences or None if
+            the subprocess already holds them.
+
+        build_deps : dict
+            Dependencies the subprocess does not hold yet.
+
+        """
+        key, data = encode_config(config)
+        if key in self._configs:
+            self._configs.move_to_end(key)
+            data = None
+        else:
+            self._configs[key] = None
+            if len(self._configs) > CONFIG_CACHE_SIZE:
+                self._configs.popitem(last=False)
+
+        delta = {}
+        for dep_type, deps in build_deps.items():
+            for dep_id, obj in deps.items():
+                version = dependency_version(obj)
+                if version is None or self._deps.get((dep_type, dep_id)) != \
+                        version:
+                    delta.setdefault(dep_type, {})[dep_id] = obj
+                    self._deps[(dep_type, dep_id)] = version
+
+        return (key, data), delta
+
+
+class InfosDecoder(object):
+    """Decode the execution infos sent by an InfosEncoder.
+
+    """
+    def __init__(self):
+        self._configs = OrderedDict()
+        self._deps = {}
+
+    def decode(self, config, build_deps):
+        """Rebuild the preferences and build dependencies of a measurement.
+
+        Raises
+        ------
+        KeyError :
+            If the preferences were neither sent nor cached.
+
+        """
+        key, data = config
+        if data is None:
+            data = self._configs[key]
+            self._configs.move_to_end(key)
+        else:
+            self._configs[key] = data
+            if len(self._configs) > CONFIG_CACHE_SIZE:
+                self._configs.popitem(last=False)
+
+        for dep_type, deps in build_deps.items():
+            self._deps.setdefault(dep_type, {}).update(deps)
+
+        return decode_config(data), self._deps
@@ -13,30 +13,58 @@ import os
 import logging
 import logging.config
 import sys
+from importlib import import_module
 from multiprocessing import Process
 from time import sleep
 
 from ....utils.traceback import format_exc
 from ....app.log.tools import (StreamToLogRedirector, DayRotatingTimeHandler)
 from ....tasks.api import build_task_from_config
-from ..utils import MeasureSpy
+from ....tasks.tasks.instr_task import PROFILE_DEPENDENCY_ID
+from ....instruments.connection_pool import ConnectionPool
+from ..utils import MeasureSpy, SharedArrayStore, exit_on_terminate
+from .serialization import InfosDecoder
 from ...processor import errors_to_msg
 
 
+class CloseConnections(object):
+    """Message asking the process to close the pooled connections of some
+    instrument profiles.
+
+    The process answers with the list of the profiles still pooled.
+
+    """
+    __slots__ = ('profiles',)
+
+    def __init__(self, profiles):
+        self.profiles = profiles
+
+
 class TaskProcess(Process):
     """Process taking care of performing the measurements.
 
     When started this process sets up a logger redirecting all records to a
     queue. It then redirects stdout and stderr to the logging system. Then as
     long as it is not stopped it waits for the main process to send a
-    measurements through the pipe. Upon reception of the `ConfigObj` object
-    describing the measurement it rebuilds it, set up a logger for that
+    measurements through the pipe. Upon reception of the preferences describing
+    the measurement (or of the hash identifying preferences received
+    previously, see serialization) it rebuilds it, set up a logger for that
     specific measurement and if necessary starts a spy transmitting the value
     of all monitored entries to the main process. It finally run the checks of
     the measurement and run it. It can be interrupted by setting an event and
     upon exit close the communication pipe and signal all listeners that it is
     closing.
 
+    If the main process allows it, the connections to the instruments are
+    kept open in a pool after a measurement so that the next one can reuse
+    them. Only the connections to the profiles granted to the next
+    measurement are preserved, and the main process can ask for some
+    connections to be closed between two measurements.
+
+    The process is not daemonic so that the tasks can start processes of their
+    own. When terminated, it releases the instruments connections and its
+    child processes before exiting.
+
     Parameters
     ----------
     pipe :
@@ -63,6 +91,13 @@ class TaskProcess(Process):
     process_stop :
         Event set when the user asked the process to stop.
 
+    preload : iterable, optional
+        Names of the modules to import as soon as the process starts.
+
+    monitor_rate : float, optional
+        Maximal rate (in Hz) at which the values of the monitored entries are
+        sent. If zero each update is sent immediately.
+
     Attributes
     ----------
     meas_log_handler : log handler
@@ -78,9 +113,9 @@ class TaskProcess(Process):
     """
 
     def __init__(self, pipe, log_queue, monitor_queue, task_pause, task_paused,
-                 task_resumed, task_stop, process_stop):
+                 task_resumed, task_stop, process_stop, preload=(),
+                 monitor_rate=0):
         super(TaskProcess, self).__init__(name='exopy.MeasureProcess')
-        self.daemon = True
         self.task_pause = task_pause
         self.task_paused = task_paused
         self.task_resumed = task_resumed
@@ -90,6 +125,8 @@ class TaskProcess(Process):
         self.log_queue = log_queue
         self.monitor_queue = monitor_queue
         self.meas_log_handler = None
+        self.preload = list(preload)
+        self.monitor_rate = monitor_rate
 
     def run(self):
         """Method called when the new process starts.
@@ -98,6 +135,7 @@ class TaskProcess(Process):
         docstring.
 
         """
+        exit_on_terminate()
         self._config_log()
 
         # Redirecting stdout and stderr to the logging system.
@@ -110,108 +148,166 @@ class TaskProcess(Process):
 
         logger.info('Process running')
 
-        while not self.process_stop.is_set():
+        self._preload_modules()
+
+        pool = ConnectionPool()
+        decoder = InfosDecoder()
+        # Full resolution of the monitored arrays, kept till the process
+        # exits so that the last values can be fetched after a measurement.
+        array_store = SharedArrayStore()
+        try:
+            while not self.process_stop.is_set():
+
+                # Prevent us from crash if the pipe is closed at the wrong
+                # moment.
+                try:
 
-            # Prevent us from crash if the pipe is closed at the wrong moment.
-            try:
+                    # Wait for a measurement.
+                    while not self.pipe.poll(2):
+                        pool.close_idle()
+                        if self.process_stop.is_set():
+                            break
 
-                # Wait for a measurement.
-                while not self.pipe.poll(2):
                     if self.process_stop.is_set():
                         break
 
-                if self.process_stop.is_set():
-                    break
+                    # Get the measurement.
+                    try:
+                        msg = self.pipe.recv()
+                        if isinstance(msg, CloseConnections):
+                            pool.close(msg.profiles)
+                            self.pipe.send(pool.profiles)
+                            continue
+                        (name, config, build, runtime, entries, database,
+                         checks, connections_timeout) = msg
+                        config, build = decoder.decode(config, build)
+                    except Exception:
+                        logger.error('Failed to receive measurement infos '
+                                     ':\n' + format_exc())
+                        sleep(1)
+                        return
+                    self.pipe.send(True)
+
+                    # Only keep the connections whose profiles were granted to
+                    # this measurement.
+                    granted = runtime.get(PROFILE_DEPENDENCY_ID, {})
+                    pool.close([p for p in pool.profiles if p not in granted])
+                    if not connections_timeout:
+                        pool.close()
+                    pool.timeout = connections_timeout
+
+                    # Build it by using the given build dependencies.
+                    root = build_task_from_config(config, build, True)
+
+                    # Set the specific root database values.
+                    for k, v in database.items():
+                        root.write_in_database(k, v)
+
+                    # Give all runtime dependencies to the root task.
+                    root.run_time = runtime
+                    if connections_timeout:
+                        root.resources['instrs'].pool = pool
+
+                    logger.info('Task built')
+
+                    # There are entries in the database we are supposed to
+                    # monitor start a spy to do it.
+                    if entries:
+                        spy = MeasureSpy(self.monitor_queue, entries,
+                                         root.database, self.monitor_rate,
+                                         array_store)
+
+                    # Set up the logger for this specific measurement.
+                    if self.meas_log_handler is not None:
+                        logger.removeHandler(self.meas_log_handler)
+                        self.meas_log_handler.close()
+                        self.meas_log_handler = None
+
+                    log_path = os.path.join(root.default_path, name + '.log')
+                    self.meas_log_handler = DayRotatingTimeHandler(log_path)
+
+                    aux = '%(asctime)s | %(levelname)s | %(message)s'
+                    formatter = logging.Formatter(aux)
+                    self.meas_log_handler.setFormatter(formatter)
+                    logger.addHandler(self.meas_log_handler)
+
+                    # Pass the events signaling the task it should stop or
+                    # pause to the task and make the database ready.
+                    root.should_pause = self.task_pause
+                    root.paused = self.task_paused
+                    root.should_stop = self.task_stop
+                    root.resumed = self.task_resumed
+
+                    # Perform the checks.
+                    if checks:
+                        check, errors = root.check()
+                    else:
+                        logger.info('Tests skipped')
+                        check = True
+
+                    # If checks pass perform the measurement.
+                    if check:
+                        logger.info('Check successful')
+                        result = root.perform()
+
+                        self.pipe.send((result, root.errors, pool.profiles))
+
+                    # They fail, mark the measurement as failed and go on.
+                    else:
+                        self.pipe.send((False, errors, pool.profiles))
+
+                        # Log the tests that failed.
+                        msg = 'Some test failed:\n' + errors_to_msg(errors)
+                        logger.debug(msg)
+
+                    # If a spy was started kill it
+                    if entries:
+                        spy.close()
+                        del spy
 
-                # Get the measurement.
-                try:
-                    name, config, build, runtime, entries, database, checks =\
-                        self.pipe.recv()
                 except Exception:
-                    logger.error('Failed to receive measurement infos :\n' +
-                                 format_exc())
-                    sleep(1)
-                    return
-                self.pipe.send(True)
-
-                # Build it by using the given build dependencies.
-                root = build_task_from_config(config, build, True)
-
-                # Set the specific root database values.
-                for k, v in database.items():
-                    root.write_in_database(k, v)
-
-                # Give all runtime dependencies to the root task.
-                root.run_time = runtime
-
-                logger.info('Task built')
-
-                # There are entries in the database we are supposed to
-                # monitor start a spy to do it.
-                if entries:
-                    spy = MeasureSpy(self.monitor_queue, entries,
-                                     root.database)
-
-                # Set up the logger for this specific measurement.
-                if self.meas_log_handler is not None:
-                    logger.removeHandler(self.meas_log_handler)
-                    self.meas_log_handler.close()
-                    self.meas_log_handler = None
-
-                log_path = os.path.join(root.default_path, name + '.log')
-                self.meas_log_handler = DayRotatingTimeHandler(log_path)
-
-                aux = '%(asctime)s | %(levelname)s | %(message)s'
-                formatter = logging.Formatter(aux)
-                self.meas_log_handler.setFormatter(formatter)
-                logger.addHandler(self.meas_log_handler)
-
-                # Pass the events signaling the task it should stop or pause
-                # to the task and make the database ready.
-                root.should_pause = self.task_pause
-                root.paused = self.task_paused
-                root.should_stop = self.task_stop
-                root.resumed = self.task_resumed
-
-                # Perform the checks.
-                if checks:
-                    check, errors = root.check()
-                else:
-                    logger.info('Tests skipped')
-                    check = True
-
-                # If checks pass perform the measurement.
-                if check:
-                    logger.info('Check successful')
-                    result = root.perform()
-
-                    self.pipe.send((result, root.errors))
-
-                # They fail, mark the measurement as failed and go on.
-                else:
-                    self.pipe.send((False, errors))
-
-                    # Log the tests that failed.
-                    msg = 'Some test failed:\n' + errors_to_msg(errors)
-                    logger.debug(msg)
-
-                # If a spy was started kill it
-                if entries:
-                    spy.close()
-                    del spy
-
-            except Exception:
-                logger.exception('Error occured during processing')
-                break
+                    logger.exception('Error occured during processing')
+                    break
+
+        except SystemExit:
+            # The process was terminated by the engine, which stops reading
+            # the queues once the process exited.
+            pool.close()
+            array_store.close()
+            raise
 
         # Clean up before closing.
         logger.info('Process shuting down')
+        pool.close()
+        array_store.close()
         if self.meas_log_handler:
             self.meas_log_handler.close()
         self.log_queue.put_nowait(None)
         self.monitor_queue.put_nowait((None, None))
         self.pipe.close()
 
+    def _preload_modules(self):
+        """Import the modules needed to build the tasks and the drivers.
+
+        This is done before waiting for the first measurement so that the
+        imports overlap with the preparation of the measurement in the main
+        process.
+
+        """
+        if not self.preload:
+            return
+
+        import enaml
+        logger = logging.getLogger(__name__)
+        with enaml.imports():
+            for name in self.preload:
+                try:
+                    import_module(name)
+                except Exception:
+                    logger.warning('Failed to preload %s :\n%s',
+                                   name, format_exc())
+        logger.debug('Preloaded %d modules', len(self.preload))
+
     def _config_log(self):
         """Configuring the logger for the process.
 
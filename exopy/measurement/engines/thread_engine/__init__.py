@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""exopy.measurement.engines.thread_engine :
+
+Engine executing the measurement in a thread of the application process.
+
+"""
+import enaml
+with enaml.imports():
+    from .engine_declaration import ThreadEngine
+
+__all__ = ['ThreadEngine']
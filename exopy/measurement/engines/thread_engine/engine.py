@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Engine executing the measurement in a thread of the application process.
+
+"""
+import os
+import logging
+from multiprocessing import Event, Queue
+from threading import Thread
+from threading import Event as tEvent
+
+from atom.api import Typed, Value, Bool, Float
+
+from ....utils.traceback import format_exc
+from ....app.log.tools import DayRotatingTimeHandler
+from ..base_engine import BaseEngine
+from ..utils import MeasureSpy, SharedArrayStore, ThreadMeasureMonitor
+
+logger = logging.getLogger(__name__)
+
+
+class MeasureThreadFilter(logging.Filter):
+    """Filter keeping the records emitted by the threads of a measurement.
+
+    Those are the thread performing the measurement and the threads started
+    by the tasks (whose names start with exopy.TaskThread).
+
+    """
+    def filter(self, record):
+        return (record.threadName == 'exopy.MeasureThread' or
+                record.threadName.startswith('exopy.TaskThread'))
+
+
+class ThreadEngine(BaseEngine):
+    """An engine executing the tasks it is sent in a thread.
+
+    The task hierarchy is executed as is: it is neither serialized nor
+    rebuilt. This makes this engine well suited for short measurements.
+    However a crash of a driver crashes the application and a forced stop
+    cannot interrupt a task which does not check the stop event.
+
+    """
+    #: Time (in s) to wait for the task to stop when forcing the stop. Past
+    #: this delay, the engine stops waiting for the task but it may still be
+    #: running.
+    force_stop_timeout = Float(10)
+
+    #: Maximal rate (in Hz) at which the values of the observed entries are
+    #: sent to the monitors. Only the latest value of each entry is sent. If
+    #: zero each update is sent immediately.
+    monitor_rate = Float(20)
+
+    def perform(self, exec_infos):
+        """Execute a given task.
+
+        Parameters
+        ----------
+        exec_infos : ExecutionInfos
+            TaskInfos object describing the work to expected of the engine.
+
+        Returns
+        -------
+        exec_infos : ExecutionInfos
+            Input object whose values have been updated. This is simply a
+            convenience.
+
+        """
+        if self._thread and self._thread.is_alive():
+            exec_infos.success = False
+            exec_infos.errors['engine'] = ('The previous task did not stop '
+                                           'and is still running.')
+            return exec_infos
+
+        self.status = 'Running'
+
+        # Clear all the flags.
+        self._task_pause.clear()
+        self._task_paused.clear()
+        self._task_resumed.clear()
+        self._task_stop.clear()
+        self._force_stop.clear()
+        self._shutdown_requested = False
+
+        self._thread = Thread(target=self._run, args=(exec_infos,),
+                              name='exopy.MeasureThread')
+        self._thread.daemon = True
+        self._thread.start()
+
+        # Wait for the task to complete or for a forced stop.
+        while self._thread.is_alive() and not self._force_stop.wait(0.1):
+            pass
+
+        if self._force_stop.is_set():
+            self._thread.join(self.force_stop_timeout)
+            msg = 'Execution was terminated by the user.'
+            if self._thread.is_alive():
+                msg += ' The task did not stop and may still be running.'
+            logger.debug(msg)
+            exec_infos.success = False
+            exec_infos.errors['engine'] = msg
+            self.status = 'Stopped'
+            return exec_infos
+
+        logger.debug('Thread done performing measurement')
+        self.status = 'Stopped' if self._shutdown_requested else 'Waiting'
+
+        return exec_infos
+
+    def pause(self):
+        """Ask the engine to pause the current task execution.
+
+        """
+        self.status = 'Pausing'
+        self._task_resumed.clear()
+        self._task_paused.clear()
+        self._task_pause.set()
+
+        self._pause_thread = Thread(target=self._wait_for_pause)
+        self._pause_thread.start()
+
+    def resume(self):
+        """Ask the engine to resume the currently paused job.
+
+        """
+        self.status = 'Resuming'
+        self._task_pause.clear()
+
+    def stop(self, force=False):
+        """Ask the engine to stop the current job.
+
+        This method should not wait for the job to stop save if a forced stop
+        was requested.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Wait for the task to stop at most force_stop_timeout and then
+            abandon it.
+
+        """
+        self.status = 'Stopping'
+        self._task_stop.set()
+
+        if force:
+            self._force_stop.set()
+            if self._thread:
+                self._thread.join(self.force_stop_timeout)
+                if self._thread.is_alive():
+                    logger.error('The task did not stop after %s s and was '
+                                 'abandoned.', self.force_stop_timeout)
+            self.status = 'Stopped'
+
+    def shutdown(self, force=False):
+        """Ask the engine to stop completely.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Force the engine to stop the performing the task (see stop).
+
+        """
+        self.status = 'Shutting down'
+        self._shutdown_requested = True
+        self._task_stop.set()
+
+        if force:
+            self.stop(force=True)
+        elif not self._thread or not self._thread.is_alive():
+            self.status = 'Stopped'
+
+        if not self._thread or not self._thread.is_alive():
+            self._array_store.close()
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Boolean indicating that the engine should stop once the current task
+    #: is over.
+    _shutdown_requested = Bool()
+
+    #: Event used to pause the current job.
+    _task_pause = Value(factory=Event)
+
+    #: Event signaling the current job is paused.
+    _task_paused = Value(factory=Event)
+
+    #: Event signaling the current job has resumed.
+    _task_resumed = Value(factory=Event)
+
+    #: Event used to stop the current job.
+    _task_stop = Value(factory=Event)
+
+    #: Flag signaling that a forced stop has been requested.
+    _force_stop = Value(factory=tEvent)
+
+    #: Thread performing the task.
+    _thread = Typed(Thread)
+
+    #: Thread in charge of notifying the engine that the engine did
+    #: pause/resume after being asked to do so.
+    _pause_thread = Typed(Thread)
+
+    #: Full resolution of the monitored arrays, kept till the engine is shut
+    #: down so that the last values can be fetched after a measurement.
+    _array_store = Value(factory=SharedArrayStore)
+
+    def _run(self, exec_infos):
+        """Check and perform the task.
+
+        This is executed in a dedicated thread.
+
+        """
+        root = exec_infos.task
+        root.run_time = exec_infos.runtime_deps
+        root.errors = {}
+
+        # Pass the events signaling the task it should stop or pause.
+        root.should_pause = self._task_pause
+        root.paused = self._task_paused
+        root.should_stop = self._task_stop
+        root.resumed = self._task_resumed
+
+        # Send the updates of the observed entries to the monitors.
+        entries = exec_infos.observed_entries
+        if entries:
+            queue = Queue()
+            spy = MeasureSpy(queue, entries, root.database, self.monitor_rate,
+                             self._array_store)
+            monitor = ThreadMeasureMonitor(self, queue)
+            monitor.daemon = True
+            monitor.start()
+
+        # Set up the logger for this specific measurement.
+        log_path = os.path.join(root.default_path, exec_infos.id + '.log')
+        handler = DayRotatingTimeHandler(log_path)
+        aux = '%(asctime)s | %(levelname)s | %(message)s'
+        handler.setFormatter(logging.Formatter(aux))
+        handler.addFilter(MeasureThreadFilter())
+        logging.getLogger().addHandler(handler)
+
+        try:
+            if exec_infos.checks:
+                check, errors = root.check()
+            else:
+                logger.info('Tests skipped')
+                check, errors = True, {}
+
+            if check:
+                logger.info('Check successful')
+                exec_infos.success = root.perform()
+                exec_infos.errors.update(root.errors)
+            else:
+                exec_infos.success = False
+                exec_infos.errors.update(errors)
+
+        except Exception:
+            logger.exception('Error occured during processing')
+            exec_infos.success = False
+            exec_infos.errors['engine'] = format_exc()
+
+        finally:
+            logging.getLogger().removeHandler(handler)
+            handler.close()
+            if entries:
+                root.database.unobserve('notifier', spy.enqueue_update)
+                spy.close()
+                queue.put((None, None))
+                monitor.join()
+                queue.close()
+                queue.join_thread()
+            if self._shutdown_requested:
+                self._array_store.close()
+            root.exit_running_state()
+
+    def _wait_for_pause(self):
+        """ Wait for the _task_paused event to be set.
+
+        """
+        stop_sig = self._task_stop
+        paused_sig = self._task_paused
+
+        while not stop_sig.is_set():
+            if paused_sig.wait(0.1):
+                self.status = 'Paused'
+                break
+
+        resuming_sig = self._task_resumed
+
+        while not stop_sig.is_set():
+            if resuming_sig.wait(1):
+                self.status = 'Running'
+                break
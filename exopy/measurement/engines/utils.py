@@ -9,23 +9,255 @@
 """Useful tools for engines.
 
 """
+import os
+import atexit
+import signal
 import logging
-from threading import Thread
+from threading import Thread, Lock, Event
+from weakref import WeakSet
 from queue import Empty
 from multiprocessing.queues import Queue
-from pickle import dumps
 
-from atom.api import Atom, Coerced, Typed
+import numpy as np
+from atom.api import Atom, Coerced, Typed, Float, Int, Dict, Value
 
 from ...utils.traceback import format_exc
 from ...tasks.tasks.database import TaskDatabase
 
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # pragma: no cover
+    shared_memory = None  # Python < 3.8
+
+
+#: Arrays with more elements are sent by the spy as summaries.
+ARRAY_SUMMARY_THRESHOLD = 1000
+
+#: Maximal number of points per dimension of the preview of a summarized
+#: array.
+ARRAY_PREVIEW_SIZE = 100
+
+#: Time (in s) left to a terminated process to clean up before being killed.
+TERMINATION_TIMEOUT = 5
+
+
+#: Size (in bytes) of the header of the shared memory blocks holding the
+#: sequence number of the published array.
+_HEADER_SIZE = 8
+
+
+def _attach_shared_memory(name):
+    """Attach to a shared memory block.
+
+    On POSIX systems, attaching registers the block with the resource tracker
+    of this process, which would then unlink it at exit while it is owned by
+    the process which published it, so the block is unregistered.
+
+    """
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # Python < 3.13
+        shm = shared_memory.SharedMemory(name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister('/' + shm.name, 'shared_memory')
+        return shm
+
+
+def _read_shared_memory(name, shape, dtype, sequence):
+    """Copy an array out of a shared memory block.
+
+    None is returned if the block does not hold the expected values anymore
+    (or was modified while being copied).
+
+    """
+    shm = _attach_shared_memory(name)
+    header = None
+    try:
+        header = np.ndarray((1,), np.uint64, shm.buf)
+        if header[0] != sequence:
+            return None
+        array = np.ndarray(shape, dtype, shm.buf, _HEADER_SIZE).copy()
+        return array if header[0] == sequence else None
+    finally:
+        # The views on the buffer must be released before closing.
+        del header
+        shm.close()
+
+
+class ArraySummary(object):
+    """Compact description of a large array sent in place of the array.
+
+    Attributes
+    ----------
+    shape : tuple
+        Shape of the array.
+
+    dtype : str
+        Description of the array dtype.
+
+    min, max, mean :
+        Statistics of the array, None if they cannot be computed (non
+        numerical dtype).
+
+    preview : np.ndarray
+        Array decimated so that it has at most ARRAY_PREVIEW_SIZE points
+        along each dimension.
+
+    shm_name : str
+        Name of the shared memory block holding the full array, None if the
+        full array is not available.
+
+    sequence : int
+        Sequence number identifying the values of the shared memory block
+        matching this summary.
+
+    """
+    __slots__ = ('shape', 'dtype', 'min', 'max', 'mean', 'preview',
+                 'shm_name', 'sequence')
+
+    def __init__(self, array, shm_name=None, sequence=0):
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        try:
+            self.min = array.min()
+            self.max = array.max()
+            self.mean = array.mean()
+        except (TypeError, ValueError):
+            self.min = self.max = self.mean = None
+        steps = tuple(slice(None, None, -(-n // ARRAY_PREVIEW_SIZE) or 1)
+                      for n in array.shape)
+        self.preview = array[steps].copy()
+        self.shm_name = shm_name
+        self.sequence = sequence
+
+    def fetch(self):
+        """Get the full array from the shared memory.
+
+        Returns
+        -------
+        array : np.ndarray or None
+            Copy of the full array or None if it is not available anymore
+            (the block was released or overwritten by newer values).
+
+        """
+        if self.shm_name is None or shared_memory is None:
+            return None
+        try:
+            return _read_shared_memory(self.shm_name, self.shape,
+                                       np.dtype(self.dtype), self.sequence)
+        except OSError:
+            return None
+
+    def __str__(self):
+        stats = ''
+        if self.mean is not None:
+            stats = ', min={}, max={}, mean={}'.format(self.min, self.max,
+                                                       self.mean)
+        return 'array(shape={}, dtype={}{})'.format(self.shape, self.dtype,
+                                                    stats)
+
+    __repr__ = __str__
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+
+class SharedArrayStore(object):
+    """Publish arrays in shared memory blocks reused for a given entry.
+
+    Each entry alternates between two blocks, so that publishing new values
+    does not overwrite the ones referenced by the last summary. Each block
+    starts with the sequence number of the values it holds, which is
+    reported in the summaries to detect the values overwritten since.
+
+    The blocks remain available till they are replaced or the store is
+    closed, so that the last values of a measurement can still be fetched
+    once it is over. If the publishing process is killed, the blocks are
+    released by the resource tracker of multiprocessing.
+
+    """
+    def __init__(self):
+        self._blocks = {}
+        self._sequence = 0
+
+    def publish(self, entry, array):
+        """Copy an array in a block associated with an entry.
+
+        Returns
+        -------
+        block : tuple or None
+            Name of the shared memory block and sequence number of the
+            values, or None if shared memory is not supported.
+
+        """
+        if shared_memory is None or array.dtype.hasobject:
+            return None
+        blocks = self._blocks.setdefault(entry, [None, None])
+        # Use the block which was not used last.
+        blocks.reverse()
+        block = blocks[0]
+        if block is None or block.size < array.nbytes + _HEADER_SIZE:
+            if block is not None:
+                self._release(block)
+            block = shared_memory.SharedMemory(create=True,
+                                               size=array.nbytes +
+                                               _HEADER_SIZE)
+            blocks[0] = block
+
+        self._sequence += 1
+        header = np.ndarray((1,), np.uint64, block.buf)
+        shared = np.ndarray(array.shape, array.dtype, block.buf, _HEADER_SIZE)
+        # Mark the values as invalid while they are being written.
+        header[0] = 0
+        shared[...] = array
+        header[0] = self._sequence
+        del header, shared
+        return block.name, self._sequence
+
+    def close(self):
+        """Release all the shared memory blocks.
+
+        """
+        for blocks in self._blocks.values():
+            for block in blocks:
+                if block is not None:
+                    self._release(block)
+        self._blocks = {}
+
+    @staticmethod
+    def _release(block):
+        """Close and unlink a block.
+
+        """
+        if os.name == 'posix':
+            # A reader sharing the resource tracker of this process (forked
+            # after it was started) unregistered the block when attaching to
+            # it, and registering is idempotent.
+            from multiprocessing import resource_tracker
+            resource_tracker.register('/' + block.name, 'shared_memory')
+        block.close()
+        block.unlink()
+
+
+def summarize_array(entry, array, store=None):
+    """Build the summary of an array, publishing it in a store if provided.
+
+    """
+    block = store.publish(entry, array) if store is not None else None
+    return ArraySummary(array, *(block or ()))
+
 
 class MeasureSpy(Atom):
     """Spy observing a task database and sending values update into a queue.
 
-    All updates are sent immediatly as no issues have been detected so far.
-    Using a timer based implementation would complicate things.
+    By default all updates are sent immediately. If a maximal rate is
+    specified, only the latest value of each entry is kept and the values are
+    sent periodically from a background thread, so that a fast loop does not
+    flood the queue with values the monitors would not display anyway.
+
+    Large arrays are sent as summaries, the full array being published in
+    shared memory if a store is provided.
 
     """
     #: Set of entries for which to send notifications.
@@ -37,14 +269,37 @@ class MeasureSpy(Atom):
     #: Queue in which to send the updates.
     queue = Typed(Queue)
 
-    def __init__(self, queue, observed_entries, observed_database):
+    #: Maximal rate (in Hz) at which the values are sent. If zero each update
+    #: is sent immediately.
+    max_rate = Float()
+
+    #: Number of updates which were replaced by a newer value before being
+    #: sent.
+    dropped = Int()
+
+    #: Arrays with more elements than this threshold are sent as summaries
+    #: (see ArraySummary). If zero the arrays are always sent as is.
+    array_threshold = Int(ARRAY_SUMMARY_THRESHOLD)
+
+    #: Store in which to publish the full arrays when sending summaries.
+    array_store = Typed(SharedArrayStore)
+
+    def __init__(self, queue, observed_entries, observed_database,
+                 max_rate=0, array_store=None):
         super(MeasureSpy, self).__init__(queue=queue,
                                          observed_database=observed_database,
-                                         observed_entries=observed_entries)
+                                         observed_entries=observed_entries,
+                                         max_rate=max_rate,
+                                         array_store=array_store)
+        if self.max_rate > 0:
+            self._flush_thread = Thread(target=self._flush_periodically,
+                                        name='exopy.MeasureSpyFlush')
+            self._flush_thread.daemon = True
+            self._flush_thread.start()
         self.observed_database.observe('notifier', self.enqueue_update)
 
     def enqueue_update(self, change):
-        """Put an update in the queue.
+        """Put an update in the queue or keep it till the next flush.
 
         Notes
         -----
@@ -52,20 +307,83 @@ class MeasureSpy(Atom):
 
         """
         if change[0] in self.observed_entries:
+            if self._flush_thread is None:
+                self._put(change)
+            else:
+                with self._lock:
+                    if change[0] in self._pending:
+                        self.dropped += 1
+                    self._pending[change[0]] = change[1]
+
+    def flush(self):
+        """Send the latest value of the entries updated since the last flush.
+
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for change in pending.items():
+            self._put(change)
+
+    def close(self):
+        """Send the last values and put a dummy object signaling that no more
+        updates will be sent.
+
+        """
+        if self._flush_thread is not None:
+            self._closing.set()
+            self._flush_thread.join()
+            self.flush()
+            if self.dropped:
+                logger = logging.getLogger(__name__)
+                logger.debug('%d monitored updates were not sent as they '
+                             'were superseded', self.dropped)
+        self.queue.put(('', ''))
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Latest values of the entries updated since the last flush.
+    _pending = Dict()
+
+    #: Lock protecting the access to the pending values.
+    _lock = Value(factory=Lock)
+
+    #: Thread periodically flushing the pending values.
+    _flush_thread = Typed(Thread)
+
+    #: Event signaling the flushing thread it should exit.
+    _closing = Value(factory=Event)
+
+    def _put(self, change):
+        """Put an update in the queue.
+
+        """
+        entry, value = change
+        if (self.array_threshold and isinstance(value, np.ndarray) and
+                value.size > self.array_threshold):
             try:
-                # Ensure pickling is ok at the cost of a small overhead
-                dumps(change)
-                self.queue.put(change)
+                change = (entry, summarize_array(entry, value,
+                                                 self.array_store))
             except Exception:
                 logger = logging.getLogger(__name__)
-                logger.error('Failed to enqueue %s :\n%s' % (change,
-                                                             format_exc()))
+                logger.error('Failed to summarize %s :\n%s' % (entry,
+                                                               format_exc()))
+                return
+        try:
+            self.queue.put(change)
+        except Exception:
+            logger = logging.getLogger(__name__)
+            logger.error('Failed to enqueue %s :\n%s' % (change,
+                                                         format_exc()))
 
-    def close(self):
-        """Put a dummy object signaling that no more updates will be sent.
+    def _flush_periodically(self):
+        """Flush the pending values till the spy is closed.
 
         """
-        self.queue.put(('', ''))
+        period = 1/self.max_rate
+        while not self._closing.wait(period):
+            self.flush()
 
 
 class ThreadMeasureMonitor(Thread):
@@ -100,3 +418,76 @@ class ThreadMeasureMonitor(Thread):
                 logger = logging.getLogger(__name__)
                 logger.error('Failed to received enqueued object :\n' +
                              format_exc())
+
+
+def exit_on_terminate():
+    """Turn the termination of the current process into a SystemExit.
+
+    A terminated process otherwise exits without any cleanup, leaving behind
+    the processes it started (which are only terminated by multiprocessing
+    when their parent exits normally), its instruments connections and its
+    shared memory blocks. Must be called from the main thread.
+
+    """
+    def raise_exit(signum, frame):
+        # Ignore further requests while cleaning up.
+        signal.signal(signum, signal.SIG_IGN)
+        raise SystemExit(1)
+
+    signal.signal(signal.SIGTERM, raise_exit)
+    # The processes forked afterwards (such as the workers of a pool) are
+    # simply terminated. They restore the default handling when created as
+    # the inherited handler only runs once the interpreter regains control.
+    os.register_at_fork(after_in_child=_default_termination)
+
+
+def _default_termination():
+    """Restore the default handling of the termination signal.
+
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def terminate_process(process, timeout=TERMINATION_TIMEOUT):
+    """Terminate a process and wait for it to exit.
+
+    The process is killed if it does not exit within the timeout.
+
+    """
+    process.terminate()
+    process.join(timeout)
+    if process.is_alive() and hasattr(signal, 'SIGKILL'):
+        logger = logging.getLogger(__name__)
+        logger.warning('%s did not exit in time after being terminated, '
+                       'killing it', process.name)
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+
+
+#: Processes to terminate if they are still running when the application
+#: exits.
+_STOP_AT_EXIT = WeakSet()
+
+
+def stop_at_exit(process):
+    """Terminate a non-daemonic process if it still runs at exit.
+
+    The processes executing the measurements are not daemonic as daemonic
+    processes cannot start processes of their own. Multiprocessing would hence
+    wait for them to exit before letting the application exit.
+
+    """
+    _STOP_AT_EXIT.add(process)
+
+
+# Handlers registered with atexit are called in reverse order. As
+# multiprocessing.util is imported above, this is called before
+# multiprocessing waits for the non-daemonic processes.
+@atexit.register
+def _stop_processes():
+    """Terminate the processes registered with stop_at_exit.
+
+    """
+    for process in list(_STOP_AT_EXIT):
+        if process.is_alive():
+            terminate_process(process)
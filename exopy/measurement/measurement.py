@@ -67,6 +67,29 @@ class MeasurementDependencies(Atom):
         if self._runtime_dependencies:
             return True, '', {}
 
+        res = self.analyse_runtimes()
+        if not res[0]:
+            return res
+
+        return self._collect_analysed_runtimes()
+
+    def analyse_runtimes(self):
+        """Analyse the runtime dependencies of the main task and the hooks.
+
+        The analysis is cached and used when collecting the runtimes.
+
+        Returns
+        -------
+        result : bool
+            Boolean indicating whether or not the analysis succeeded.
+
+        msg : str
+            String explaning why the operation failed if it failed.
+
+        errors : dict
+            Dictionary describing in details the errors.
+
+        """
         res = self._analyse_task_runtime(self.measurement.root_task)
         if not res[0]:
             return res
@@ -89,7 +112,19 @@ class MeasurementDependencies(Atom):
                 self._runtime_map[h_id] = deps.dependencies
                 self._update_runtime_analysis(deps.dependencies)
 
-        return self._collect_analysed_runtimes()
+        return True, '', {}
+
+    def get_runtime_analysis(self):
+        """Get the runtime dependencies found by analyse_runtimes.
+
+        Returns
+        -------
+        analysis : dict
+            Mapping between the runtime dependencies ids and the set of
+            dependencies required by the measurement.
+
+        """
+        return {k: set(v) for k, v in self._runtime_analysis.items()}
 
     def collect_task_runtimes(self, task):
         """Collect all the runtime needed to execute a single task.
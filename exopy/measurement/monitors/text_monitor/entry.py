@@ -9,6 +9,8 @@
 """Entries that can be displayed by the text monitor.
 
 """
+from threading import current_thread, main_thread
+
 from atom.api import (Str, List)
 from enaml.application import deferred_call
 
@@ -38,8 +40,14 @@ class MonitoredEntry(HasPrefAtom):
         """ Method updating the value of the entry given the current state of
         the database.
 
+        The value is set directly if called from the main thread and through
+        a deferred call otherwise.
+
         """
         # TODO :  handle evaluation delimited by $. Imply a try except
         vals = {d: database_vals[d] for d in self.depend_on}
         new_val = self.formatting.format(**vals)
-        deferred_call(setattr, self, 'value', new_val)
+        if current_thread() is main_thread():
+            self.value = new_val
+        else:
+            deferred_call(setattr, self, 'value', new_val)
@@ -12,9 +12,12 @@
 import os
 from ast import literal_eval
 from textwrap import fill
+from threading import Lock
+from time import monotonic
 
 import enaml
-from atom.api import (List, Dict, ForwardTyped, Property, Value)
+from atom.api import (List, Dict, ForwardTyped, Property, Value, Float, Bool)
+from enaml.application import timed_call
 
 from ..base_monitor import BaseMonitor
 from .entry import MonitoredEntry
@@ -63,16 +66,35 @@ class TextMonitor(BaseMonitor):
     #: List of all the known database entries.
     known_monitored_entries = Property()
 
+    #: Maximal rate (in Hz) at which the displayed values are refreshed. The
+    #: entries whose dependencies changed are updated together in a single
+    #: call in the main thread. If zero, the entries are updated for each
+    #: news.
+    refresh_rate = Float(20)
+
     def process_news(self, news):
-        """Handle a news by calling every related entrt updater.
+        """Handle a news by marking the related entries for update.
 
         """
         key, value = news
-        values = self._database_values
-        values[key] = value
-        if key in self.updaters:
-            for updater in self.updaters[key]:
-                updater(values)
+        with self._refresh_lock:
+            values = self._database_values
+            values[key] = value
+            if key not in self.updaters:
+                return
+
+            if self.refresh_rate <= 0:
+                for updater in self.updaters[key]:
+                    updater(values)
+                return
+
+            self._dirty_updaters.update(self.updaters[key])
+            if self._refresh_scheduled:
+                return
+            self._refresh_scheduled = True
+            delay = self._last_refresh + 1/self.refresh_rate - monotonic()
+
+        timed_call(max(int(delay*1000), 0), self._refresh_entries)
 
     def refresh_monitored_entries(self, entries=None):
         """Rebuild entries based on the rules and database entries.
@@ -451,6 +473,35 @@ class TextMonitor(BaseMonitor):
     #: linked to a measurement.
     _state = Value()
 
+    #: Updaters of the entries whose dependencies changed since the last
+    #: refresh.
+    _dirty_updaters = Value(factory=set)
+
+    #: Whether a refresh of the entries is scheduled.
+    _refresh_scheduled = Bool()
+
+    #: Time at which the entries were last refreshed.
+    _last_refresh = Float()
+
+    #: Lock protecting the pending updates as the news are received in a
+    #: thread different from the main one.
+    _refresh_lock = Value(factory=Lock)
+
+    def _refresh_entries(self):
+        """Update the entries whose dependencies changed.
+
+        This is executed in the main thread.
+
+        """
+        with self._refresh_lock:
+            updaters, self._dirty_updaters = self._dirty_updaters, set()
+            values = dict(self._database_values)
+            self._refresh_scheduled = False
+            self._last_refresh = monotonic()
+
+        for updater in updaters:
+            updater(values)
+
     @staticmethod
     def _create_default_entry(entry_path, value):
         """ Create a monitor entry for a database entry.
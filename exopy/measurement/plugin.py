@@ -13,7 +13,8 @@ import logging
 import os
 from functools import partial
 
-from atom.api import Typed, Str, List, ForwardTyped, Enum, Bool, Dict
+from atom.api import (Typed, Str, List, ForwardTyped, Enum, Bool, Dict,
+                      Float, Int)
 
 from ..utils.plugin_tools import (HasPreferencesPlugin, ExtensionsCollector,
                                   make_extension_validator)
@@ -96,6 +97,17 @@ class MeasurementPlugin(HasPreferencesPlugin):
     #: What to do of the engine when there is no more measurement to perform.
     engine_policy = Enum('stop', 'sleep').tag(pref=True)
 
+    #: Time (in s) during which the engine can keep the connections to the
+    #: instruments open after a measurement so that the next measurement can
+    #: reuse them. Zero (the default) disables this behavior.
+    connections_timeout = Float().tag(pref=True)
+
+    #: Maximal number of enqueued measurements which can be run concurrently
+    #: (each using its own engine). Only measurements using distinct
+    #: instruments are run concurrently. Connections are never kept open
+    #: between measurements when using more than one worker.
+    workers = Int(1).tag(pref=True)
+
     #: List of currently available pre-execution hooks.
     pre_hooks = List()
 
@@ -213,11 +225,12 @@ class MeasurementPlugin(HasPreferencesPlugin):
         """Stop the plugin and remove all observers.
 
         """
-        # Close the monitors window.
-        if self.processor.monitors_window:
-            self.processor.monitors_window.hide()
-            self.processor.monitors_window.close()
-            self.processor.monitors_window = None
+        # Close the monitors windows.
+        for processor in [self.processor] + list(self.processor.workers):
+            if processor.monitors_window:
+                processor.monitors_window.hide()
+                processor.monitors_window.close()
+                processor.monitors_window = None
 
         for contrib in ('engines', 'editors', 'pre_hooks', 'monitors',
                         'post_hooks'):
@@ -366,6 +379,7 @@ class MeasurementPlugin(HasPreferencesPlugin):
         """
         # Destroy old instance if any.
         self.processor.engine = None
+        self.processor.workers = []
 
         if old in self.engines:
             engine = self._engines.contributions[old]
@@ -16,22 +16,27 @@ handling of the monitors, ...)
 import os
 import logging
 from time import sleep
-from threading import Thread, RLock
+from threading import Thread, RLock, Condition, current_thread
 
 import enaml
-from atom.api import Atom, Typed, ForwardTyped, Value, Bool
+from atom.api import Atom, Typed, ForwardTyped, Value, Bool, List, Dict
 from enaml.widgets.api import Window
 from enaml.layout.api import InsertTab, FloatItem
 from enaml.application import deferred_call, schedule
 
 from .engines.api import BaseEngine, ExecutionInfos
 from .measurement import Measurement
+from ..tasks.tasks.instr_task import PROFILE_DEPENDENCY_ID
 from ..utils.flags import BitFlag
 from ..utils.traceback import format_exc
 
 
 logger = logging.getLogger(__name__)
 
+#: Id of the instrument user holding the profiles whose connections are kept
+#: open by the engine between two measurements.
+POOLED_CONNECTIONS_USER = 'exopy.measurement.connections'
+
 
 def plugin():
     """Delayed import to avoid circular references.
@@ -41,6 +46,29 @@ def plugin():
     return MeasurementPlugin
 
 
+def measurement_profiles(measurement):
+    """List the instrument profiles a measurement needs.
+
+    Parameters
+    ----------
+    measurement : Measurement
+        Measurement whose runtime dependencies should be analysed.
+
+    Returns
+    -------
+    profiles : set
+        Ids of the instrument profiles used by the main task or the hooks. If
+        the analysis fails, the set is empty as the measurement will fail
+        before trying to access any instrument.
+
+    """
+    deps = measurement.dependencies
+    res, _, _ = deps.analyse_runtimes()
+    if not res:
+        return set()
+    return deps.get_runtime_analysis().get(PROFILE_DEPENDENCY_ID, set())
+
+
 def schedule_and_block(func, args=(), kwargs={}, priority=100):
     """Schedule a function call on the main thread and wait for it to complete.
 
@@ -72,6 +100,11 @@ class MeasurementProcessor(Atom):
     #: Monitors window
     monitors_window = Typed(Window)
 
+    #: Processors running measurements concurrently with this one. They are
+    #: used only when processing the queue if the plugin allows more than one
+    #: worker.
+    workers = List()
+
     def start_measurement(self, measurement):
         """Start a new measurement.
 
@@ -93,6 +126,10 @@ class MeasurementProcessor(Atom):
         else:
             self._state.clear('continuous_processing')
 
+        if not self._dispatcher:
+            self._concurrent = (self.continuous_processing and
+                                self.plugin.workers > 1)
+
         deferred_call(setattr, self, 'active', True)
         self._thread = Thread(target=self._run_measurements,
                               args=(measurement,))
@@ -167,6 +204,33 @@ class MeasurementProcessor(Atom):
             if self._active_hook:
                 self._active_hook.stop(force)
 
+        for worker in self.workers:
+            if worker._is_busy():
+                worker.stop_processing(no_post_exec, force)
+
+    def release_pooled_profiles(self, profiles):
+        """Release the profiles whose connections are kept open by the engine.
+
+        The connections are closed, save if the profiles are requested by the
+        measurement about to be run, as it will then reuse them.
+
+        Parameters
+        ----------
+        profiles : iterable
+            Ids of the profiles to release.
+
+        Returns
+        -------
+        released : list
+            Ids of the released profiles.
+
+        """
+        if self.engine and current_thread() is not self._thread:
+            self.engine.close_connections(profiles)
+        self._pooled_profiles = [p for p in self._pooled_profiles
+                                 if p not in profiles]
+        return list(profiles)
+
     # =========================================================================
     # --- Private API ---------------------------------------------------------
     # =========================================================================
@@ -174,6 +238,9 @@ class MeasurementProcessor(Atom):
     #: Background thread handling the measurement execution
     _thread = Value()
 
+    #: Profiles held on behalf of the engine to keep their connections open.
+    _pooled_profiles = List()
+
     #: Internal flags used to keep track of the execution state.
     _state = Typed(BitFlag,
                    (('processing', 'running_pre_hooks', 'running_main',
@@ -189,6 +256,20 @@ class MeasurementProcessor(Atom):
     #: Lock to avoid race condition when pausing.
     _lock = Value(factory=RLock)
 
+    #: Processor which started this one as a worker.
+    _dispatcher = ForwardTyped(lambda: MeasurementProcessor)
+
+    #: Whether the measurements are run concurrently by several processors.
+    _concurrent = Bool()
+
+    #: Instrument profiles used by the measurements currently run by the
+    #: processor and its workers, keyed by measurement.
+    _claimed = Dict()
+
+    #: Condition protecting the claimed measurements and serializing the
+    #: collection of the runtime dependencies between the processors.
+    _dispatch = Value(factory=Condition)
+
     def _run_measurements(self, measurement):
         """Run measurements (either all enqueued or only one)
 
@@ -222,8 +303,20 @@ class MeasurementProcessor(Atom):
             if measurement:
                 meas = measurement
                 measurement = None
+                if self._concurrent and not self._dispatcher:
+                    self._claim_measurement(meas)
             else:
-                meas = self.plugin.find_next_measurement()
+                meas = self._find_next_measurement()
+                # The remaining measurements may be waiting for the
+                # instruments used by the workers.
+                while (meas is None and self._concurrent and
+                        not self._dispatcher and self._wait_for_workers()):
+                    meas = self._find_next_measurement()
+
+            # Let idle workers run the measurements which do not use the
+            # same instruments.
+            if meas is not None and self._concurrent and not self._dispatcher:
+                self._dispatch_measurements()
 
             # If there is a measurement register it as the running one, update
             # its status and log its execution.
@@ -239,7 +332,9 @@ class MeasurementProcessor(Atom):
 
                 status, infos = self._run_measurement(meas)
                 # Release runtime dependencies.
-                meas.dependencies.release_runtimes()
+                with (self._dispatcher or self)._dispatch:
+                    meas.dependencies.release_runtimes()
+                self._hold_pooled_profiles()
 
             # If no measurement remains stop.
             else:
@@ -253,6 +348,8 @@ class MeasurementProcessor(Atom):
 
             # Update the status and infos.
             self._set_measurement_state(status, infos, clear=True)
+            if self._concurrent:
+                (self._dispatcher or self)._release_measurement(meas)
 
             # If we are supposed to stop, stop.
             if (not self._state.test('continuous_processing') or
@@ -262,6 +359,14 @@ class MeasurementProcessor(Atom):
         if self.engine and self.plugin.engine_policy == 'stop':
             self._stop_engine()
 
+        if self._dispatcher:
+            with self._dispatcher._dispatch:
+                self._dispatcher._dispatch.notify_all()
+        else:
+            for worker in self.workers:
+                if worker._thread:
+                    worker._thread.join()
+
         self._state.clear('processing')
         deferred_call(setattr, self, 'active', False)
 
@@ -275,7 +380,8 @@ class MeasurementProcessor(Atom):
         meas_id = measurement.name + '_' + measurement.id
 
         # Collect runtime dependencies
-        res, msg, errors = measurement.dependencies.collect_runtimes()
+        with (self._dispatcher or self)._dispatch:
+            res, msg, errors = measurement.dependencies.collect_runtimes()
         if not res:
             status = 'SKIPPED' if 'unavailable' in msg else 'FAILED'
             return status, msg + '\n' + errors_to_msg(errors)
@@ -325,6 +431,8 @@ class MeasurementProcessor(Atom):
                 runtime_deps=deps.get_runtime_dependencies('main'),
                 observed_entries=measurement.collect_monitored_entries(),
                 checks=not measurement.forced_enqueued,
+                connections_timeout=(0 if self._concurrent else
+                                     self.plugin.connections_timeout),
                 )
 
             # Ask the engine to perform the main task.
@@ -647,6 +755,132 @@ class MeasurementProcessor(Atom):
             if i > 10:
                 engine.shutdown(force=True)
 
+        # The connections are closed along with the engine.
+        self._hold_pooled_profiles()
+
+    def _hold_pooled_profiles(self):
+        """Hold the profiles whose connections the engine kept open.
+
+        The profiles previously held are released and the profiles which
+        cannot be acquired have their connections closed.
+
+        """
+        core = self.plugin.workbench.get_plugin('enaml.workbench.core')
+        if self._pooled_profiles:
+            core.invoke_command('exopy.instruments.release_profiles',
+                                {'user_id': POOLED_CONNECTIONS_USER,
+                                 'profiles': self._pooled_profiles})
+            self._pooled_profiles = []
+
+        engine = self.engine
+        if engine and engine.pooled_profiles:
+            profiles, unavailable = core.invoke_command(
+                'exopy.instruments.get_profiles',
+                {'user_id': POOLED_CONNECTIONS_USER,
+                 'profiles': list(engine.pooled_profiles),
+                 'try_release': False, 'partial': True})
+            self._pooled_profiles = list(profiles)
+            if unavailable:
+                engine.close_connections(unavailable)
+
+    def _find_next_measurement(self):
+        """Find the next measurement to run.
+
+        When running measurements concurrently, the measurement is reserved
+        so that no other processor runs it.
+
+        """
+        if not self._concurrent:
+            return self.plugin.find_next_measurement()
+        return (self._dispatcher or self)._claim_measurement()
+
+    def _claim_measurement(self, measurement=None):
+        """Reserve a measurement not using the instruments of the running
+        measurements.
+
+        Enqueued measurements using the same instruments as a measurement
+        located before them in the queue are never selected so that they are
+        run in the queue order.
+
+        Parameters
+        ----------
+        measurement : Measurement, optional
+            Measurement to reserve. If None, the first suitable measurement of
+            the queue is reserved.
+
+        Returns
+        -------
+        measurement : Measurement|None
+            Reserved measurement or None if no measurement can be run.
+
+        """
+        with self._dispatch:
+            if measurement is not None:
+                self._claimed[measurement] = measurement_profiles(measurement)
+                return measurement
+
+            busy = set().union(*self._claimed.values())
+            for meas in self.plugin.enqueued_measurements.measurements:
+                if meas.status != 'READY' or meas in self._claimed:
+                    continue
+                profiles = measurement_profiles(meas)
+                if not profiles & busy:
+                    self._claimed[meas] = profiles
+                    return meas
+                busy |= profiles
+
+        return None
+
+    def _release_measurement(self, measurement):
+        """Release a measurement reserved by _claim_measurement.
+
+        """
+        with self._dispatch:
+            self._claimed.pop(measurement, None)
+            self._dispatch.notify_all()
+
+    def _dispatch_measurements(self):
+        """Start the idle workers on the measurements which can be run
+        concurrently with the running ones.
+
+        """
+        with self._dispatch:
+            while len(self.workers) < self.plugin.workers - 1:
+                self.workers.append(MeasurementProcessor(plugin=self.plugin,
+                                                         _dispatcher=self))
+
+            for worker in self.workers:
+                if worker._is_busy():
+                    continue
+                meas = self._claim_measurement()
+                if meas is None:
+                    break
+                worker._concurrent = True
+                worker.continuous_processing = self.continuous_processing
+                worker.start_measurement(meas)
+
+    def _wait_for_workers(self):
+        """Wait for a worker to complete a measurement.
+
+        Returns
+        -------
+        waited : bool
+            False if no worker is running or if the processing should stop.
+
+        """
+        with self._dispatch:
+            if (self._state.test('stop_processing') or
+                    not any(w._is_busy() for w in self.workers)):
+                return False
+            self._dispatch.wait(0.5)
+        return True
+
+    def _is_busy(self):
+        """Check whether the processor thread is running.
+
+        """
+        return bool(self._thread and self._thread.is_alive())
+
     def _clear_state(self):
         """Clear the state when starting while preserving persistent settings.
 
@@ -665,6 +899,9 @@ class MeasurementProcessor(Atom):
         else:
             self._state.clear('continuous_processing')
 
+        for worker in self.workers:
+            worker.continuous_processing = new
+
 
 def errors_to_msg(errors):
     """Convert a dictionary of errors in a well formatted message.
@@ -23,6 +23,8 @@ from copy import deepcopy
 from types import MethodType
 from cProfile import Profile
 from operator import attrgetter
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
 
 from atom.api import (Atom, Int, Bool, Value, Str, List,
                       ForwardTyped, Typed, Callable, Dict, Signal,
@@ -33,12 +35,15 @@ from ...utils.traceback import format_exc
 from ...utils.atom_util import (tagged_members, member_to_pref,
                                 update_members_from_preferences)
 from ...utils.container_change import ContainerChange
+from ...instruments.tracing import IOTracer, format_summary
 from .database import TaskDatabase
-from .decorators import (make_parallel, make_wait, make_stoppable,
-                         smooth_crash)
+from .decorators import (make_parallel, make_offloaded, make_wait,
+                         make_stoppable, smooth_crash, handle_stop_pause)
 from .string_evaluation import safe_eval
 from .shared_resources import (SharedCounter, ThreadPoolResource,
-                               InstrsResource, FilesResource)
+                               ProcessHelpersResource, ProcessPoolsResource,
+                               ThreadExecutorsResource, InstrsResource,
+                               FilesResource)
 from . import validators
 
 #: Prefix for placeholders in string formatting and evaluation.
@@ -49,6 +54,48 @@ PREFIX = '_a'
 DEP_TYPE = 'exopy.task'
 
 
+def find_referenced_entries(strings):
+    """List the database entries referenced in strings.
+
+    Parameters
+    ----------
+    strings : iterable(str)
+        Strings to inspect.
+
+    Returns
+    -------
+    entries : set(str)
+        Names of the entries appearing between {} in the strings.
+
+    """
+    entries = set()
+    for string in strings:
+        elements = [el for aux in string.split('{') for el in aux.split('}')]
+        entries.update(elements[1::2])
+    return entries
+
+
+def list_referenced_entries(obj):
+    """List the database entries referenced in the members of an object
+    tagged with 'fmt' or 'feval'.
+
+    Parameters
+    ----------
+    obj : Atom
+        Task or interface whose members should be inspected.
+
+    Returns
+    -------
+    entries : set(str)
+        Names of the entries referenced in the members values.
+
+    """
+    members = chain(tagged_members(obj, 'fmt'), tagged_members(obj, 'feval'))
+    return find_referenced_entries(v for v in (getattr(obj, m)
+                                               for m in members)
+                                   if isinstance(v, str))
+
+
 class BaseTask(Atom):
     """Base  class defining common members of all Tasks.
 
@@ -109,16 +156,28 @@ class BaseTask(Atom):
     stoppable = Bool(True).tag(pref=True)
 
     #: Dictionary indicating whether the task is executed in parallel
-    #: ('activated' key) and which is pool it belongs to ('pool' key).
+    #: ('activated' key) and which is pool it belongs to ('pool' key). A
+    #: parallel task can also perform its job in a helper process ('process'
+    #: key) to avoid competing with other tasks for the GIL.
     parallel = Dict(Str()).tag(pref=True)
 
     #: Dictionary indicating whether the task should wait on any pool before
-    #: performing its job. Three valid keys can be used :
+    #: performing its job. Four valid keys can be used :
     #: - 'activated' : a bool indicating whether or not to wait.
     #: - 'wait' : the list should then specify which pool should be waited.
     #: - 'no_wait' : the list should specify which pool not to wait on.
+    #: - 'auto' : a bool indicating whether to wait only on the tasks which
+    #:   may write an entry read by this task (see list_read_entries).
     wait = Dict(Str()).tag(pref=True)
 
+    #: Class attribute marking the task as having no effect beyond the
+    #: database entries it reads and writes and the instrument profile it
+    #: uses. Only such tasks can be run concurrently by a ComplexTask in
+    #: auto_parallel mode, the others (waiting, accessing hardware by other
+    #: means, ...) are performed alone. The flag is not inherited : each class
+    #: has to set it after checking its own perform method.
+    concurrency_safe = False
+
     #: Dict of access exception in the database. This should not be manipulated
     #: by user code.
     access_exs = Dict().tag(pref=True)
@@ -180,16 +239,22 @@ class BaseTask(Atom):
         (no link to database).
 
         """
-        perform_func = self.perform.__func__
+        perform_func = self._build_perform()
         parallel = self.parallel
         if parallel.get('activated') and parallel.get('pool'):
-            perform_func = make_parallel(perform_func, parallel['pool'])
+            if parallel.get('process'):
+                perform_func = make_offloaded(perform_func)
+            perform_func = make_parallel(perform_func, parallel['pool'],
+                                         self._list_subtree_written_entries())
 
         wait = self.wait
         if wait.get('activated'):
+            read = (frozenset(self.list_read_entries()) if wait.get('auto')
+                    else None)
             perform_func = make_wait(perform_func,
                                      wait.get('wait'),
-                                     wait.get('no_wait'))
+                                     wait.get('no_wait'),
+                                     read)
 
         if self.stoppable:
             perform_func = make_stoppable(perform_func)
@@ -239,6 +304,36 @@ class BaseTask(Atom):
         """
         yield self
 
+    def list_written_entries(self):
+        """List the database entries the task may write during the execution.
+
+        Entries not listed by any task are considered constant during the
+        execution and strings depending only on them are formatted or
+        evaluated only once. By default all the declared entries are listed.
+
+        Returns
+        -------
+        entries : list(str)
+            Simple names of the entries, ie without the task name.
+
+        """
+        return list(self.database_entries)
+
+    def list_read_entries(self):
+        """List the database entries the task may read during the execution.
+
+        This is used to know which values to transfer when the task is
+        performed in another process. By default all the entries referenced in
+        the members tagged with 'fmt' or 'feval' are listed.
+
+        Returns
+        -------
+        entries : set(str)
+            Full names of the entries, as they appear in the formulas.
+
+        """
+        return list_referenced_entries(self)
+
     def register_in_database(self):
         """ Register the task entries into the database.
 
@@ -403,6 +498,10 @@ class BaseTask(Atom):
         # If a cache evaluation of the string already exists use it.
         if string in self._format_cache:
             preformatted, ids = self._format_cache[string]
+            # The string depends only on constant entries and is already
+            # formatted.
+            if ids is None:
+                return preformatted
             vals = self.database.get_values_by_index(ids, PREFIX)
             return preformatted.format(**vals)
 
@@ -426,9 +525,13 @@ class BaseTask(Atom):
                         str_to_format += elements[i]
 
                 indexes = database_indexes.values()
-                self._format_cache[string] = (str_to_format, indexes)
                 vals = self.database.get_values_by_index(indexes, PREFIX)
-                return str_to_format.format(**vals)
+                formatted = str_to_format.format(**vals)
+                if database.are_constant(indexes):
+                    self._format_cache[string] = (formatted, None)
+                else:
+                    self._format_cache[string] = (str_to_format, indexes)
+                return formatted
             else:
                 self._format_cache[string] = (string, [])
                 return string
@@ -493,6 +596,9 @@ class BaseTask(Atom):
                     else:
                         str_to_eval += elements[i]
 
+                # The result of the evaluation is never cached as the
+                # expression may not be deterministic (random numbers, time,
+                # ...) even when all the entries it uses are constant.
                 indexes = database_indexes.values()
                 self._eval_cache[string] = (str_to_eval, indexes)
                 vals = self.database.get_values_by_index(indexes, PREFIX)
@@ -552,6 +658,22 @@ class BaseTask(Atom):
         pack, _ = self.__module__.split('.', 1)
         return pack + '.' + type(self).__name__
 
+    def _build_perform(self):
+        """Build the function on top of which the execution wrappers are
+        applied when preparing the task.
+
+        """
+        return self.perform.__func__
+
+    def _list_subtree_written_entries(self):
+        """List the full names of the entries written by the task and its
+        descendants.
+
+        """
+        return frozenset(t._task_entry(e) for t in self.traverse()
+                         if isinstance(t, BaseTask)
+                         for e in t.list_written_entries())
+
     def _post_setattr_database_entries(self, old, new):
         """Update the database content each time the database entries change.
 
@@ -673,12 +795,22 @@ class ComplexTask(BaseTask):
     #: editors to correctly track all of those.
     children_changed = Signal().tag(child_notifier='children')
 
+    #: Whether to run concurrently the consecutive children which do not
+    #: depend on one another. Two children conflict if one may write a
+    #: database entry the other reads or writes, if they use the same
+    #: instrument profile or if one relies on the parallel/wait settings.
+    #: Children containing tasks which are not concurrency_safe are always
+    #: performed alone. All children are completed before the task returns.
+    auto_parallel = Bool().tag(pref=True)
+
+    #: The effects of a complex task are those of its children.
+    concurrency_safe = True
+
     def perform(self):
-        """Run sequentially all child tasks.
+        """Run all child tasks.
 
         """
-        for child in self.children:
-            child.perform_()
+        self._perform_children()
 
     def check(self, *args, **kwargs):
         """Run test of all child tasks.
@@ -705,6 +837,9 @@ class ComplexTask(BaseTask):
         for child in self.gather_children():
             child.prepare()
 
+        self._auto_batches = (self._build_auto_batches() if self.auto_parallel
+                              else [])
+
     def add_child_task(self, index, child):
         """Add a child task at the given index.
 
@@ -814,6 +949,15 @@ class ComplexTask(BaseTask):
 
         return children
 
+    def list_read_entries(self):
+        """Also list the entries read by the children.
+
+        """
+        entries = super(ComplexTask, self).list_read_entries()
+        for child in self.gather_children():
+            entries |= child.list_read_entries()
+        return entries
+
     def traverse(self, depth=-1):
         """Reimplemented to yield all child task.
 
@@ -976,6 +1120,106 @@ class ComplexTask(BaseTask):
     #: child disabled some access_exs.
     _disabled_exs = List()
 
+    #: Groups of consecutive children which can be performed concurrently.
+    #: Only used in running mode when auto_parallel is True.
+    _auto_batches = List()
+
+    def _perform_children(self):
+        """Perform all the children, concurrently if auto_parallel is set.
+
+        """
+        if not self._auto_batches:
+            for child in self.children:
+                child.perform_()
+            return
+
+        for batch in self._auto_batches:
+            if len(batch) == 1:
+                batch[0].perform_()
+            else:
+                self._perform_concurrently(batch)
+
+    def _perform_concurrently(self, batch):
+        """Perform a group of independent children concurrently.
+
+        The first child is performed in the current thread, the others in a
+        thread pool. Exceptions raised by the children are re-raised once all
+        of them are done.
+
+        """
+        root = self.root
+        executors = root.resources['executors']
+        key = self.path + '/' + self.name
+        executor = executors.get(key)
+        if executor is None:
+            size = max(len(b) for b in self._auto_batches) - 1
+            executor = ThreadPoolExecutor(
+                size, thread_name_prefix='exopy.TaskThread')
+            executors[key] = executor
+
+        counter = root.active_threads_counter
+
+        def perform_child(child):
+            try:
+                child.perform_()
+            finally:
+                counter.decrement()
+
+        futures = []
+        for child in batch[1:]:
+            counter.increment()
+            futures.append(executor.submit(perform_child, child))
+
+        try:
+            batch[0].perform_()
+        finally:
+            pending = futures
+            while pending:
+                # Keep handling pauses while waiting for the other children.
+                handle_stop_pause(root)
+                pending = wait_futures(pending, 0.05).not_done
+
+        for future in futures:
+            future.result()
+
+    def _build_auto_batches(self):
+        """Group the consecutive children which do not conflict.
+
+        """
+        batches = []
+        current = []
+        reads, writes, profiles = set(), set(), set()
+        for child in self.children:
+            c_reads = child.list_read_entries()
+            c_writes = child._list_subtree_written_entries()
+            c_profiles = {getattr(t, 'selected_instrument', ('',))[0]
+                          for t in child.traverse()} - {''}
+            alone = (child.parallel.get('activated') or
+                     child.wait.get('activated') or
+                     not all(type(t).__dict__.get('concurrency_safe', False)
+                             for t in child.traverse()
+                             if isinstance(t, BaseTask)))
+            if current and (alone or c_reads & writes or
+                            c_writes & (reads | writes) or
+                            c_profiles & profiles):
+                batches.append(current)
+                current = []
+                reads, writes, profiles = set(), set(), set()
+
+            current.append(child)
+            reads |= c_reads
+            writes |= c_writes
+            profiles |= c_profiles
+            if alone:
+                batches.append(current)
+                current = []
+                reads, writes, profiles = set(), set(), set()
+
+        if current:
+            batches.append(current)
+
+        return batches
+
     def _child_path(self):
         """Convenience function returning the path to set for child task.
 
@@ -1047,6 +1291,9 @@ class RootTask(ComplexTask):
     #: Should the execution be profiled.
     should_profile = Bool().tag(pref=True)
 
+    #: Should the communications with the instruments be traced.
+    should_trace_instruments = Bool().tag(pref=True)
+
     #: Dict storing data needed at execution time (ex: drivers classes)
     run_time = Dict()
 
@@ -1076,6 +1323,8 @@ class RootTask(ComplexTask):
     #:
     #: - threads : used threads grouped by pool.
     #: - active_threads : currently active threads.
+    #: - process_helpers : helper processes of offloaded tasks by task path.
+    #: - process_pools : worker processes of the loops by task path.
     #: - instrs : used instruments referenced by profiles.
     #: - files : currently opened files by path.
     #:
@@ -1137,15 +1386,13 @@ class RootTask(ComplexTask):
         result = True
         self.thread_id = threading.current_thread().ident
 
-        self.prepare()
-
         pr = Profile() if self.should_profile else None
 
         try:
+            self.prepare()
             if pr:
                 pr.enable()
-            for child in self.children:
-                child.perform_()
+            self._perform_children()
         except Exception:
             log = logging.getLogger(__name__)
             msg = 'The following unhandled exception occured :\n'
@@ -1161,6 +1408,9 @@ class RootTask(ComplexTask):
                 path = os.path.join(self.default_path,
                                     meas_name + '_' + meas_id + '.prof')
                 pr.dump_stats(path)
+            tracer = self.resources['instrs'].tracer
+            if tracer is not None:
+                self._dump_instruments_trace(tracer)
             self.release_resources()
 
         if self.should_stop.is_set():
@@ -1176,7 +1426,48 @@ class RootTask(ComplexTask):
         # forced-enqueueing) so we need to make sure we set the default path.
         self.write_in_database('default_path', self.default_path)
         self.database.prepare_to_run()
-        super().prepare()
+
+        # Identify the entries which can change during the execution so that
+        # formatting and evaluation relying only on constant entries is done
+        # once.
+        self.database.set_volatile_entries(
+            (task.path, task._task_entry(entry))
+            for task in self.traverse() if isinstance(task, BaseTask)
+            for entry in task.list_written_entries())
+
+        # Start the drivers once all tasks are prepared so that the
+        # connections to distinct instruments are opened concurrently.
+        instrs = self.resources['instrs']
+        instrs.tracer = IOTracer() if self.should_trace_instruments else None
+        with instrs.collect_starts():
+            super().prepare()
+
+        errors = instrs.start_deferred()
+        if errors:
+            for profile, tb in errors.items():
+                self.errors['instrument-' + profile] = tb
+            msg = 'Failed to start the driver of the instruments : %s'
+            raise RuntimeError(msg % ', '.join(sorted(errors)))
+
+    def list_written_entries(self):
+        """The default path is written only before entering running mode.
+
+        """
+        return []
+
+    def exit_running_state(self):
+        """Make the task hierarchy editable again after an execution.
+
+        This is only necessary when the hierarchy is executed in the process
+        in which it was edited.
+
+        """
+        self.database.exit_running_mode()
+        for task in self.traverse():
+            if isinstance(task, BaseTask):
+                task._format_cache = {}
+                task._eval_cache = {}
+        self.run_time = {}
 
     def release_resources(self):
         """Release all the resources used by tasks.
@@ -1279,6 +1570,22 @@ class RootTask(ComplexTask):
         if p_count == 0:
             self.paused.clear()
 
+    def _dump_instruments_trace(self, tracer):
+        """Log a summary of the communications with the instruments and write
+        the trace next to the measurement files.
+
+        """
+        log = logging.getLogger(__name__)
+        log.info(format_summary(tracer.summary()))
+        meas_name = self.get_from_database('meas_name')
+        meas_id = self.get_from_database('meas_id')
+        path = os.path.join(self.default_path,
+                            meas_name + '_' + meas_id + '.instr_trace.csv')
+        try:
+            tracer.flush(path)
+        except Exception:
+            log.exception('Failed to write the instruments trace to %s', path)
+
     def _default_resources(self):
         """Default resources.
 
@@ -1287,5 +1594,8 @@ class RootTask(ComplexTask):
                 # Reduce priority to stop through the thread resource.
                 # This is far less likely to cause a deadlock.
                 'active_threads': ThreadPoolResource(priority=0),
+                'process_helpers': ProcessHelpersResource(),
+                'process_pools': ProcessPoolsResource(),
+                'executors': ThreadExecutorsResource(),
                 'instrs': InstrsResource(),
                 'files': FilesResource()}
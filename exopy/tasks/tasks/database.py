@@ -296,6 +296,77 @@ class TaskDatabase(Atom):
         return {name: self._find_index(assumed_path, name)
                 for name in entries}
 
+    def copy_accessible_values(self, node_path):
+        """Copy the values of all the entries accessible from a node.
+
+        Only to be used in running mode.
+
+        Parameters
+        ----------
+        node_path : unicode
+            Path to the node from which accessible entries should be copied.
+
+        Returns
+        -------
+        copy : dict
+            Dictionary mapping the entries names to their current value. When
+            several entries share the same name, the one found in the closest
+            node wins (as in get_value).
+
+        """
+        values = {}
+        while True:
+            for path, index in self._entry_index_map.items():
+                node, _, entry = path.rpartition('/')
+                if node == node_path and entry not in values:
+                    values[entry] = self._flat_database[index]
+
+            if node_path == 'root':
+                break
+            node_path = node_path.rpartition('/')[0]
+
+        return values
+
+    def set_volatile_entries(self, entries):
+        """Declare the entries whose value can change during the execution.
+
+        All other entries are considered constant which allows the tasks to
+        format or evaluate only once the strings depending solely on them.
+        Before this method is called, no entry is considered constant. This
+        method can only be used in running mode.
+
+        Parameters
+        ----------
+        entries : iterable(tuple)
+            Pairs (assumed_path, entry) identifying the entries which may be
+            written during the execution.
+
+        """
+        if not self.running:
+            raise RuntimeError('Volatile entries can only be set in running '
+                               'mode')
+
+        self._volatile_indexes = {self._find_index(path, name)
+                                  for path, name in entries}
+
+    def are_constant(self, indexes):
+        """Check whether some entries keep their value during the execution.
+
+        Parameters
+        ----------
+        indexes : iterable(int)
+            Indexes of the entries in the flattened database.
+
+        Returns
+        -------
+        constant : bool
+            True if none of the entries can be written during the execution.
+            False if the volatile entries have not been declared.
+
+        """
+        volatile = self._volatile_indexes
+        return volatile is not None and volatile.isdisjoint(indexes)
+
     def list_accessible_entries(self, node_path):
         """Method used to get a list of all entries accessible from a node.
 
@@ -572,8 +643,27 @@ class TaskDatabase(Atom):
         self._flat_database = datas
         self._entry_index_map = mapping
 
+        self._edition_database = self._database
         self._database = None
 
+    def exit_running_mode(self):
+        """Leave the running state and restore the database as it was before
+        entering it.
+
+        This is used when a task hierarchy is executed in the process in which
+        it is edited.
+
+        """
+        if not self.running:
+            return
+
+        self._database = self._edition_database
+        self._edition_database = None
+        self._flat_database = []
+        self._entry_index_map = {}
+        self._volatile_indexes = None
+        self.running = False
+
     def list_nodes(self):
         """List all the nodes present in the database.
 
@@ -632,12 +722,20 @@ class TaskDatabase(Atom):
     #: issues.
     _flat_database = List()
 
+    #: Nodes of the database kept in running mode to be able to restore the
+    #: edition mode.
+    _edition_database = Typed(DatabaseNode)
+
     #: Dict mapping full paths to flat database indexes.
     _entry_index_map = Dict()
 
     #: Lock to make the database thread safe in running mode.
     _lock = Value()
 
+    #: Set of the flat database indexes which can be written during the
+    #: execution. None if they were not declared.
+    _volatile_indexes = Value()
+
     def _find_index(self, assumed_path, entry):
         """Find the index associated with a path.
 
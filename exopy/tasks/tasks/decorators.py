@@ -123,9 +123,14 @@ class ThreadDispatcher(Atom):
     #: Flag set when the thread is ready to accept new jobs.
     inactive = Value(factory=Event)
 
-    def __init__(self, perform, pool):
+    #: Full names of the database entries which can be written while the
+    #: thread is active. None if unknown.
+    written = Value()
+
+    def __init__(self, perform, pool, written=None):
         self._func = smooth_crash(perform)
         self._pool = pool
+        self.written = written
         self.inactive.set()
 
     def dispatch(self, task, *args, **kwargs):
@@ -137,7 +142,8 @@ class ThreadDispatcher(Atom):
             with pools.safe_access(self._pool) as threads:
                 threads.append(self)
             self._thread = Thread(group=None,
-                                  target=self._background_loop)
+                                  target=self._background_loop,
+                                  name='exopy.TaskThread')
             self._thread.start()
 
         # Make sure the background thread is done processing the previous work.
@@ -202,7 +208,7 @@ class ThreadDispatcher(Atom):
             task.root.active_threads_counter.decrement()
 
 
-def make_parallel(perform, pool):
+def make_parallel(perform, pool, written=None):
     """Machinery to execute perform in parallel.
 
     Create a wrapper around a method to execute it in a thread and register the
@@ -216,8 +222,13 @@ def make_parallel(perform, pool):
     pool : str
         Name of the execution pool to which the created thread belongs.
 
+    written : frozenset(str), optional
+        Full names of the database entries which can be written by the
+        method. Used by the tasks waiting only on the threads writing entries
+        they read.
+
     """
-    dispatcher = ThreadDispatcher(perform, pool)
+    dispatcher = ThreadDispatcher(perform, pool, written)
 
     def wrapper(*args, **kwargs):
         return dispatcher.dispatch(*args, **kwargs)
@@ -226,7 +237,69 @@ def make_parallel(perform, pool):
     return wrapper
 
 
-def make_wait(perform, wait, no_wait):
+def make_offloaded(perform):
+    """Machinery to execute perform in a helper process.
+
+    The helper process is created on the first call and persists till the
+    root task releases its resources. This is meant to be combined with
+    make_parallel so that the task remains a normal member of its pool.
+
+    Parameters
+    ----------
+    perform : method
+        Method which should be wrapped to run in a helper process. The task
+        is rebuilt from its preferences in the helper so the method itself is
+        not transferred.
+
+    """
+    # Avoid a circular import as offloading relies on the tasks.
+    from .offloading import TaskProcessHelper
+
+    def wrapper(obj, *args, **kwargs):
+        """Wrap function to perform the task in a helper process.
+
+        """
+        helpers = obj.root.resources['process_helpers']
+        key = obj.path + '/' + obj.name
+        helper = helpers.get(key)
+        if helper is None:
+            helper = TaskProcessHelper(obj)
+            helpers[key] = helper
+        return helper.perform(obj, *args, **kwargs)
+
+    update_wrapper(wrapper, perform)
+
+    return wrapper
+
+
+def make_instr_locked(perform, profile):
+    """Machinery to serialize the calls to perform accessing an instrument.
+
+    The lock is taken from the 'instrs' resource of the root task and is
+    shared by all the tasks using the same instrument profile.
+
+    Parameters
+    ----------
+    perform : method
+        Method which should be wrapped to hold the instrument lock.
+
+    profile : str
+        Id of the profile of the instrument used by the task.
+
+    """
+    def wrapper(obj, *args, **kwargs):
+        """Wrap function to hold the instrument lock.
+
+        """
+        with obj.root.resources['instrs'].lock(profile):
+            return perform(obj, *args, **kwargs)
+
+    update_wrapper(wrapper, perform)
+
+    return wrapper
+
+
+def make_wait(perform, wait, no_wait, read=None):
     """Machinery to make perform wait on other tasks execution.
 
     Create a wrapper around a method to wait for some threads to terminate
@@ -244,7 +317,13 @@ def make_wait(perform, wait, no_wait):
     no_wait : list(str)
         Names of the execution pools which should not be waited for.
 
-    Both parameters are mutually exlusive. If both lists are empty the
+    read : frozenset(str), optional
+        Full names of the database entries read by the method. When specified,
+        only the threads of the selected pools which may write one of those
+        entries are waited for (threads whose written entries are unknown are
+        always waited for).
+
+    Both wait and no_wait are mutually exlusive. If both lists are empty the
     execution will be deffered till all the execution pools have completed
     their works.
 
@@ -287,6 +366,10 @@ def make_wait(perform, wait, no_wait):
                 for p in pools:
                     threads.extend(all_threads[p])
 
+            if read is not None:
+                threads = [t for t in threads
+                           if t.written is None or t.written & read]
+
             # If there is none break. Use any as threads is an iterator.
             if not any(threads):
                 break
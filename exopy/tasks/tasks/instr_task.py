@@ -9,11 +9,16 @@
 """Base class for tasks needing to access an instrument.
 
 """
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
 
-from atom.api import (Tuple, Value)
+from atom.api import (Atom, Tuple, Value, Float, Int, Dict, atomref)
 
+from ...instruments.connection_pool import connection_key
 from .base_tasks import SimpleTask
+from .decorators import make_instr_locked
 
 
 PROFILE_DEPENDENCY_ID = 'exopy.instruments.profiles'
@@ -21,6 +26,142 @@ PROFILE_DEPENDENCY_ID = 'exopy.instruments.profiles'
 DRIVER_DEPENDENCY_ID = 'exopy.instruments.drivers'
 
 
+class InfosChecksCache(Atom):
+    """Cache of the results of the connection tests of the starters.
+
+    Identical tests (same starter, driver, connection and settings) are run
+    only once and successful results are reused for a short time so that
+    checking again the same measurement does not reopen the connections.
+    Failures are reported once and then forgotten so that a fixed instrument
+    is tested again.
+
+    """
+    #: Time (in s) during which a successful test is reused.
+    lifetime = Float(30.)
+
+    #: Maximal number of tests run concurrently.
+    max_threads = Int(8)
+
+    def check(self, starter, driver_cls, connection, settings):
+        """Test the connection infos, reusing a cached result if any.
+
+        Parameters are the ones of the check_infos method of the starter.
+
+        """
+        key = self._key(starter, driver_cls, connection, settings)
+        cached = self._get(key, consume=True)
+        if cached:
+            return cached
+
+        res, msg = starter.check_infos(driver_cls, connection, settings)
+        if res:
+            with self._lock:
+                self._results[key] = (res, msg, monotonic())
+        return res, msg
+
+    def check_many(self, infos):
+        """Run concurrently the tests which are not already cached.
+
+        Parameters
+        ----------
+        infos : iterable
+            Iterable of (starter, driver_cls, connection, settings) tuples.
+            Duplicate tests are run once.
+
+        """
+        pending = {}
+        for starter, driver_cls, connection, settings in infos:
+            key = self._key(starter, driver_cls, connection, settings)
+            if key not in pending and not self._get(key):
+                pending[key] = (starter, driver_cls, connection, settings)
+
+        if not pending:
+            return
+
+        workers = min(len(pending), self.max_threads)
+        executor = ThreadPoolExecutor(workers,
+                                      thread_name_prefix='exopy.TaskThread')
+        with executor:
+            futures = {k: executor.submit(i[0].check_infos, *i[1:])
+                       for k, i in pending.items()}
+
+        now = monotonic()
+        with self._lock:
+            for key, future in futures.items():
+                # Errors are left to the synchronous check to be reported.
+                if future.exception() is None:
+                    res, msg = future.result()
+                    self._results[key] = (res, msg, now)
+
+    def should_prefetch(self, root):
+        """Determine whether the tests of a hierarchy should be run in advance.
+
+        This returns True once per lifetime for a given root task.
+
+        """
+        now = monotonic()
+        ref = atomref(root)
+        with self._lock:
+            last = self._prefetched.get(ref)
+            if last is not None and now - last < self.lifetime:
+                return False
+            self._prefetched = {r: t for r, t in self._prefetched.items()
+                                if r() is not None and now - t < self.lifetime}
+            self._prefetched[ref] = now
+        return True
+
+    def clear(self):
+        """Forget all the cached results.
+
+        """
+        with self._lock:
+            self._results = {}
+            self._prefetched = {}
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Results of the tests as (result, msg, time) by test.
+    _results = Dict()
+
+    #: Time at which the tests of a root task were last run in advance. Keyed
+    #: by weak references so that a new root task never inherits the state of
+    #: a dead one.
+    _prefetched = Dict()
+
+    #: Lock protecting the access to the results.
+    _lock = Value(factory=Lock)
+
+    def _get(self, key, consume=False):
+        """Get a still valid result, failures are removed if consumed.
+
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is None:
+                return None
+            res, msg, t = cached
+            if res and monotonic() - t >= self.lifetime:
+                del self._results[key]
+                return None
+            if not res and consume:
+                del self._results[key]
+            return res, msg
+
+    @staticmethod
+    def _key(starter, driver_cls, connection, settings):
+        """Build a hashable key identifying a test.
+
+        """
+        return (starter, driver_cls, repr(sorted(connection.items())),
+                repr(sorted(settings.items())))
+
+
+#: Cache shared by all the instrument tasks.
+INFOS_CHECKS = InfosChecksCache()
+
+
 class InstrumentTask(SimpleTask):
     """Base class for all tasks calling instruments.
 
@@ -89,10 +230,11 @@ class InstrumentTask(SimpleTask):
                 return False, traceback
 
             if kwargs.get('test_instr', True):
+                if INFOS_CHECKS.should_prefetch(self.root):
+                    INFOS_CHECKS.check_many(self._gather_checked_infos())
                 s = profile['settings'].get(s_id, {})
-                res, msg = starter.check_infos(d_cls,
-                                               profile['connections'][c_id], s
-                                               )
+                res, msg = INFOS_CHECKS.check(starter, d_cls,
+                                              profile['connections'][c_id], s)
                 if not res:
                     traceback[err_path] = msg
                     return False, traceback
@@ -102,10 +244,21 @@ class InstrumentTask(SimpleTask):
     def prepare(self):
         """Always start the driver.
 
+        When the root is preparing the whole hierarchy, the start-up is
+        deferred so that the drivers of distinct profiles are started
+        concurrently. This is only done for the tasks which do not override
+        this method (nor use an interface), as an override may use the driver
+        once this method returns. Such tasks can instead extend start_driver
+        to run the operations needing the driver.
+
         """
         super(InstrumentTask, self).prepare()
         self.write_in_database('instrument', self.selected_instrument[0])
-        self.start_driver()
+        instrs = self.root.resources['instrs']
+        if instrs.collecting and type(self).prepare is InstrumentTask.prepare:
+            instrs.defer_start(self)
+        else:
+            self.start_driver()
 
     def start_driver(self):
         """Create an instance of the instrument driver and connect it.
@@ -115,18 +268,67 @@ class InstrumentTask(SimpleTask):
         instrs = self.root.resources['instrs']
         p_id, d_id, c_id, s_id = self.selected_instrument
         if self.selected_instrument in instrs:
-            self.driver = instrs[self.selected_instrument][0]
+            self._set_driver(instrs[self.selected_instrument][0], instrs)
+            return
+
+        profile = run_time[PROFILE_DEPENDENCY_ID][p_id]
+        connection = profile['connections'][c_id]
+        # Profile do not always contain a settings.
+        settings = profile['settings'].get(s_id, {})
+
+        # Reuse a connection kept open since a previous measurement, provided
+        # the infos used to open it did not change.
+        pooled = None
+        if instrs.pool is not None:
+            key = connection_key(self.selected_instrument, connection,
+                                 settings)
+            instrs.pool_keys[self.selected_instrument] = key
+            pooled = instrs.pool.take(key)
+        if pooled:
+            driver, starter = pooled
         else:
-            profile = run_time[PROFILE_DEPENDENCY_ID][p_id]
             d_cls, starter = run_time[DRIVER_DEPENDENCY_ID][d_id]
-            # Profile do not always contain a settings.
-            self.driver = starter.start(d_cls,
-                                        profile['connections'][c_id],
-                                        profile['settings'].get(s_id, {}))
-            # HINT allow something dangerous as the same instrument can be
-            # accessed using multiple settings.
-            # User should be careful about this (and should be warned)
-            instrs[self.selected_instrument] = (self.driver, starter)
+            driver = starter.start(d_cls, connection, settings)
+        # HINT the same instrument can be accessed using multiple
+        # settings. The calls are serialized by the per profile lock
+        # held while performing (see _build_perform).
+        instrs[self.selected_instrument] = (driver, starter)
+        self._set_driver(driver, instrs)
+
+    def cached_query(self, key, query, ttl=None):
+        """Get a value from the cache of the instrument or query it.
+
+        This is meant for values which do not change during the measurement
+        unless explicitely set (ranges, identifiers, ...). Tasks altering such
+        values should call invalidate_cache.
+
+        Parameters
+        ----------
+        key : hashable
+            Key identifying the queried value.
+
+        query : callable
+            Function taking no argument used to query the value on a miss.
+
+        ttl : float, optional
+            Time (in s) for which the value stays valid.
+
+        """
+        instrs = self.root.resources['instrs']
+        return instrs.cached_query(self.selected_instrument[0], key, query,
+                                   ttl)
+
+    def invalidate_cache(self, keys=None):
+        """Discard the cached values of the instrument.
+
+        Parameters
+        ----------
+        keys : iterable, optional
+            Keys to discard. If None the whole cache is discarded.
+
+        """
+        instrs = self.root.resources['instrs']
+        instrs.invalidate(self.selected_instrument[0], keys)
 
     @contextmanager
     def test_driver(self):
@@ -150,3 +352,51 @@ class InstrumentTask(SimpleTask):
 
         if driver:
             starter.stop(driver)
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    def _set_driver(self, driver, instrs):
+        """Set the driver used by the task, tracing it if requested.
+
+        The resource always holds the bare driver so that the starter never
+        manipulates a traced driver.
+
+        """
+        tracer = instrs.tracer
+        if tracer is not None:
+            driver = tracer.wrap(driver, self.selected_instrument[0])
+        self.driver = driver
+
+    def _gather_checked_infos(self):
+        """List the connection tests of all the instrument tasks of the
+        hierarchy.
+
+        Tasks whose selected instrument is not valid are skipped, the issue
+        being reported by their own check.
+
+        """
+        run_time = self.root.run_time
+        infos = []
+        for task in self.root.traverse():
+            if (not isinstance(task, InstrumentTask) or
+                    len(task.selected_instrument) != 4):
+                continue
+            p_id, d_id, c_id, s_id = task.selected_instrument
+            profile = run_time[PROFILE_DEPENDENCY_ID].get(p_id)
+            if (not profile or d_id not in run_time[DRIVER_DEPENDENCY_ID] or
+                    c_id not in profile['connections']):
+                continue
+            d_cls, starter = run_time[DRIVER_DEPENDENCY_ID][d_id]
+            infos.append((starter, d_cls, profile['connections'][c_id],
+                          profile['settings'].get(s_id, {})))
+        return infos
+
+    def _build_perform(self):
+        """Serialize the calls to the instrument with the other tasks using
+        the same profile.
+
+        """
+        perform = super(InstrumentTask, self)._build_perform()
+        return make_instr_locked(perform, self.selected_instrument[0])
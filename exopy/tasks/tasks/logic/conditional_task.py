@@ -22,6 +22,9 @@ class ConditionalTask(ComplexTask):
     #: Condition to meet in order to perform the children tasks.
     condition = Str().tag(pref=True, feval=Feval())
 
+    #: The task only evaluates its condition besides running its children.
+    concurrency_safe = True
+
     def perform(self):
         """Call the children task if the condition evaluate to True.
 
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Interface allowing to loop on the values stored in a .npy file.
+
+"""
+import os
+
+import numpy as np
+from atom.api import Str
+
+from ....utils.traceback import format_exc
+from ..task_interface import TaskInterface
+
+
+class NpyFileLoopInterface(TaskInterface):
+    """Interface used to loop on the content of a .npy file.
+
+    The file is memory-mapped in read-only mode when the loop is performed,
+    so only the path is transferred to the execution process and the values
+    are never copied in memory. For multidimensional arrays the loop iterates
+    over the first axis.
+
+    """
+    #: Path to the .npy file holding the values on which to iterate.
+    path = Str().tag(pref=True, fmt=True)
+
+    def check(self, *args, **kwargs):
+        """Check that the file exists and contains a non-empty array.
+
+        """
+        test, traceback = super(NpyFileLoopInterface,
+                                self).check(*args, **kwargs)
+        if not test:
+            return test, traceback
+
+        task = self.task
+        err_path = task.get_error_path() + '-path'
+        path = task.format_string(self.path)
+        if not os.path.isfile(path):
+            traceback[err_path] = 'No file found at %s' % path
+            return False, traceback
+
+        try:
+            values = np.load(path, mmap_mode='r')
+        except Exception:
+            msg = 'Failed to load the values stored in %s : %s'
+            traceback[err_path] = msg % (path, format_exc())
+            return False, traceback
+
+        if not values.ndim or not len(values):
+            traceback[err_path] = 'The file %s contains no values.' % path
+            return False, traceback
+
+        task.write_in_database('point_number', len(values))
+        if 'value' in task.database_entries:
+            task.write_in_database('value', values[0])
+
+        return test, traceback
+
+    def perform(self):
+        """Memory-map the file and pass the array to the LoopTask.
+
+        """
+        task = self.task
+        path = task.format_string(self.path)
+        task.perform_loop(np.load(path, mmap_mode='r'))
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Interface allowing to perform iterations at a fixed rate.
+
+"""
+import numbers
+from time import perf_counter
+
+import numpy as np
+from atom.api import Str, set_default
+
+from ....utils.timing import sleep_until
+from ..task_interface import TaskInterface
+from ..validators import Feval
+
+
+class FixedRateLoopInterface(TaskInterface):
+    """Interface starting the iterations of a loop on a fixed time grid.
+
+    Iteration i starts at t0 + i*period, t0 being the start of the loop, so
+    that the execution time of the children does not accumulate as drift. The
+    loop value is the scheduled time of the iteration relative to t0. When
+    the previous iterations overran the slot of an iteration, the number of
+    overruns is incremented, the lateness is recorded in lag and the loop
+    skips ahead to the next slot still to come so that the missed slots are
+    not caught up in a burst (their number is recorded in skipped). Only the
+    time spent paused shifts the grid.
+
+    """
+    #: Number of iterations to perform.
+    points = Str('10').tag(pref=True, feval=Feval(types=numbers.Integral))
+
+    #: Time between the start of two iterations in seconds.
+    period = Str('0.1').tag(pref=True, feval=Feval(types=numbers.Real))
+
+    database_entries = set_default({'overruns': 0, 'skipped': 0,
+                                    'lag': 0.0})
+
+    def check(self, *args, **kwargs):
+        """Check that the number of points and the period are positive.
+
+        """
+        task = self.task
+        err_path = task.get_error_path()
+        test, traceback = super(FixedRateLoopInterface,
+                                self).check(*args, **kwargs)
+
+        if not test:
+            return test, traceback
+
+        points = task.format_and_eval_string(self.points)
+        period = task.format_and_eval_string(self.period)
+        if points <= 0:
+            test = False
+            traceback[err_path + '-points'] =\
+                'The number of points must be strictly positive.'
+        if period <= 0:
+            test = False
+            traceback[err_path + '-period'] =\
+                'The period must be strictly positive.'
+
+        if test:
+            task.write_in_database('point_number', points)
+            if 'value' in task.database_entries:
+                task.write_in_database('value', 0.0)
+
+        return test, traceback
+
+    def perform(self):
+        """Pass a scheduling iterator to the LoopTask.
+
+        """
+        task = self.task
+        points = task.format_and_eval_string(self.points)
+        period = task.format_and_eval_string(self.period)
+
+        values = np.arange(points)*period
+        task.write_in_database('point_number', points)
+        task.write_in_database('loop_values', values)
+        task.write_in_database('overruns', 0)
+        task.write_in_database('skipped', 0)
+        task.write_in_database('lag', 0.0)
+        task.perform_loop(self._schedule(values))
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    def _schedule(self, values):
+        """Yield the values once the time at which they are scheduled is
+        reached.
+
+        """
+        task = self.task
+        root = task.root
+        stop = root.should_stop
+        overruns = skipped = 0
+
+        # Measure the time spent paused (the counter is non zero while any
+        # thread is paused).
+        pause_start = None
+        pause_duration = 0.0
+
+        def track_pauses(change):
+            nonlocal pause_start, pause_duration
+            if change['type'] != 'update':
+                return
+            if not change['oldvalue'] and change['value']:
+                pause_start = perf_counter()
+            elif (change['oldvalue'] and not change['value'] and
+                    pause_start is not None):
+                pause_duration += perf_counter() - pause_start
+                pause_start = None
+
+        counter = root.paused_threads_counter
+        counter.observe('count', track_pauses)
+        try:
+            # The time grid starts with the first iteration.
+            start = perf_counter()
+            i = 0
+            while i < len(values):
+                start += pause_duration
+                pause_duration = 0.0
+                value = values[i]
+                lag = sleep_until(start + value, stop) if i else 0.0
+                if lag:
+                    # Skip the slots which already passed.
+                    next_slot = int(np.searchsorted(values, value + lag,
+                                                    'right'))
+                    overruns += 1
+                    skipped += next_slot - i
+                    task.write_in_database('overruns', overruns)
+                    task.write_in_database('skipped', skipped)
+                    task.write_in_database('lag', lag)
+                    i = next_slot
+                    continue
+                yield value
+                i += 1
+        finally:
+            counter.unobserve('count', track_pauses)
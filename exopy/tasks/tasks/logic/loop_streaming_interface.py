@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Interface allowing to lazily consume an iterable in a LoopTask.
+
+"""
+from collections.abc import Iterable, Sized
+
+import numpy as np
+from atom.api import Str
+
+from ..task_interface import TaskInterface
+from ..validators import Feval
+
+
+class StreamingLoopInterface(TaskInterface):
+    """Interface used to loop on values produced on the fly.
+
+    Contrary to the IterableLoopInterface, the iterable is never converted to
+    an array and its values are pulled one at a time, which allows to loop on
+    generators, open files or iterables of unknown length. The point number
+    is set to -1 if the iterable has no length.
+
+    """
+    #: Iterable on which to iterate.
+    iterable = Str('range(10)').tag(pref=True, feval=Feval(types=Iterable))
+
+    def check(self, *args, **kwargs):
+        """Check that the iterable member evaluation does yield an iterable.
+
+        """
+        test, traceback = super(StreamingLoopInterface,
+                                self).check(*args, **kwargs)
+        if not test:
+            return test, traceback
+
+        task = self.task
+        iterable = task.format_and_eval_string(self.iterable)
+        task.write_in_database('point_number', _point_number(iterable))
+        task.write_in_database('loop_values', np.array([]))
+        if 'value' in task.database_entries:
+            try:
+                task.write_in_database('value', next(iter(iterable)))
+            except StopIteration:
+                pass
+
+        return test, traceback
+
+    def perform(self):
+        """Compute the iterable and pass an iterator on it to the LoopTask.
+
+        """
+        task = self.task
+        iterable = task.format_and_eval_string(self.iterable)
+        task.write_in_database('point_number', _point_number(iterable))
+
+        # An iterator has no length hence the task does not try to build the
+        # array of the loop values.
+        task.perform_loop(iter(iterable))
+
+
+def _point_number(iterable):
+    """Number of points of an iterable, -1 if it has no length.
+
+    """
+    return len(iterable) if isinstance(iterable, Sized) else -1
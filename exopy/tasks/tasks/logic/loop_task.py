@@ -9,14 +9,21 @@
 """Task allowing to perform a loop. The iterable is given by an interface.
 
 """
+from collections import deque
+from collections.abc import Sized
+from itertools import islice
+from multiprocessing import Pool
+
 import numpy as np
 
-from atom.api import (Typed, Bool, set_default)
+from atom.api import (Typed, Bool, Int, set_default)
 
 from timeit import default_timer
 
-from ..base_tasks import (SimpleTask, ComplexTask)
+from ..base_tasks import BaseTask, SimpleTask, ComplexTask
 from ..task_interface import InterfaceableTaskMixin
+from ..instr_task import InstrumentTask
+from ..offloading import collect_build_dependencies, build_worker_root
 from ..decorators import handle_stop_pause
 from .loop_exceptions import BreakException, ContinueException
 
@@ -28,6 +35,12 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
     #: Flag indicating whether or not to time the loop.
     timing = Bool().tag(pref=True)
 
+    #: Number of worker processes among which the iterations are distributed.
+    #: When zero the iterations are performed sequentially in the measurement
+    #: process. Iterations must be independent from one another and cannot
+    #: access instruments.
+    processes = Int().tag(pref=True)
+
     #: Task to call before other child tasks with current loop value. This task
     #: is simply a convenience and can be set to None.
     task = Typed(SimpleTask).tag(child=50)
@@ -52,6 +65,15 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         traceback.update(c_traceback)
         test &= c_test
 
+        if self.processes:
+            for child in self._gather_process_tasks():
+                if isinstance(child, InstrumentTask):
+                    test = False
+                    msg = ('Tasks using instruments cannot be performed in '
+                           'worker processes.')
+                    traceback[self.get_error_path() + '-processes'] = msg
+                    break
+
         return test, traceback
 
     def perform_loop(self, iterable):
@@ -63,10 +85,14 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         Parameters
         ----------
         iterable : iterable
-            Iterable on which the loop should be performed.
+            Iterable on which the loop should be performed. Iterables without
+            a known length (such as generators) are consumed lazily and the
+            point number and loop values are not written in the database.
 
         """
-        if self.timing:
+        if self.processes:
+            self._perform_loop_processes(iterable)
+        elif self.timing:
             if self.task:
                 self._perform_loop_timing_task(iterable)
             else:
@@ -81,12 +107,20 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
     # --- Private API ---------------------------------------------------------
     # =========================================================================
 
+    def _write_loop_infos(self, iterable):
+        """Write the point number and the loop values if they are known.
+
+        """
+        if isinstance(iterable, Sized):
+            self.write_in_database('point_number', len(iterable))
+            # Do not copy arrays (which may be memory-mapped).
+            self.write_in_database('loop_values', np.asarray(iterable))
+
     def _perform_loop(self, iterable):
         """Perform the loop when there is no child and timing is not required.
 
         """
-        self.write_in_database('point_number', len(iterable))
-        self.write_in_database('loop_values', np.array(iterable))
+        self._write_loop_infos(iterable)
 
         root = self.root
         for i, value in enumerate(iterable):
@@ -97,8 +131,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             self.write_in_database('index', i+1)
             self.write_in_database('value', value)
             try:
-                for child in self.children:
-                    child.perform_()
+                self._perform_children()
             except BreakException:
                 break
             except ContinueException:
@@ -108,8 +141,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         """Perform the loop when there is a child and timing is not required.
 
         """
-        self.write_in_database('point_number', len(iterable))
-        self.write_in_database('loop_values', np.array(iterable))
+        self._write_loop_infos(iterable)
 
         root = self.root
         for i, value in enumerate(iterable):
@@ -120,8 +152,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             self.write_in_database('index', i+1)
             self.task.perform_(value)
             try:
-                for child in self.children:
-                    child.perform_()
+                self._perform_children()
             except BreakException:
                 break
             except ContinueException:
@@ -131,8 +162,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         """Perform the loop when there is no child and timing is required.
 
         """
-        self.write_in_database('point_number', len(iterable))
-        self.write_in_database('loop_values', np.array(iterable))
+        self._write_loop_infos(iterable)
 
         root = self.root
         for i, value in enumerate(iterable):
@@ -144,8 +174,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             self.write_in_database('value', value)
             tic = default_timer()
             try:
-                for child in self.children:
-                    child.perform_()
+                self._perform_children()
             except BreakException:
                 self.write_in_database('elapsed_time', default_timer()-tic)
                 break
@@ -158,8 +187,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         """Perform the loop when there is a child and timing is required.
 
         """
-        self.write_in_database('point_number', len(iterable))
-        self.write_in_database('loop_values', np.array(iterable))
+        self._write_loop_infos(iterable)
 
         root = self.root
         for i, value in enumerate(iterable):
@@ -171,8 +199,7 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
             tic = default_timer()
             self.task.perform_(value)
             try:
-                for child in self.children:
-                    child.perform_()
+                self._perform_children()
             except BreakException:
                 self.write_in_database('elapsed_time', default_timer()-tic)
                 break
@@ -181,6 +208,102 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
                 continue
             self.write_in_database('elapsed_time', default_timer()-tic)
 
+    def _perform_loop_processes(self, iterable):
+        """Perform the loop by distributing the iterations among worker
+        processes.
+
+        Each worker rebuilds the children from their preferences and runs
+        chunks of iterations. The values written by the children are then
+        written in the database in the order of the iterations.
+
+        """
+        self._write_loop_infos(iterable)
+
+        root = self.root
+        tasks = self._gather_process_tasks()
+        dependencies = collect_build_dependencies(tasks)
+        written = {task._task_entry(entry): (task, entry) for task in tasks
+                   if isinstance(task, BaseTask)
+                   for entry in task.list_written_entries()}
+
+        configs = []
+        for child in ([self.task] if self.task else []) + self.children:
+            child.update_preferences_from_members()
+            configs.append(child.preferences.dict())
+
+        values = self.database.copy_accessible_values(self._child_path())
+        for entry in written:
+            values.pop(entry, None)
+
+        loop_entries = [self._task_entry('index')]
+        if not self.task:
+            loop_entries.append(self._task_entry('value'))
+
+        if isinstance(iterable, Sized):
+            size = max(1, len(iterable) // (4*self.processes))
+        else:
+            size = 1
+        items = enumerate(iterable)
+        chunks = iter(lambda: list(islice(items, size)), [])
+
+        # The workers are kept till the end of the measurement so that an
+        # enclosing loop does not start new ones at each of its iterations.
+        pools = root.resources['process_pools']
+        key = self.path + '/' + self.name
+        pool = pools.get(key)
+        if pool is None:
+            infos = (configs, bool(self.task), dependencies, values,
+                     loop_entries)
+            pool = Pool(self.processes, _init_loop_worker,
+                        (infos, root.should_stop, root.should_pause))
+            pools[key] = pool
+
+        pending = deque()
+        completed = False
+        try:
+            for chunk in islice(chunks, 2*self.processes):
+                pending.append(pool.apply_async(_perform_loop_chunk,
+                                                (values, chunk)))
+
+            while pending:
+                result = pending.popleft()
+                while not result.ready():
+                    if handle_stop_pause(root):
+                        return
+                    result.wait(0.05)
+
+                results, interrupted = result.get()
+                for i, value, elapsed, entries in results:
+                    self.write_in_database('index', i+1)
+                    if not self.task:
+                        self.write_in_database('value', value)
+                    for name, val in entries.items():
+                        task, entry = written[name]
+                        task.write_in_database(entry, val)
+                    if self.timing:
+                        self.write_in_database('elapsed_time', elapsed)
+
+                if interrupted or handle_stop_pause(root):
+                    return
+
+                for chunk in islice(chunks, 1):
+                    pending.append(pool.apply_async(_perform_loop_chunk,
+                                                    (values, chunk)))
+            completed = True
+        finally:
+            if not completed:
+                # Iterations still running are of no use once we exit.
+                del pools[key]
+                pool.terminate()
+                pool.join()
+
+    def _gather_process_tasks(self):
+        """List the tasks and interfaces to rebuild in the worker processes.
+
+        """
+        return [t for child in ([self.task] if self.task else []) +
+                self.children for t in child.traverse()]
+
     def _post_setattr_task(self, old, new):
         """Keep the database entries in sync with the task member.
 
@@ -241,3 +364,81 @@ class LoopTask(InterfaceableTaskMixin, ComplexTask):
         if self.task:
             self.task.name = new
         super()._post_setattr_name(old, new)
+
+
+#: Root task of the hierarchy rebuilt in the current worker process, whether
+#: the loop has an embedded task and entries written by the children.
+_WORKER_STATE = None
+
+
+def _init_loop_worker(infos, should_stop, should_pause):
+    """Rebuild the children of a LoopTask in a worker process.
+
+    """
+    global _WORKER_STATE
+    configs, has_task, dependencies, values, loop_entries = infos
+    root = build_worker_root(configs, dependencies, values, loop_entries,
+                             should_stop, should_pause)
+    written = [(t.path, t._task_entry(e)) for t in root.traverse()
+               if isinstance(t, BaseTask) and t is not root
+               for e in t.list_written_entries()]
+    _WORKER_STATE = (root, has_task, written)
+
+
+def _perform_loop_chunk(values, chunk):
+    """Perform a chunk of iterations in a worker process.
+
+    Parameters
+    ----------
+    values : dict
+        Current values of the entries accessible to the children and not
+        written by them.
+
+    chunk : list
+        Tuples (index, value) of the iterations to perform.
+
+    Returns
+    -------
+    results : list
+        Tuple (index, value, elapsed time, written entries) for each performed
+        iteration.
+
+    interrupted : bool
+        Whether the loop was interrupted by a break or the stop event.
+
+    """
+    root, has_task, written = _WORKER_STATE
+    database = root.database
+    for name, value in values.items():
+        database.set_value('root', name, value)
+    index_entry = root.input_entries[0]
+    children = root.children[1:] if has_task else root.children
+    results = []
+    for i, value in chunk:
+
+        if handle_stop_pause(root):
+            return results, True
+
+        database.set_value('root', index_entry, i+1)
+        if not has_task:
+            database.set_value('root', root.input_entries[1], value)
+        broken = False
+        tic = default_timer()
+        if has_task:
+            root.children[0].perform_(value)
+        try:
+            for child in children:
+                child.perform_()
+        except BreakException:
+            broken = True
+        except ContinueException:
+            pass
+        elapsed = default_timer() - tic
+
+        results.append((i, value, elapsed,
+                        {name: database.get_value(path, name)
+                         for path, name in written}))
+        if broken:
+            return results, True
+
+    return results, False
@@ -28,6 +28,9 @@ class WhileTask(ComplexTask):
 
     database_entries = set_default({'index': 1})
 
+    #: The task only evaluates its condition besides running its children.
+    concurrency_safe = True
+
     def perform(self):
         """Loop as long as condition evaluates to True.
 
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Tools used to perform tasks in other processes.
+
+Tasks are rebuilt in the other process from their preferences under a
+WorkerRootTask, and the database values they need are transferred along.
+
+"""
+import threading
+from multiprocessing import Event, Pipe, Process
+
+import numpy as np
+from atom.api import Atom, List, Dict, Value
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # Python < 3.8
+    SharedMemory = None
+
+from ...utils.traceback import format_exc
+from .base_tasks import BaseTask, RootTask, DEP_TYPE
+from .task_interface import DEP_TYPE as INTERFACE_DEP_TYPE
+
+
+#: Size in bytes above which arrays are transferred through shared memory.
+SHARED_MEMORY_THRESHOLD = 2**20
+
+
+def collect_build_dependencies(objects):
+    """Collect the classes needed to rebuild tasks from their preferences.
+
+    Parameters
+    ----------
+    objects : iterable
+        Tasks and interfaces as yielded by the traverse method of the tasks.
+
+    Returns
+    -------
+    dependencies : dict
+        Build dependencies which can be passed to build_task_from_config.
+
+    """
+    dependencies = {DEP_TYPE: {}, INTERFACE_DEP_TYPE: {}}
+    for obj in objects:
+        if isinstance(obj, BaseTask):
+            dependencies[DEP_TYPE][obj.task_id] = type(obj)
+        else:
+            dependencies[INTERFACE_DEP_TYPE][obj.interface_id] = type(obj)
+
+    return dependencies
+
+
+def share_arrays(values):
+    """Move the large arrays found in a dict of values to shared memory.
+
+    Parameters
+    ----------
+    values : dict
+        Values to transfer to another process.
+
+    Returns
+    -------
+    values : dict
+        Copy of the values in which large arrays have been replaced by a
+        description of the shared memory block holding them. The receiver
+        should use unshare_arrays to retrieve the arrays.
+
+    """
+    if SharedMemory is None:
+        return values
+
+    shared = {}
+    for name, value in values.items():
+        if (isinstance(value, np.ndarray) and not value.dtype.hasobject and
+                value.nbytes >= SHARED_MEMORY_THRESHOLD):
+            shm = SharedMemory(create=True, size=value.nbytes)
+            np.ndarray(value.shape, value.dtype, shm.buf)[...] = value
+            value = _SharedArray(shm.name, value.shape, value.dtype.str)
+            # The block survives till the receiver unlinks it.
+            shm.close()
+        shared[name] = value
+
+    return shared
+
+
+def unshare_arrays(values):
+    """Retrieve the arrays moved to shared memory by share_arrays.
+
+    The shared memory blocks are freed after the arrays are copied.
+
+    """
+    unshared = {}
+    for name, value in values.items():
+        if isinstance(value, _SharedArray):
+            shm = SharedMemory(value.name)
+            value = np.ndarray(value.shape, value.dtype, shm.buf).copy()
+            shm.close()
+            shm.unlink()
+        unshared[name] = value
+
+    return unshared
+
+
+class WorkerRootTask(RootTask):
+    """Root task under which tasks are rebuilt in another process.
+
+    """
+    #: Entries written in the root node by the parent process during the
+    #: execution.
+    input_entries = List()
+
+    def list_written_entries(self):
+        """The input entries are updated by the parent process.
+
+        """
+        return list(self.input_entries)
+
+
+def build_worker_root(configs, dependencies, values, input_entries,
+                      should_stop, should_pause):
+    """Rebuild tasks under a WorkerRootTask and prepare them to be performed.
+
+    Parameters
+    ----------
+    configs : list(dict)
+        Preferences of the tasks to rebuild.
+
+    dependencies : dict
+        Build dependencies as returned by collect_build_dependencies.
+
+    values : dict
+        Values of the entries to create in the root node of the database.
+
+    input_entries : list(str)
+        Names of the entries of the root node which will be updated during
+        the execution.
+
+    should_stop : Event
+        Inter-process event signaling the tasks they should stop.
+
+    should_pause : Event
+        Inter-process event signaling the tasks they should pause.
+
+    Returns
+    -------
+    root : WorkerRootTask
+        Root task, already prepared, whose children are the rebuilt tasks.
+
+    """
+    # Avoid a circular import with the task manager.
+    from ..utils.building import build_task_from_config
+
+    root = WorkerRootTask(should_stop=should_stop, should_pause=should_pause,
+                          paused=Event(), resumed=Event(),
+                          input_entries=input_entries,
+                          thread_id=threading.current_thread().ident)
+    root.default_path = values.get('default_path', '')
+    for i, config in enumerate(configs):
+        root.add_child_task(i, build_task_from_config(config, dependencies))
+    for name, value in values.items():
+        root.database.set_value('root', name, value)
+
+    root.prepare()
+    return root
+
+
+class TaskProcessHelper(Atom):
+    """Persistent process to which a task offloads its perform method.
+
+    The task is rebuilt once in the helper process. On each call, the values
+    of the entries read by the task are sent to the helper, and the values
+    of the entries written by the task (and its children) are written back
+    in the database.
+
+    Parameters
+    ----------
+    task : BaseTask
+        Task whose perform method should be executed by the helper.
+
+    """
+    def __init__(self, task):
+        super(TaskProcessHelper, self).__init__()
+        tasks = list(task.traverse())
+        for t in tasks:
+            if isinstance(t, BaseTask):
+                for entry in t.list_written_entries():
+                    self._written[t._task_entry(entry)] = (t, entry)
+
+        self._read = [e for e in task.list_read_entries()
+                      if e not in self._written]
+
+        task.update_preferences_from_members()
+        infos = ([task.preferences.dict()],
+                 collect_build_dependencies(tasks),
+                 self._read_values(task))
+        root = task.root
+        self._pipe, child_pipe = Pipe()
+        self._process = Process(target=_helper_main,
+                                args=(child_pipe, infos, root.should_stop,
+                                      root.should_pause),
+                                name='exopy.TaskProcessHelper')
+        # Terminated along with the measurement process, which for that
+        # reason must not be daemonic itself.
+        self._process.daemon = True
+        self._process.start()
+
+    def perform(self, task, *args, **kwargs):
+        """Perform the task in the helper process.
+
+        Raises
+        ------
+        RuntimeError :
+            Raised if an error occured in the helper process.
+
+        """
+        self._pipe.send((args, kwargs, share_arrays(self._read_values(task))))
+        success, result = self._pipe.recv()
+        if not success:
+            raise RuntimeError('The offloaded perform of %s failed :\n%s' %
+                               (task.name, result))
+
+        for name, value in unshare_arrays(result).items():
+            t, entry = self._written[name]
+            t.write_in_database(entry, value)
+
+    def stop(self):
+        """Stop the helper process.
+
+        """
+        if self._process.is_alive():
+            self._pipe.send(None)
+            self._process.join()
+        self._pipe.close()
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Helper process.
+    _process = Value()
+
+    #: End of the pipe used to communicate with the helper process.
+    _pipe = Value()
+
+    #: Entries read by the task which are not written by it.
+    _read = List()
+
+    #: Mapping between the full name of the written entries and the task and
+    #: simple name under which they should be written.
+    _written = Dict()
+
+    def _read_values(self, task):
+        """Collect the values of the entries read by the task.
+
+        """
+        return {name: task.get_from_database(name) for name in self._read}
+
+
+class _SharedArray(object):
+    """Description of an array stored in a shared memory block.
+
+    """
+    __slots__ = ('name', 'shape', 'dtype')
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+
+def _helper_main(pipe, infos, should_stop, should_pause):
+    """Function executed by the helper process.
+
+    """
+    configs, dependencies, values = infos
+    try:
+        root = build_worker_root(configs, dependencies, values, list(values),
+                                 should_stop, should_pause)
+    except Exception:
+        # Report the failure on the first call.
+        error = 'Failed to rebuild the task :\n' + format_exc()
+        while pipe.recv() is not None:
+            pipe.send((False, error))
+        return
+
+    task = root.children[0]
+    database = root.database
+    written = [(t.path, t._task_entry(e)) for t in task.traverse()
+               if isinstance(t, BaseTask) for e in t.list_written_entries()]
+    while True:
+        msg = pipe.recv()
+        if msg is None:
+            break
+        args, kwargs, inputs = msg
+        try:
+            for name, value in unshare_arrays(inputs).items():
+                database.set_value('root', name, value)
+            # The wrappers (stop, wait, ...) are handled by the parent process.
+            task.perform(*args, **kwargs)
+            outputs = {name: database.get_value(path, name)
+                       for path, name in written}
+            pipe.send((True, share_arrays(outputs)))
+        except Exception:
+            pipe.send((False, format_exc()))
+
+    root.release_resources()
+    pipe.close()
@@ -10,11 +10,15 @@
 
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from collections import defaultdict
 from threading import RLock, Lock
+from time import perf_counter
+from traceback import format_exception
 
-from atom.api import Atom, Instance, Value, Int, set_default
+from atom.api import (Atom, Instance, Value, Int, Float, Bool, Dict, List,
+                      set_default)
 
 
 class SharedCounter(Atom):
@@ -207,34 +211,357 @@ class ThreadPoolResource(ResourceHolder):
                                if d not in bugged and not d.inactive.is_set()]
 
 
+class ProcessHelpersResource(ResourceHolder):
+    """Resource holder specialized to handle the helper processes to which
+    tasks offload their work.
+
+    Helpers are stored by task path (including the task name).
+
+    """
+    def release(self):
+        """Stop all the helper processes.
+
+        """
+        for task_path in self:
+            try:
+                self[task_path].stop()
+            except Exception:
+                log = logging.getLogger(__name__)
+                mes = 'Failed to stop helper process of : %s'
+                log.exception(mes, task_path)
+
+
+class ProcessPoolsResource(ResourceHolder):
+    """Resource holder specialized to handle the pools of worker processes
+    among which loops distribute their iterations.
+
+    Pools are stored by task path (including the task name). They are
+    discarded on release so that the next execution starts new workers.
+
+    """
+    def release(self):
+        """Terminate all the pools.
+
+        """
+        with self.locked():
+            for task_path in self:
+                try:
+                    pool = self[task_path]
+                    pool.terminate()
+                    pool.join()
+                except Exception:
+                    log = logging.getLogger(__name__)
+                    mes = 'Failed to terminate process pool of : %s'
+                    log.exception(mes, task_path)
+            self._dict.clear()
+
+
+class ThreadExecutorsResource(ResourceHolder):
+    """Resource holder specialized to handle the thread pools used to run
+    concurrently independent tasks.
+
+    Executors are stored by task path (including the task name).
+
+    """
+    def release(self):
+        """Shutdown all the executors.
+
+        """
+        for task_path in self:
+            try:
+                self[task_path].shutdown()
+            except Exception:
+                log = logging.getLogger(__name__)
+                mes = 'Failed to shutdown thread pool of : %s'
+                log.exception(mes, task_path)
+
+
 class InstrsResource(ResourceHolder):
     """Resource holder specialized to handle instruments.
 
     Each driver instance should be stored as a 2-tuple with its associated
     starter. (driver, starter)
 
+    The accesses to an instrument can be serialized using the lock method.
+    As the same instrument can be accessed through different drivers (using
+    different settings), the locks are attributed per profile.
+
+    When a connection pool is provided, the drivers are given back to it on
+    release instead of being stopped.
+
+    While collecting (see collect_starts), the tasks register the drivers they
+    need instead of starting them, so that the drivers of distinct profiles
+    can then be started concurrently using start_deferred.
+
+    The results of the queries of static instrument state can be cached per
+    profile (see cached_query). The cache is cleared on reset.
+
     """
+    #: Pool to which the drivers are given back on release
+    #: (see exopy.instruments.connection_pool).
+    pool = Value()
+
+    #: Keys under which the drivers are given back to the pool, by selected
+    #: instrument (see exopy.instruments.connection_pool.connection_key).
+    pool_keys = Dict()
+
+    #: Tracer recording the communications with the instruments, if any
+    #: (see exopy.instruments.tracing). The tasks then get a proxy around the
+    #: driver which passes the isinstance checks but is not the driver itself
+    #: and does not forward the special methods.
+    tracer = Value()
+
+    #: Default time (in s) after which a cached query expires. Zero means the
+    #: value is kept till it is invalidated.
+    query_ttl = Float()
+
+    #: Maximal number of threads used to start the drivers.
+    max_start_threads = Int(8)
+
+    #: Whether the drivers start-up is currently deferred.
+    collecting = Bool()
+
+    @contextmanager
+    def collect_starts(self):
+        """Context manager during which the driver start-up is deferred.
+
+        """
+        self.collecting = True
+        try:
+            yield
+        finally:
+            self.collecting = False
+
+    def defer_start(self, task):
+        """Register a task whose driver should be started by start_deferred.
+
+        Parameters
+        ----------
+        task : InstrumentTask
+            Task whose start_driver method should be called.
+
+        """
+        with self._lock:
+            self._deferred.append(task)
+
+    def start_deferred(self):
+        """Start the drivers of the registered tasks.
+
+        The drivers of distinct profiles are started concurrently while the
+        ones sharing a profile are started one after the other (in
+        registration order).
+
+        Returns
+        -------
+        errors : dict
+            Mapping between the ids of the profiles whose driver failed to
+            start and the formatted traceback of the failure.
+
+        """
+        with self._lock:
+            tasks, self._deferred = self._deferred, []
+
+        by_profile = defaultdict(list)
+        for task in tasks:
+            by_profile[task.selected_instrument[0]].append(task)
+
+        def start(tasks):
+            for task in tasks:
+                task.start_driver()
+
+        errors = {}
+        if not by_profile:
+            return errors
+
+        workers = min(len(by_profile), self.max_start_threads)
+        executor = ThreadPoolExecutor(workers,
+                                      thread_name_prefix='exopy.TaskThread')
+        with executor:
+            futures = {p: executor.submit(start, t)
+                       for p, t in by_profile.items()}
+
+        for profile, future in futures.items():
+            exc = future.exception()
+            if exc is not None:
+                errors[profile] = ''.join(format_exception(type(exc), exc,
+                                                           exc.__traceback__))
+        return errors
+
+    @contextmanager
+    def lock(self, profile):
+        """Context manager serializing the accesses to an instrument.
+
+        The lock is re-entrant and the time spent waiting for it is recorded.
+
+        Parameters
+        ----------
+        profile : str
+            Id of the profile of the instrument.
+
+        """
+        with self._lock:
+            lock = self._instr_locks.get(profile)
+            if lock is None:
+                lock = self._instr_locks[profile] = RLock()
+
+        tic = perf_counter()
+        lock.acquire()
+        waited = perf_counter() - tic
+        with self._lock:
+            total, count = self._wait_times.get(profile, (0.0, 0))
+            self._wait_times[profile] = (total + waited, count + 1)
+
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def get_wait_times(self):
+        """Get the time spent waiting for the instrument locks.
+
+        Returns
+        -------
+        wait_times : dict
+            Mapping between profile ids and a tuple (total time spent waiting
+            in s, number of accesses).
+
+        """
+        with self._lock:
+            return self._wait_times.copy()
+
+    def cached_query(self, profile, key, query, ttl=None):
+        """Get a value from the cache of an instrument or query it.
+
+        Parameters
+        ----------
+        profile : str
+            Id of the profile of the instrument.
+
+        key : hashable
+            Key identifying the queried value.
+
+        query : callable
+            Function taking no argument used to query the value on a miss.
+
+        ttl : float, optional
+            Time (in s) for which the value stays valid. Defaults to query_ttl.
+
+        """
+        ttl = self.query_ttl if ttl is None else ttl
+        with self._lock:
+            cache = self._query_cache.setdefault(profile, {})
+            stats = self._cache_stats.setdefault(profile, [0, 0])
+            if key in cache:
+                value, expiry = cache[key]
+                if not expiry or perf_counter() < expiry:
+                    stats[0] += 1
+                    return value
+            stats[1] += 1
+
+        value = query()
+        with self._lock:
+            expiry = perf_counter() + ttl if ttl else 0
+            self._query_cache.setdefault(profile, {})[key] = (value, expiry)
+        return value
+
+    def invalidate(self, profile, keys=None):
+        """Discard cached values of an instrument.
+
+        This should be called after any operation altering the state of the
+        instrument.
+
+        Parameters
+        ----------
+        profile : str
+            Id of the profile of the instrument.
+
+        keys : iterable, optional
+            Keys to discard. If None the whole cache of the instrument is
+            discarded.
+
+        """
+        with self._lock:
+            cache = self._query_cache.get(profile)
+            if not cache:
+                return
+            if keys is None:
+                cache.clear()
+            else:
+                for k in keys:
+                    cache.pop(k, None)
+
+    def get_cache_stats(self):
+        """Get the number of hits and misses of the query cache.
+
+        Returns
+        -------
+        stats : dict
+            Mapping between profile ids and (hits, misses) tuple.
+
+        """
+        with self._lock:
+            return {p: tuple(s) for p, s in self._cache_stats.items()}
+
     def release(self):
         """Finalize all the opened connections.
 
         """
+        pool = self.pool
         for instr_profile in self:
             try:
                 driver, starter = self[instr_profile]
-                starter.stop(driver)
+                if pool is not None:
+                    key = self.pool_keys.get(instr_profile, instr_profile)
+                    pool.put(key, driver, starter)
+                else:
+                    starter.stop(driver)
             except Exception:
                 log = logging.getLogger(__name__)
                 mes = 'Failed to close connection to instr : %s'
                 log.exception(mes, self[instr_profile])
 
+        log = logging.getLogger(__name__)
+        for profile, (total, count) in sorted(self.get_wait_times().items()):
+            mes = 'Time spent waiting for instr %s : %.3g s (%d accesses)'
+            log.info(mes, profile, total, count)
+        for profile, (hits, misses) in sorted(self.get_cache_stats().items()):
+            mes = 'Cached queries for instr %s : %d hits, %d misses'
+            log.info(mes, profile, hits, misses)
+        self._wait_times = {}
+        self._deferred = []
+        self._query_cache = {}
+        self.pool_keys = {}
+        self._cache_stats = {}
+
     def reset(self):
-        """Clean the cache of all drivers to avoid corrupted value due to
-        user interferences.
+        """Clean the cache of all drivers and the query cache to avoid
+        corrupted value due to user interferences.
 
         """
         for instr_id in self:
             d, starter = self[instr_id]
             starter.reset(d)
+        with self._lock:
+            self._query_cache = {}
+
+    # =========================================================================
+    # --- Private API ---------------------------------------------------------
+    # =========================================================================
+
+    #: Locks used to serialize the accesses to the instruments by profile.
+    _instr_locks = Dict()
+
+    #: Time spent waiting for the locks and number of accesses by profile.
+    _wait_times = Dict()
+
+    #: Tasks whose driver start-up has been deferred.
+    _deferred = List()
+
+    #: Cached query results as (value, expiry time) by key and profile.
+    _query_cache = Dict()
+
+    #: Number of hits and misses of the query cache by profile.
+    _cache_stats = Dict()
 
 
 class FilesResource(ResourceHolder):
@@ -14,7 +14,7 @@ from atom.api import (Atom, ForwardTyped, Typed, Str, Dict, Property,
 
 from ...utils.traceback import format_exc
 from ...utils.atom_util import HasPrefAtom, tagged_members
-from .base_tasks import BaseTask
+from .base_tasks import BaseTask, list_referenced_entries
 from . import validators
 
 
@@ -188,6 +188,16 @@ class InterfaceableTaskMixin(InterfaceableMixin):
         """
         return self.path + '/' + self.name
 
+    def list_read_entries(self):
+        """Also list the entries referenced by the interfaces.
+
+        """
+        entries = super(InterfaceableTaskMixin, self).list_read_entries()
+        if self.interface:
+            for interface in self.interface.traverse():
+                entries |= list_referenced_entries(interface)
+        return entries
+
     def _post_setattr_interface(self, old, new):
         """ Observer ensuring the interface always has a valid ref to the task
         and that the interface database entries are added to the task one.
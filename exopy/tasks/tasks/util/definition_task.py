@@ -31,6 +31,9 @@ class DefinitionTask(SimpleTask):
     #: Class attribute marking this task as being logical, used in filtering.
     util_task = True
 
+    #: The task only writes its definitions in the database.
+    concurrency_safe = True
+
     # Dictionary of definitions
     definitions = Typed(OrderedDict, ()).tag(pref=[ordered_dict_to_pref,
                                                    ordered_dict_from_pref])
@@ -59,6 +62,12 @@ class DefinitionTask(SimpleTask):
                                                                   format_exc())
         return test, traceback
 
+    def list_written_entries(self):
+        """Definitions are written during the checks and never change.
+
+        """
+        return []
+
     def _post_setattr_definitions(self, old, new):
         """Observer keeping the database entries in sync with the declared
         definitions.
@@ -16,7 +16,7 @@ from atom.api import (Typed, set_default)
 from ....utils.traceback import format_exc
 from ....utils.atom_util import (ordered_dict_from_pref, ordered_dict_to_pref)
 
-from ..base_tasks import SimpleTask
+from ..base_tasks import SimpleTask, find_referenced_entries
 
 
 class FormulaTask(SimpleTask):
@@ -32,7 +32,11 @@ class FormulaTask(SimpleTask):
     formulas = Typed(OrderedDict, ()).tag(pref=[ordered_dict_to_pref,
                                                 ordered_dict_from_pref])
 
-    wait = set_default({'activated': True})  # Wait on all pools by default.
+    # Wait only on the tasks writing the entries read by this task.
+    wait = set_default({'activated': True, 'auto': True})
+
+    #: The task only evaluates its formulas.
+    concurrency_safe = True
 
     def perform(self):
         """Evaluate alll formulas and update the database.
@@ -60,6 +64,13 @@ class FormulaTask(SimpleTask):
                     "Failed to eval the formula {}: {}".format(k, format_exc())
         return test, traceback
 
+    def list_read_entries(self):
+        """Also list the entries referenced in the formulas.
+
+        """
+        entries = super(FormulaTask, self).list_read_entries()
+        return entries | find_referenced_entries(self.formulas.values())
+
     def _post_setattr_formulas(self, old, new):
         """Observer keeping the database entries in sync with the declared
         formulas.
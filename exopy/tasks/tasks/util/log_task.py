@@ -24,7 +24,8 @@ class LogTask(SimpleTask):
 
     database_entries = set_default({'message': ''})
 
-    wait = set_default({'activated': True})  # Wait on all pools by default.
+    # Wait only on the tasks writing the entries read by this task.
+    wait = set_default({'activated': True, 'auto': True})
 
     def perform(self, *args, **kwargs):
         """ Format the message and log it.
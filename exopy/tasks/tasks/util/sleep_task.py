@@ -12,8 +12,8 @@ for a set amount of time.
 """
 import numbers
 from atom.api import (Str, set_default)
-from time import sleep
 
+from ....utils.timing import precise_sleep
 from ..base_tasks import SimpleTask
 from ..validators import Feval
 
@@ -32,7 +32,7 @@ class SleepTask(SimpleTask):
     def perform(self):
         t = self.format_and_eval_string(self.time)
         self.write_in_database('time', t)
-        sleep(t)
+        precise_sleep(t, self.root.should_stop)
 
     def check(self, *args, **kwargs):
         """ Check if time > 0
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Accurate sleeping functions based on a monotonic clock.
+
+time.sleep can overshoot by up to a few milliseconds depending on the OS
+scheduler. The functions of this module sleep till shortly before the deadline
+and then spin, yielding the GIL, till the deadline is reached.
+
+"""
+from time import perf_counter, sleep
+
+#: Time (in s) before the deadline below which the functions spin instead of
+#: sleeping.
+SPIN_THRESHOLD = 2e-3
+
+
+def sleep_until(deadline, stop=None):
+    """Sleep till perf_counter reaches the specified deadline.
+
+    Parameters
+    ----------
+    deadline : float
+        Value of perf_counter till which to sleep.
+
+    stop : Event, optional
+        Event interrupting the sleep when set.
+
+    Returns
+    -------
+    lateness : float
+        Time by which the deadline was already exceeded when the function was
+        called (0 if it was not).
+
+    """
+    remaining = deadline - perf_counter()
+    if remaining <= 0:
+        return -remaining
+
+    if remaining > SPIN_THRESHOLD:
+        if stop is not None:
+            if stop.wait(remaining - SPIN_THRESHOLD):
+                return 0.0
+        else:
+            sleep(remaining - SPIN_THRESHOLD)
+
+    while perf_counter() < deadline:
+        sleep(0)
+
+    return 0.0
+
+
+def precise_sleep(duration, stop=None):
+    """Sleep for the specified duration.
+
+    Parameters
+    ----------
+    duration : float
+        Time to sleep in seconds.
+
+    stop : Event, optional
+        Event interrupting the sleep when set.
+
+    """
+    sleep_until(perf_counter() + duration, stop)
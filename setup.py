@@ -58,5 +58,9 @@ setup(
     python_requires='>=3.5',
     setup_requires=['setuptools'],
     install_requires=install_requires,
-    entry_points={'gui_scripts': 'exopy = exopy.__main__:main'},
+    entry_points={
+        'gui_scripts': 'exopy = exopy.__main__:main',
+        'console_scripts': ('exopy-worker = exopy.measurement.engines.'
+                            'network_engine.worker:main'),
+        },
 )
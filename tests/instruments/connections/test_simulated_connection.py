@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test for the simulated connection.
+
+"""
+import logging
+
+from exopy.testing.util import show_widget, wait_for_destruction
+
+
+def test_creating_simulated_connection(prof_plugin, exopy_qtbot, caplog):
+    """Test creating a simulated connection through the plugin.
+
+    """
+    caplog.set_level(logging.INFO)
+    c = prof_plugin.create_connection('SimulatedConnection',
+                                      {'query_latency': 0.01, 'bad': 1},
+                                      False)
+    w = show_widget(exopy_qtbot, c)
+    assert caplog.records
+    infos = c.gather_infos()
+    assert infos['query_latency'] == '0.01'
+    assert sorted(infos) == ['bandwidth', 'failure_rate', 'query_latency',
+                             'seed', 'set_latency']
+    w.close()
+    wait_for_destruction(exopy_qtbot, w)
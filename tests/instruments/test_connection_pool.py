@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the pool keeping the connections to the instruments open.
+
+"""
+from exopy.instruments.connection_pool import ConnectionPool, connection_key
+
+
+class FalseStarter(object):
+    """False starter keeping track of the reset and stopped drivers.
+
+    """
+    def __init__(self, fail_reset=False):
+        self.fail_reset = fail_reset
+        self.reset_drivers = []
+        self.stopped = []
+
+    def reset(self, driver):
+        if self.fail_reset:
+            raise RuntimeError()
+        self.reset_drivers.append(driver)
+
+    def stop(self, driver):
+        self.stopped.append(driver)
+
+
+def test_take_and_put():
+    """Test reusing a pooled driver.
+
+    """
+    pool = ConnectionPool()
+    starter = FalseStarter()
+    key = ('p', 'd', 'c', 's')
+    assert pool.take(key) is None
+
+    pool.put(key, 'driver', starter)
+    assert pool.profiles == ['p']
+    # A second driver for the same key is closed.
+    pool.put(key, 'driver2', starter)
+    assert starter.stopped == ['driver2']
+
+    assert pool.take(key) == ('driver', starter)
+    assert starter.reset_drivers == ['driver']
+    assert not pool.profiles
+
+
+def test_take_outdated_infos():
+    """Test that a driver opened with outdated infos is closed.
+
+    """
+    pool = ConnectionPool()
+    starter = FalseStarter()
+    selected = ('p', 'd', 'c', 's')
+    old_key = connection_key(selected, {'address': 1}, {})
+    new_key = connection_key(selected, {'address': 2}, {})
+    assert old_key != new_key
+    assert connection_key(selected, {'address': 1}, {}) == old_key
+
+    pool.put(old_key, 'driver', starter)
+    assert pool.take(new_key) is None
+    assert starter.stopped == ['driver']
+    assert not pool.profiles
+
+
+def test_take_failed_reset():
+    """Test that a driver failing to reset is closed and not reused.
+
+    """
+    pool = ConnectionPool()
+    starter = FalseStarter(fail_reset=True)
+    key = ('p', 'd', 'c', 's')
+    pool.put(key, 'driver', starter)
+    assert pool.take(key) is None
+    assert starter.stopped == ['driver']
+
+
+def test_close():
+    """Test closing idle connections and connections by profiles.
+
+    """
+    pool = ConnectionPool(timeout=10)
+    starter = FalseStarter()
+    pool.put(('p1', 'd', 'c', 's'), 'd1', starter)
+    pool.put(('p2', 'd', 'c', 's'), 'd2', starter)
+    pool.put(('p3', 'd', 'c', 's'), 'd3', starter)
+
+    pool.close_idle()
+    assert pool.profiles == ['p1', 'p2', 'p3']
+
+    pool.close(['p1'])
+    assert starter.stopped == ['d1']
+
+    pool.timeout = 0
+    pool.close_idle()
+    assert not pool.profiles
+    assert sorted(starter.stopped) == ['d1', 'd2', 'd3']
@@ -365,6 +365,24 @@ def test_profile_write(tmpdir, false_plugin_with_holder):
     assert 'new' in p.settings and 'lantz' in p.settings
 
 
+def test_profile_to_dict(tmpdir, false_plugin_with_holder):
+    """Test that the dict representation is cached till the profile changes.
+
+    """
+    p = ProfileInfos(path=PROFILE_PATH, plugin=false_plugin_with_holder)
+    d = p.to_dict()
+    assert d['id'] == 'profile'
+    assert p.to_dict() is d
+
+    p.id = 'new'
+    p.path = str(tmpdir.join('new.ini'))
+    p.write_to_file()
+    assert p.to_dict() is not d and p.to_dict()['id'] == 'new'
+
+    p._config = ConfigObj({'id': 'other'})
+    assert p.to_dict()['id'] == 'other'
+
+
 def test_profile_clone(false_plugin_with_holder):
     """Test cloning a profile.
 
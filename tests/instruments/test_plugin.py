@@ -85,6 +85,7 @@ def test_plugin_lifecycle(exopy_qtbot, instr_workbench):
     assert 'false_connection' in p.connections
     assert 'false_settings' in p.settings
     assert 'instruments.test.FalseDriver' in p._drivers.contributions
+    assert 'instruments.test.FalseDriver' in p.drivers
     for d in p._drivers.contributions.values():
         assert d.valid
     assert p.get_aliases('Dummy')
@@ -206,6 +207,25 @@ def test_handle_corrupted_profile(prof_plugin, caplog):
             assert record.levelname == 'WARNING'
 
 
+def test_refresh_only_modified_profiles(prof_plugin):
+    """Test that only the modified profiles are reloaded.
+
+    """
+    old = prof_plugin._profiles.copy()
+    prof_plugin._refresh_profiles()
+    assert all(prof_plugin._profiles[n] is i for n, i in old.items())
+
+    c = ConfigObj(os.path.join(prof_plugin._profiles_folders[0],
+                               'fp1.instr.ini'))
+    c['connections']['new'] = {}
+    c.write()
+
+    prof_plugin._refresh_profiles()
+    assert prof_plugin._profiles['fp1'] is not old['fp1']
+    assert 'new' in prof_plugin._profiles['fp1'].connections
+    assert prof_plugin._profiles['fp2'] is old['fp2']
+
+
 def test_profiles_observation(exopy_qtbot, instr_workbench):
     """Test observing the profiles in the profile folders.
 
@@ -286,6 +306,11 @@ def test_get_profiles(prof_plugin):
     assert not m and 'fp1' in p and 'fp2' in p
     assert prof_plugin.used_profiles == {'fp1': 'tests2', 'fp2': 'tests2'}
 
+    # The dictionary representation is not rebuilt.
+    prof_plugin.release_profiles('tests2', ['fp1'])
+    p2, _ = prof_plugin.get_profiles('tests2', ['fp1'])
+    assert p2['fp1'] is p['fp1']
+
 
 def test_get_aliases(prof_plugin):
     """Test requesting a manufacturer aliases.
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the simulated instrument driver and starter.
+
+"""
+import random
+from time import perf_counter
+
+import pytest
+
+from exopy.instruments.api import InstrIOError
+from exopy.instruments.drivers.simulated import SimulatedDriver, parse_latency
+from exopy.instruments.starters.simulated import SimulatedStarter
+
+
+@pytest.mark.parametrize('spec, low, high',
+                         [('', 0, 0), (0.5, 0.5, 0.5),
+                          ('uniform(0.1, 0.2)', 0.1, 0.2),
+                          ('normal(0.1, 0.5)', 0, float('inf')),
+                          ('lognormal(-3, 0.1)', 0, float('inf')),
+                          ('exponential(0.1)', 0, float('inf'))])
+def test_parse_latency(spec, low, high):
+    """Test building the latency distributions.
+
+    """
+    latency = parse_latency(spec, random.Random(0))
+    assert all(low <= latency() <= high for _ in range(100))
+
+
+@pytest.mark.parametrize('spec', ['-1', 'gamma(1, 2)', 'uniform(1)', 'a',
+                                  'uniform(-1, 1)', 'uniform(1, -0.5)',
+                                  'exponential(0)', 'exponential(-1)'])
+def test_parse_latency_invalid(spec):
+    """Test that invalid descriptions are rejected.
+
+    """
+    with pytest.raises(ValueError):
+        parse_latency(spec, random.Random(0))
+
+
+def test_simulated_driver():
+    """Test querying and setting values with latency.
+
+    """
+    driver = SimulatedDriver({'query_latency': '0.01', 'set_latency': '0',
+                              'seed': '1'})
+    driver.write('FREQ 10')
+    tic = perf_counter()
+    assert driver.query('FREQ?') == '10'
+    assert perf_counter() - tic >= 0.01
+    assert driver.query('POW?') == '0'
+    assert driver.counts == {'query': 2, 'write': 1}
+
+    driver.reset()
+    assert driver.query('FREQ?') == '0'
+    driver.close()
+    with pytest.raises(InstrIOError):
+        driver.query('FREQ?')
+
+
+def test_simulated_driver_bandwidth_and_failures():
+    """Test the bandwidth limit and the failure injection.
+
+    """
+    driver = SimulatedDriver({'bandwidth': '1000'})
+    tic = perf_counter()
+    driver.write('DATA ' + 'a'*15)
+    assert perf_counter() - tic >= 0.02
+
+    driver = SimulatedDriver({'failure_rate': '1'})
+    with pytest.raises(InstrIOError):
+        driver.write('FREQ 1')
+
+    with pytest.raises(ValueError):
+        SimulatedDriver({'failure_rate': '2'})
+
+
+def test_simulated_starter():
+    """Test starting, checking, resetting and stopping a simulated driver.
+
+    """
+    starter = SimulatedStarter()
+    assert starter.check_infos(SimulatedDriver, {'query_latency': '0.1'},
+                               {}) == (True, '')
+    res, msg = starter.check_infos(SimulatedDriver,
+                                   {'query_latency': 'gamma(1)'}, {})
+    assert not res and 'gamma' in msg
+
+    with pytest.raises(InstrIOError):
+        starter.start(SimulatedDriver, {'bandwidth': '-1'}, {})
+
+    driver = starter.start(SimulatedDriver, {}, {})
+    starter.reset(driver)
+    starter.stop(driver)
+    assert not driver.connected
+
+
+def test_simulated_driver_declaration(prof_plugin):
+    """Test that the simulated driver and its starter are contributed.
+
+    """
+    drivers, missing = prof_plugin.get_drivers(
+        ['exopy.Simulation.SimulatedDriver'])
+    assert not missing
+    d_cls, starter = drivers['exopy.Simulation.SimulatedDriver']
+    assert d_cls is SimulatedDriver
+    assert isinstance(starter, SimulatedStarter)
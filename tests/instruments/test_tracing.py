@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the tracing of the communications with the instruments.
+
+"""
+import csv
+from threading import Thread
+
+from exopy.instruments.tracing import IOTracer, TracedDriver, format_summary
+
+
+class Driver(object):
+    """Dummy driver.
+
+    """
+    value = 1
+
+    def __init__(self):
+        self.ch = Channel()
+
+    def query(self, msg):
+        return msg + ';ok'
+
+    def get_channel(self):
+        return self.ch
+
+
+class Channel(object):
+    """Dummy channel of a driver.
+
+    """
+    def query(self, msg):
+        return msg + ';ch'
+
+
+def test_traced_driver():
+    """Test that the calls and attribute accesses are recorded.
+
+    """
+    tracer = IOTracer()
+    driver = Driver()
+    traced = tracer.wrap(driver, 'p')
+    assert isinstance(traced, TracedDriver)
+
+    assert traced.query('a') == 'a;ok'
+    assert traced.value == 1
+    traced.value = 2
+    assert driver.value == 2
+
+    records = tracer.records()
+    assert [r[1:3] for r in records] == [('p', 'query'), ('p', 'value'),
+                                         ('p', 'value=')]
+    assert records[0][4] == 5 and records[1][4] == -1
+    assert all(r[3] >= 0 for r in records)
+
+
+def test_traced_driver_checks():
+    """Test that the proxy passes the isinstance and equality checks.
+
+    """
+    driver = Driver()
+    traced = IOTracer().wrap(driver, 'p')
+    assert isinstance(traced, Driver)
+    assert traced == driver and driver == traced
+    assert traced == IOTracer().wrap(driver, 'p')
+    assert traced != Driver()
+    assert hash(traced) == hash(driver)
+
+
+def test_traced_driver_sub_objects():
+    """Test that the sub-objects of the driver are traced too.
+
+    """
+    tracer = IOTracer()
+    traced = tracer.wrap(Driver(), 'p')
+    assert isinstance(traced.ch, Channel)
+    assert traced.ch.query('a') == 'a;ch'
+    assert traced.get_channel().query('b') == 'b;ch'
+    assert traced.query('c') == 'c;ok'
+
+    names = [r[2] for r in tracer.records()]
+    assert names == ['ch', 'ch', 'ch.query', 'get_channel',
+                     'get_channel.query', 'query']
+
+
+def test_tracer_threads_summary_and_flush(tmpdir):
+    """Test recording from several threads, summarizing and flushing.
+
+    """
+    tracer = IOTracer()
+
+    def record(profile):
+        for i in range(100):
+            tracer.record(profile, 'call', i, 0.001*(i + 1))
+
+    threads = [Thread(target=record, args=(p,)) for p in ('a', 'b')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    summary = tracer.summary()
+    assert summary['a']['count'] == 100
+    assert abs(summary['a']['total'] - 5.05) < 1e-9
+    assert summary['b']['p50'] == 0.05 and summary['b']['p99'] == 0.099
+    assert 'a : 100 calls' in format_summary(summary)
+
+    path = str(tmpdir.join('trace.csv'))
+    tracer.flush(path)
+    assert not tracer.records()
+    with open(path) as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['start', 'profile', 'call', 'duration', 'bytes']
+    assert len(rows) == 201
@@ -269,6 +269,14 @@ def test_execution_editor_widget(exopy_qtbot, task, dialog_sleep):
     exopy_qtbot.wait_until(assert_wait)
     exopy_qtbot.wait(dialog_sleep)
 
+    # Wait only on the tasks writing the read entries.
+    ced.widgets()[4].widgets()[2].checked = True
+
+    def assert_auto():
+        assert ctask.wait.get('auto')
+    exopy_qtbot.wait_until(assert_auto)
+    exopy_qtbot.wait(dialog_sleep)
+
     # Use the popup to edit the list of pools on which to wait.
     # Click ok at the end
     btt = ced.widgets()[4].widgets()[-1]  # ref to the push button
@@ -282,7 +290,7 @@ def test_execution_editor_widget(exopy_qtbot, task, dialog_sleep):
     popup_content[-2].clicked = True
 
     def assert_wait():
-        assert 'test3' in ctask.wait['wait']
+        assert 'test3' in ctask.wait['wait'] and ctask.wait['auto']
     exopy_qtbot.wait_until(assert_wait)
     wait_for_destruction(exopy_qtbot, popup)
     exopy_qtbot.wait(dialog_sleep)
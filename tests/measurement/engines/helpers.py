@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Tasks and helpers shared by the engines tests.
+
+"""
+import logging
+from threading import Thread, Event
+from time import sleep
+
+from atom.api import Bool, Value, set_default
+
+from exopy.measurement.engines.api import ExecutionInfos
+from exopy.tasks.api import RootTask, SimpleTask
+from exopy.tasks.tasks.base_tasks import DEP_TYPE
+from exopy.tasks.tasks.decorators import handle_stop_pause
+
+
+class WritingTask(SimpleTask):
+    """Task writing a value in the database.
+
+    """
+    check_flag = Bool(True).tag(pref=True)
+
+    database_entries = set_default({'value': 0})
+
+    def check(self, *args, **kwargs):
+        super(WritingTask, self).check(*args, **kwargs)
+        return self.check_flag, {} if self.check_flag else {'test': 'fail'}
+
+    def perform(self):
+        logging.getLogger(__name__).info('Writing value')
+        self.write_in_database('value', 1)
+
+
+class LoopingTask(SimpleTask):
+    """Task counting till it is asked to stop.
+
+    """
+    started = Value(factory=Event)
+
+    database_entries = set_default({'value': 0})
+
+    def perform(self):
+        self.started.set()
+        i = 0
+        while not handle_stop_pause(self.root):
+            i += 1
+            self.write_in_database('value', i)
+            sleep(0.01)
+
+
+class BlockingTask(SimpleTask):
+    """Task ignoring the stop requests.
+
+    When executed in another process, it blocks for ever.
+
+    """
+    started = Value(factory=Event)
+
+    go_on = Value(factory=Event)
+
+    database_entries = set_default({'value': 0})
+
+    def perform(self):
+        self.write_in_database('value', 1)
+        self.started.set()
+        self.go_on.wait()
+
+
+class ExecThread(Thread):
+    """Thread storing the return value of the engine perform method.
+
+    """
+    def __init__(self, engine, exec_infos):
+        super(ExecThread, self).__init__()
+        self._engine = engine
+        self._exec_infos = exec_infos
+        self.value = None
+
+    def run(self):
+        self.value = self._engine.perform(self._exec_infos)
+
+
+def build_infos(tmpdir, task, checks=True):
+    """Build the infos for a root task containing the specified task.
+
+    """
+    root = RootTask(default_path=str(tmpdir))
+    root.add_child_task(0, task)
+    deps = {DEP_TYPE: {t.task_id: type(t) for t in (root, task)}}
+    return ExecutionInfos(id='test', task=root, build_deps=deps,
+                          observed_entries=['root/test_value'], checks=checks)
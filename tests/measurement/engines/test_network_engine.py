@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the network engine and its worker.
+
+"""
+import os
+import signal
+import logging
+import logging.config
+from collections import OrderedDict
+from multiprocessing import Pipe, Process
+from time import sleep
+
+import pytest
+
+from exopy.measurement.engines.api import ExecutionInfos
+from exopy.measurement.engines.network_engine.engine import NetworkEngine
+from exopy.measurement.engines.network_engine.protocol import parse_address
+from exopy.measurement.engines.network_engine.worker import NetworkWorker
+from exopy.measurement.engines.utils import terminate_process
+from exopy.tasks.api import RootTask
+from exopy.tasks.tasks.offloading import collect_build_dependencies
+from exopy.tasks.tasks.util.formula_task import FormulaTask
+
+from .helpers import (WritingTask, LoopingTask, BlockingTask, ExecThread,
+                      build_infos)
+
+
+@pytest.yield_fixture
+def engine():
+    engine = NetworkEngine()
+    yield engine
+    engine.shutdown(force=True)
+
+
+def serve(pipe):
+    """Run a worker serving any number of engines.
+
+    """
+    logging.config.dictConfig({'version': 1,
+                               'disable_existing_loggers': True,
+                               'root': {'level': 'INFO', 'handlers': []}})
+    worker = NetworkWorker(stop_timeout=0.1)
+    pipe.send(worker.address)
+    pipe.close()
+    worker.serve()
+
+
+@pytest.yield_fixture
+def remote_worker():
+    """Worker running in a separate process and reached through its address.
+
+    """
+    pipe, worker_pipe = Pipe()
+    process = Process(target=serve, args=(worker_pipe,))
+    process.start()
+    address = pipe.recv()
+    yield '%s:%d' % address
+    terminate_process(process)
+
+
+def wait_for_news(news):
+    """Wait for the engine to report progress.
+
+    """
+    while not news:
+        sleep(0.01)
+
+
+def test_parse_address():
+    """Test parsing a worker address.
+
+    """
+    assert parse_address('192.168.0.2:8642') == ('192.168.0.2', 8642)
+    assert parse_address(':8642') == ('127.0.0.1', 8642)
+
+
+@pytest.mark.timeout(30)
+def test_perform(engine, tmpdir, caplog):
+    """Test running several measurements over a single connection.
+
+    """
+    caplog.set_level(logging.INFO)
+    news = []
+    engine.observe('progress', news.append)
+
+    infos = engine.perform(build_infos(tmpdir, WritingTask(name='test')))
+    assert infos.success
+    assert not infos.errors
+    assert news == [('root/test_value', 1)]
+    assert engine.status == 'Waiting'
+    assert 'Writing value' in caplog.text
+    assert [f for f in tmpdir.listdir() if f.ext == '.log']
+
+    connection = engine._connection
+    worker = engine._local_worker
+    for i in range(3):
+        assert engine.perform(build_infos(tmpdir,
+                                          WritingTask(name='test'))).success
+    assert engine._connection is connection
+    assert engine._local_worker is worker
+
+    engine.shutdown()
+    assert engine.status == 'Stopped'
+    assert not worker.is_alive()
+
+
+@pytest.mark.timeout(30)
+def test_perform_offloaded_task(engine, tmpdir):
+    """Test that the tasks can start processes in the local worker.
+
+    """
+    root = RootTask(default_path=str(tmpdir))
+    root.add_child_task(0, FormulaTask(name='f',
+                                       formulas=OrderedDict([('res', '2*3')]),
+                                       parallel={'activated': True,
+                                                 'pool': 'test',
+                                                 'process': True}))
+    news = []
+    engine.observe('progress', news.append)
+    infos = ExecutionInfos(id='test', task=root,
+                           build_deps=collect_build_dependencies(
+                               root.traverse()),
+                           observed_entries=['root/f_res'])
+    infos = engine.perform(infos)
+    assert infos.success, infos.errors
+    assert news == [('root/f_res', 6)]
+
+
+@pytest.mark.timeout(30)
+def test_handle_fail_check(engine, tmpdir):
+    """Test that failing checks prevent the execution.
+
+    """
+    infos = build_infos(tmpdir, WritingTask(name='test', check_flag=False))
+    infos = engine.perform(infos)
+    assert not infos.success
+    assert 'test' in infos.errors
+
+    infos = build_infos(tmpdir, WritingTask(name='test', check_flag=False),
+                        checks=False)
+    assert engine.perform(infos).success
+
+
+@pytest.mark.timeout(30)
+def test_pause_resume_stop(engine, tmpdir):
+    """Test pausing, resuming and stopping the execution.
+
+    """
+    news = []
+    engine.observe('progress', news.append)
+    t = ExecThread(engine, build_infos(tmpdir, LoopingTask(name='test')))
+    t.start()
+    wait_for_news(news)
+
+    engine.pause()
+    while engine.status != 'Paused':
+        sleep(0.01)
+
+    engine.resume()
+    while engine.status != 'Running':
+        sleep(0.01)
+
+    engine.stop()
+    t.join()
+    assert engine.status == 'Waiting'
+
+    # The worker is ready for the next measurement.
+    assert engine.perform(build_infos(tmpdir,
+                                      WritingTask(name='test'))).success
+
+
+@pytest.mark.timeout(30)
+def test_force_stop(engine, tmpdir):
+    """Test forcing the stop of a task ignoring the stop requests.
+
+    """
+    news = []
+    engine.observe('progress', news.append)
+    t = ExecThread(engine, build_infos(tmpdir, BlockingTask(name='test')))
+    t.start()
+    wait_for_news(news)
+    worker = engine._local_worker
+
+    engine.stop(force=True)
+    t.join()
+    assert not t.value.success
+    assert 'terminated' in t.value.errors['engine']
+    assert engine.status == 'Stopped'
+    assert not worker.is_alive()
+
+    # A new worker is started for the next measurement.
+    assert engine.perform(build_infos(tmpdir,
+                                      WritingTask(name='test'))).success
+
+
+@pytest.mark.timeout(30)
+def test_worker_death(engine, tmpdir):
+    """Test handling the unexpected death of the worker.
+
+    """
+    news = []
+    engine.observe('progress', news.append)
+    t = ExecThread(engine, build_infos(tmpdir, BlockingTask(name='test')))
+    t.start()
+    wait_for_news(news)
+
+    os.kill(engine._local_worker.pid, signal.SIGKILL)
+    t.join()
+    assert not t.value.success
+    assert 'lost' in t.value.errors['engine']
+    assert engine.status == 'Stopped'
+
+
+@pytest.mark.timeout(30)
+def test_force_stop_remote_worker(remote_worker, tmpdir):
+    """Test forcing the stop of a task ignoring the stop requests on a remote
+    worker.
+
+    """
+    engine = NetworkEngine(address=remote_worker)
+    news = []
+    engine.observe('progress', news.append)
+    t = ExecThread(engine, build_infos(tmpdir, BlockingTask(name='test')))
+    t.start()
+    wait_for_news(news)
+
+    engine.stop(force=True)
+    t.join()
+    assert not t.value.success
+    assert 'may still be running' in t.value.errors['engine']
+    assert engine.status == 'Stopped'
+
+    # The worker keeps serving the engines but refuses the measurements till
+    # the blocked one exits.
+    engine = NetworkEngine(address=remote_worker)
+    try:
+        infos = engine.perform(build_infos(tmpdir, WritingTask(name='test')))
+        assert not infos.success
+        assert 'already running' in infos.errors['engine']
+    finally:
+        engine.shutdown(force=True)
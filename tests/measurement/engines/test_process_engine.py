@@ -10,7 +10,9 @@
 
 """
 import gc
+import os
 import socket
+from collections import OrderedDict
 from threading import Thread
 from time import sleep
 
@@ -19,9 +21,18 @@ import pytest
 from atom.api import Bool, Str, Value
 
 from exopy.measurement.engines.api import ExecutionInfos
+from exopy.measurement.engines.process_engine.engine import\
+    collect_preload_modules
 from exopy.measurement.engines.process_engine.subprocess import TaskProcess
+from exopy.measurement.engines.process_engine.serialization import\
+    InfosEncoder, InfosDecoder, CONFIG_CACHE_SIZE
 from exopy.tasks.api import RootTask, SimpleTask
 from exopy.tasks.infos import TaskInfos
+from exopy.tasks.tasks.logic.loop_task import LoopTask
+from exopy.tasks.tasks.logic.loop_iterable_interface\
+    import IterableLoopInterface
+from exopy.tasks.tasks.offloading import collect_build_dependencies
+from exopy.tasks.tasks.util.formula_task import FormulaTask
 
 with enaml.imports():
     from exopy.measurement.engines.process_engine.engine_declaration import\
@@ -54,6 +65,18 @@ class WaitingTask(SimpleTask):
             s.recv(4096)
 
 
+class PidTask(SimpleTask):
+    """Task recording the process executing it in a file and blocking.
+
+    """
+    folder = Str().tag(pref=True)
+
+    def perform(self):
+        with open(os.path.join(self.folder, str(os.getpid())), 'w'):
+            pass
+        sleep(1000)
+
+
 class ExecThread(Thread):
     """Thread storing the return value of the engine perform method.
 
@@ -230,6 +253,13 @@ def test_perform(process_engine, exec_infos, sync_server):
     t.join()
     assert t.value.success
     assert process_engine.status == 'Waiting'
+    assert not process_engine.pooled_profiles
+
+    # Closing connections while the subprocess is waiting.
+    process_engine.close_connections(['p'])
+    process_engine.pooled_profiles = ['p']
+    process_engine.close_connections(['p'])
+    assert not process_engine.pooled_profiles
 
     process_engine.shutdown()
     while not process_engine.status == 'Stopped':
@@ -276,6 +306,69 @@ def test_skipping_checks(process_engine, exec_infos, sync_server):
         sleep(0.01)
 
 
+def test_infos_encoding():
+    """Test that only the infos unknown to the subprocess are sent.
+
+    """
+    encoder = InfosEncoder()
+    decoder = InfosDecoder()
+    root = RootTask()
+    root.update_preferences_from_members()
+    deps = {'exopy.task': {'exopy.RootTask': RootTask}}
+
+    config, build = encoder.encode(root.preferences, deps)
+    assert config[1] is not None
+    assert build == deps
+    prefs, build = decoder.decode(config, build)
+    assert prefs == root.preferences.dict()
+    assert build == deps
+
+    # The subprocess holds everything.
+    config, build = encoder.encode(root.preferences, deps)
+    assert config[1] is None
+    assert not build
+    assert decoder.decode(config, build) == (prefs, deps)
+
+    # Only the modified dependencies are sent.
+    deps = {'exopy.task': {'exopy.RootTask': RootTask,
+                           'exopy.SimpleTask': SimpleTask}}
+    config, build = encoder.encode(root.preferences, deps)
+    assert build == {'exopy.task': {'exopy.SimpleTask': SimpleTask}}
+    assert decoder.decode(config, build)[1] == deps
+
+    # The least recently used preferences are forgotten.
+    key = config[0]
+    for i in range(CONFIG_CACHE_SIZE):
+        root.default_path = str(i)
+        root.update_preferences_from_members()
+        decoder.decode(*encoder.encode(root.preferences, deps))
+    assert key not in decoder._configs
+    root.default_path = ''
+    root.update_preferences_from_members()
+    config, build = encoder.encode(root.preferences, deps)
+    assert config[1] is not None
+    assert decoder.decode(config, build)[0] == prefs
+
+    # A new subprocess holds nothing.
+    encoder.reset()
+    config, build = encoder.encode(root.preferences, deps)
+    assert config[1] is not None
+    assert build == deps
+
+
+def test_subprocess_args_for_requeued_measurement(process_engine,
+                                                  exec_infos):
+    """Test that sending again a measurement sends only its hash.
+
+    """
+    args = process_engine._build_subprocess_args(exec_infos)
+    assert args[1][1] is not None
+    assert args[2]
+    args = process_engine._build_subprocess_args(exec_infos)
+    assert args[1][1] is None
+    assert not args[2]
+
+
 class DummyP(TaskProcess):
     def run(self):
         pass
@@ -571,6 +664,144 @@ def test_force_stop(process_engine, exec_infos, sync_server):
     assert process_engine.status == 'Stopped'
 
 
+@pytest.mark.timeout(60)
+def test_perform_loop_in_worker_processes(process_engine, tmpdir):
+    """Test that the tasks can start processes in the subprocess.
+
+    """
+    root = RootTask(default_path=str(tmpdir))
+    loop = LoopTask(name='loop', processes=2,
+                    interface=IterableLoopInterface(iterable='range(4)'))
+    formulas = OrderedDict([('square', '{loop_value}**2')])
+    loop.add_child_task(0, FormulaTask(name='f', formulas=formulas))
+    root.add_child_task(0, loop)
+
+    news = []
+    process_engine.observe('progress', news.append)
+    infos = ExecutionInfos(id='test', task=root,
+                           build_deps=collect_build_dependencies(
+                               root.traverse()),
+                           observed_entries=['root/loop/f_square'])
+    infos = process_engine.perform(infos)
+    assert infos.success, infos.errors
+    while ('root/loop/f_square', 9) not in news:
+        sleep(0.01)
+
+    process_engine.shutdown()
+    while not process_engine.status == 'Stopped':
+        sleep(0.01)
+    assert not process_engine._process.is_alive()
+
+
+@pytest.mark.timeout(60)
+def test_perform_offloaded_task(process_engine, tmpdir):
+    """Test that the tasks can offload their work to a helper process.
+
+    """
+    root = RootTask(default_path=str(tmpdir))
+    root.add_child_task(0, FormulaTask(name='f',
+                                       formulas=OrderedDict([('res', '2*3')]),
+                                       parallel={'activated': True,
+                                                 'pool': 'test',
+                                                 'process': True}))
+
+    news = []
+    process_engine.observe('progress', news.append)
+    infos = ExecutionInfos(id='test', task=root,
+                           build_deps=collect_build_dependencies(
+                               root.traverse()),
+                           observed_entries=['root/f_res'])
+    infos = process_engine.perform(infos)
+    assert infos.success, infos.errors
+    while ('root/f_res', 6) not in news:
+        sleep(0.01)
+
+
+@pytest.mark.timeout(60)
+def test_force_stop_loop_in_worker_processes(process_engine, tmpdir):
+    """Test that a forced stop terminates the processes started by the tasks.
+
+    """
+    folder = tmpdir.mkdir('pids')
+    root = RootTask(default_path=str(tmpdir))
+    loop = LoopTask(name='loop', processes=2,
+                    interface=IterableLoopInterface(iterable='range(2)'))
+    loop.add_child_task(0, PidTask(name='pid', folder=str(folder)))
+    root.add_child_task(0, loop)
+    infos = ExecutionInfos(id='test', task=root,
+                           build_deps=collect_build_dependencies(
+                               root.traverse()))
+
+    t = ExecThread(process_engine, infos)
+    t.start()
+    while len(folder.listdir()) < 2:
+        sleep(0.01)
+    process_engine.stop(force=True)
+    t.join()
+    assert 'terminated' in t.value.errors['engine']
+    assert not process_engine._process.is_alive()
+
+    for f in folder.listdir():
+        with pytest.raises(OSError):
+            os.kill(int(f.basename), 0)
+
+
+def test_collect_preload_modules(measurement_workbench):
+    """Test collecting the modules of the known tasks and interfaces.
+
+    """
+    measurement_workbench.register(TasksManagerManifest())
+    modules = collect_preload_modules(measurement_workbench)
+    assert 'exopy.tasks.tasks.logic.loop_task' in modules
+    assert 'exopy.tasks.tasks.logic.loop_iterable_interface' in modules
+    assert modules == sorted(set(modules))
+
+
+@pytest.mark.timeout(30)
+def test_prewarm(measurement_workbench):
+    """Test that creating a non default engine starts the subprocess.
+
+    """
+    measurement_workbench.register(LogManifest())
+    measurement_workbench.register(TasksManagerManifest())
+    plugin = measurement_workbench.get_plugin('exopy.measurement')
+    engine = plugin.create('engine', 'exopy.process_engine', default=False)
+    try:
+        assert engine.preload_modules
+        assert engine._process.is_alive()
+        assert engine._process.preload == engine.preload_modules
+        process = engine._process
+        engine.prewarm()
+        assert engine._process is process
+    finally:
+        engine.shutdown()
+        while not engine.status == 'Stopped':
+            sleep(0.01)
+        assert not engine._process.is_alive()
+
+
+@pytest.mark.timeout(30)
+def test_force_stop_hot_standby(process_engine, exec_infos, sync_server):
+    """Test that a new process is ready after a forced stop.
+
+    """
+    process_engine.hot_standby = True
+    t = ExecThread(process_engine, exec_infos)
+    t.start()
+    sync_server.wait('test1')
+    old = process_engine._process
+    process_engine.stop(force=True)
+    t.join()
+    assert 'terminated' in t.value.errors['engine']
+    assert process_engine._process is not old
+    assert process_engine._process.is_alive()
+
+    process_engine.shutdown()
+    while not process_engine.status == 'Stopped':
+        sleep(0.01)
+    assert not process_engine._process.is_alive()
+
+
 @pytest.mark.timeout(30)
 def test_shutdown(process_engine, exec_infos, sync_server):
     """Test shutting down the engine during the execution.
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the thread engine.
+
+"""
+import logging
+from time import sleep
+
+import pytest
+
+from exopy.measurement.engines.thread_engine.engine import ThreadEngine
+
+from .helpers import (WritingTask, LoopingTask, BlockingTask, ExecThread,
+                      build_infos)
+
+
+def test_perform(tmpdir):
+    """Test running a task and getting the monitored values.
+
+    """
+    engine = ThreadEngine()
+    news = []
+    engine.observe('progress', news.append)
+    infos = build_infos(tmpdir, WritingTask(name='test'))
+
+    assert engine.perform(infos).success
+    assert news == [('root/test_value', 1)]
+    assert engine.status == 'Waiting'
+    assert [f for f in tmpdir.listdir() if f.ext == '.log']
+
+    root = infos.task
+    assert not root.database.running
+    assert root.get_from_database('test_value') == 0
+
+    # The task hierarchy can be run again.
+    assert engine.perform(infos).success
+
+
+@pytest.mark.timeout(30)
+def test_rate_limited_monitoring(tmpdir):
+    """Test that the monitored values are sent at most at monitor_rate.
+
+    """
+    engine = ThreadEngine(monitor_rate=10)
+    news = []
+    engine.observe('progress', news.append)
+    task = LoopingTask(name='test')
+    t = ExecThread(engine, build_infos(tmpdir, task))
+    t.start()
+    assert task.started.wait(10)
+    sleep(0.5)
+    engine.stop()
+    t.join()
+
+    # Only the latest values were sent.
+    values = [v for _, v in news]
+    assert values and values == sorted(values)
+    assert len(values) < values[-1]
+
+
+@pytest.mark.timeout(30)
+def test_measurement_log(tmpdir, caplog):
+    """Test that the measurement log only records the measurement threads.
+
+    """
+    caplog.set_level(logging.INFO)
+    engine = ThreadEngine()
+    task = BlockingTask(name='test')
+    t = ExecThread(engine, build_infos(tmpdir, task))
+    t.start()
+    assert task.started.wait(10)
+    logging.getLogger('exopy.app').info('Unrelated record')
+    task.go_on.set()
+    t.join()
+
+    log, = [f for f in tmpdir.listdir() if f.ext == '.log']
+    content = log.read()
+    assert 'Check successful' in content
+    assert 'Unrelated record' not in content
+
+
+def test_handle_fail_check(tmpdir):
+    """Test that failing checks prevent the execution.
+
+    """
+    engine = ThreadEngine()
+    infos = build_infos(tmpdir, WritingTask(name='test', check_flag=False))
+    infos = engine.perform(infos)
+    assert not infos.success
+    assert 'test' in infos.errors
+
+
+def test_skipping_checks(tmpdir):
+    """Test that the checks are not run when not requested.
+
+    """
+    engine = ThreadEngine()
+    infos = build_infos(tmpdir, WritingTask(name='test', check_flag=False),
+                        checks=False)
+    assert engine.perform(infos).success
+
+
+@pytest.mark.timeout(30)
+def test_pause_resume_stop(tmpdir):
+    """Test pausing, resuming and stopping the execution.
+
+    """
+    engine = ThreadEngine()
+    task = LoopingTask(name='test')
+    t = ExecThread(engine, build_infos(tmpdir, task))
+    t.start()
+    assert task.started.wait(10)
+
+    engine.pause()
+    while engine.status != 'Paused':
+        sleep(0.01)
+
+    engine.resume()
+    while engine.status != 'Running':
+        sleep(0.01)
+
+    engine.stop()
+    t.join()
+    assert not t.value.success
+    assert engine.status == 'Waiting'
+
+
+@pytest.mark.timeout(30)
+def test_force_stop(tmpdir):
+    """Test forcing the stop of a task ignoring the stop requests.
+
+    """
+    engine = ThreadEngine(force_stop_timeout=0.1)
+    task = BlockingTask(name='test')
+    t = ExecThread(engine, build_infos(tmpdir, task))
+    t.start()
+    assert task.started.wait(10)
+
+    engine.stop(force=True)
+    t.join()
+    assert 'terminated' in t.value.errors['engine']
+    assert 'may still be running' in t.value.errors['engine']
+    assert engine.status == 'Stopped'
+
+    infos = engine.perform(build_infos(tmpdir, WritingTask(name='test')))
+    assert not infos.success
+    assert 'still running' in infos.errors['engine']
+
+    task.go_on.set()
+    engine._thread.join()
+    infos = engine.perform(build_infos(tmpdir, WritingTask(name='test')))
+    assert infos.success
+
+
+@pytest.mark.timeout(30)
+def test_shutdown(tmpdir):
+    """Test shutting down the engine during the execution.
+
+    """
+    engine = ThreadEngine()
+    task = LoopingTask(name='test')
+    t = ExecThread(engine, build_infos(tmpdir, task))
+    t.start()
+    assert task.started.wait(10)
+
+    engine.shutdown()
+    assert engine.status == 'Shutting down'
+    t.join()
+    assert engine.status == 'Stopped'
+
+
+def test_shutdown_unused_engine():
+    """Test shutting down the engine before it was ever used.
+
+    """
+    engine = ThreadEngine()
+    engine.shutdown()
+    assert engine.status == 'Stopped'
@@ -9,17 +9,26 @@
 """Test engine utilities
 
 """
-from multiprocessing import Queue
-from pickle import dumps
+import os
+import signal
+from multiprocessing import Queue, Process, Event, Pipe
+from pickle import dumps, loads
+from time import sleep
 
+import numpy as np
 import pytest
 
 from exopy.tasks.tasks.database import TaskDatabase
 from exopy.measurement.engines.api import BaseEngine
-from exopy.measurement.engines.utils import MeasureSpy, ThreadMeasureMonitor
+from exopy.measurement.engines.utils import (MeasureSpy, ThreadMeasureMonitor,
+                                             ArraySummary, SharedArrayStore,
+                                             ARRAY_PREVIEW_SIZE,
+                                             summarize_array,
+                                             exit_on_terminate,
+                                             terminate_process)
 
 
-def test_spy(caplog):
+def test_spy():
     """Test the measurement spy working.
 
     """
@@ -44,11 +53,179 @@ def test_spy(caplog):
     data.set_value('root', 'test', 1)
     assert q.get(2) == ('root/test', 1)
 
+    # The queue reports the pickling error and sends the next values.
     data.set_value('root', 'test', A())
-    assert caplog.records
+    data.set_value('root', 'test', 2)
+    assert q.get(2) == ('root/test', 2)
+
+    data.set_value('root', 'test2', 1)
+    assert q.empty()
+
+    spy.close()
+    assert q.get(2) == ('', '')
+
+
+def test_rate_limited_spy():
+    """Test that a rate limited spy sends only the latest values.
+
+    """
+    q = Queue()
+    data = TaskDatabase()
+    data.set_value('root', 'test', 0)
+    data.set_value('root', 'test2', 0)
+    data.prepare_to_run()
 
+    spy = MeasureSpy(queue=q, observed_database=data,
+                     observed_entries=('root/test', 'root/test2'),
+                     max_rate=1e-3)
+
+    for i in range(100):
+        data.set_value('root', 'test', i)
     data.set_value('root', 'test2', 1)
     assert q.empty()
+    assert spy.dropped == 99
+
+    spy.flush()
+    assert sorted([q.get(2), q.get(2)]) == [('root/test', 99),
+                                            ('root/test2', 1)]
+
+    # The last value is sent when closing the spy.
+    data.set_value('root', 'test', 100)
+    spy.close()
+    assert not spy._flush_thread.is_alive()
+    assert q.get(2) == ('root/test', 100)
+    assert q.get(2) == ('', '')
+
+
+def test_rate_limited_spy_periodic_flush():
+    """Test that the values are sent periodically.
+
+    """
+    q = Queue()
+    data = TaskDatabase()
+    data.set_value('root', 'test', 0)
+    data.prepare_to_run()
+
+    spy = MeasureSpy(queue=q, observed_database=data,
+                     observed_entries=('root/test',), max_rate=50)
+    data.set_value('root', 'test', 1)
+    assert q.get(timeout=2) == ('root/test', 1)
+    spy.close()
+    assert q.get(2) == ('', '')
+
+
+def test_array_summary():
+    """Test summarizing an array.
+
+    """
+    array = np.arange(10000.).reshape((50, 200))
+    summary = loads(dumps(ArraySummary(array)))
+    assert summary.shape == (50, 200)
+    assert summary.dtype == array.dtype.str
+    assert (summary.min, summary.max) == (0, 9999)
+    assert summary.mean == array.mean()
+    assert summary.preview.shape == (50, ARRAY_PREVIEW_SIZE)
+    assert np.array_equal(summary.preview, array[:, ::2])
+    assert summary.fetch() is None
+    assert '(50, 200)' in '{}'.format(summary)
+
+    summary = ArraySummary(np.array(['a', 'b']))
+    assert summary.mean is None
+    assert 'mean' not in str(summary)
+
+
+def test_shared_array_store():
+    """Test fetching the full array published in shared memory.
+
+    """
+    store = SharedArrayStore()
+    try:
+        array = np.random.random(1000)
+        summary = ArraySummary(array, *store.publish('root/test', array))
+        assert np.array_equal(summary.fetch(), array)
+
+        # The entry alternates between two blocks so the values of the last
+        # summary are not overwritten by the next ones.
+        name = summary.shm_name
+        other = np.random.random(500)
+        other_name, sequence = store.publish('root/test', other)
+        assert other_name != name
+        assert np.array_equal(summary.fetch(), array)
+        last = ArraySummary(other, other_name, sequence)
+        assert np.array_equal(last.fetch(), other)
+
+        # The block is reused if it is large enough, and the previous values
+        # are then no longer available.
+        assert store.publish('root/test', other)[0] == name
+        assert summary.fetch() is None
+        assert np.array_equal(last.fetch(), other)
+
+        array = np.random.random(2000)
+        summary = ArraySummary(array, *store.publish('root/test', array))
+        assert summary.shm_name not in (name, other_name)
+        assert np.array_equal(summary.fetch(), array)
+
+        assert store.publish('root/test2', np.array([object()])) is None
+    finally:
+        store.close()
+    assert summary.fetch() is None
+
+
+def publish_array(pipe):
+    """Publish an array and send its summary till asked to exit.
+
+    """
+    store = SharedArrayStore()
+    pipe.send(summarize_array('root/test', np.arange(2000.), store))
+    pipe.recv()
+    store.close()
+
+
+def test_fetch_from_other_process():
+    """Test fetching an array published by another process.
+
+    """
+    pipe, process_pipe = Pipe()
+    process = Process(target=publish_array, args=(process_pipe,))
+    process.start()
+    try:
+        summary = pipe.recv()
+        assert np.array_equal(summary.fetch(), np.arange(2000.))
+    finally:
+        pipe.send(None)
+        process.join()
+    assert process.exitcode == 0
+    assert summary.fetch() is None
+
+
+def test_spy_summarizing_arrays():
+    """Test that the spy sends the large arrays as summaries.
+
+    """
+    q = Queue()
+    data = TaskDatabase()
+    data.set_value('root', 'test', 0)
+    data.prepare_to_run()
+
+    store = SharedArrayStore()
+    spy = MeasureSpy(queue=q, observed_database=data,
+                     observed_entries=('root/test',), array_store=store)
+    try:
+        array = np.ones(10)
+        data.set_value('root', 'test', array)
+        assert np.array_equal(q.get(2)[1], array)
+
+        array = np.ones(10000)
+        data.set_value('root', 'test', array)
+        entry, summary = q.get(2)
+        assert isinstance(summary, ArraySummary)
+        assert np.array_equal(summary.fetch(), array)
+
+        spy.array_threshold = 0
+        data.set_value('root', 'test', array)
+        assert isinstance(q.get(2)[1], np.ndarray)
+    finally:
+        store.close()
 
     spy.close()
     assert q.get(2) == ('', '')
@@ -90,3 +267,79 @@ def test_monitor_thread(caplog):
 
     assert caplog.records
     assert e.test == 'test'
+
+
+def wait_for_termination(started, cleaned):
+    """Block till terminated and signal that the cleanup ran.
+
+    """
+    exit_on_terminate()
+    try:
+        started.set()
+        sleep(1000)
+    finally:
+        cleaned.set()
+
+
+def ignore_termination(started):
+    """Block ignoring the termination requests.
+
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    started.set()
+    sleep(1000)
+
+
+def report_termination_handler(queue):
+    """Report whether the termination is handled by default.
+
+    """
+    queue.put(signal.getsignal(signal.SIGTERM) == signal.SIG_DFL)
+
+
+def fork_after_exit_on_terminate(queue):
+    """Start a process after handling the termination.
+
+    """
+    exit_on_terminate()
+    queue.put(signal.getsignal(signal.SIGTERM) == signal.SIG_DFL)
+    p = Process(target=report_termination_handler, args=(queue,))
+    p.start()
+    p.join()
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='Relies on POSIX signals')
+@pytest.mark.timeout(30)
+def test_exit_on_terminate_forked_processes():
+    """Test that the processes forked after exit_on_terminate are terminated
+    by default.
+
+    """
+    q = Queue()
+    p = Process(target=fork_after_exit_on_terminate, args=(q,))
+    p.start()
+    assert q.get(timeout=10) is False
+    assert q.get(timeout=10) is True
+    p.join()
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='Relies on POSIX signals')
+@pytest.mark.timeout(30)
+def test_terminate_process():
+    """Test that terminated processes clean up and that stuck ones are killed.
+
+    """
+    started, cleaned = Event(), Event()
+    p = Process(target=wait_for_termination, args=(started, cleaned))
+    p.start()
+    started.wait()
+    terminate_process(p)
+    assert not p.is_alive()
+    assert cleaned.is_set()
+
+    started = Event()
+    p = Process(target=ignore_termination, args=(started,))
+    p.start()
+    started.wait()
+    terminate_process(p, timeout=0.1)
+    assert p.exitcode == -signal.SIGKILL
@@ -378,6 +378,55 @@ def test_process_news(exopy_qtbot, monitor, database):
     # Should simply pass silently
 
 
+def test_process_news_batched_refresh(exopy_qtbot, monitor, database):
+    """Test that the entries are refreshed once for many news.
+
+    """
+    database.observe('notifier', monitor.handle_database_entries_change)
+    database.set_value('root', 'test_loop', 10)
+    database.set_value('root', 'test_index', 1)
+
+    formatted = []
+
+    class CountingEntry(MonitoredEntry):
+
+        def update(self, database_vals):
+            formatted.append(self.path)
+            super(CountingEntry, self).update(database_vals)
+
+    entries = [CountingEntry(name=e, path='root/' + e,
+                             formatting='{root/%s}' % e,
+                             depend_on=['root/' + e])
+               for e in ('test_loop', 'test_index')]
+    monitor.remove_entries('displayed', monitor.displayed_entries)
+    monitor.add_entries('displayed', entries)
+
+    monitor.refresh_rate = 10
+    monitor._last_refresh = 0
+    for i in range(100):
+        monitor.process_news(('root/test_index', i))
+    assert not formatted
+
+    def assert_refreshed():
+        assert entries[1].value == '99'
+    exopy_qtbot.wait_until(assert_refreshed)
+    assert formatted == ['root/test_index']
+
+    # The next refresh waits for the end of the frame.
+    monitor.process_news(('root/test_loop', 5))
+    assert monitor._refresh_scheduled
+
+    def assert_refreshed():
+        assert entries[0].value == '5'
+    exopy_qtbot.wait_until(assert_refreshed)
+    assert formatted == ['root/test_index', 'root/test_loop']
+
+    # Without a refresh rate each news is processed immediately.
+    monitor.refresh_rate = 0
+    monitor.process_news(('root/test_loop', 6))
+    assert entries[0].value == '6'
+
+
 def test_clear_state(monitor, database):
     """Test clearing the monitor state.
 
@@ -253,6 +253,26 @@ def test_accessing_build_dependencies(measurement, monkeypatch):
     assert 'dummy' in deps.errors
 
 
+def test_analysing_runtime(measurement):
+    """Test analysing the runtimes without collecting them.
+
+    """
+    measurement.add_tool('pre-hook', 'dummy')
+
+    class RT(RootTask):
+
+        dep_type = 'dummy'
+
+    measurement.root_task = RT()
+
+    deps = measurement.dependencies
+    assert deps.analyse_runtimes() == (True, '', {})
+    analysis = deps.get_runtime_analysis()
+    assert 'dummy1' in analysis and 'dummy2' in analysis
+    with pytest.raises(RuntimeError):
+        deps.get_runtime_dependencies('main')
+
+
 def test_collecting_runtime(measurement, monkeypatch):
     """Test collecting/releasing runtimes.
 
@@ -172,6 +172,72 @@ def test_running_full_measurement(exopy_qtbot, processor, measurement_with_tools
     assert measure2.status == 'READY'
 
 
+@pytest.mark.timeout(60)
+def test_running_measurements_concurrently(exopy_qtbot, processor,
+                                           measurement, tmpdir):
+    """Test running two measurements using distinct instruments at once.
+
+    """
+    plugin = processor.plugin
+    plugin.workers = 2
+    measurement.root_task.default_path = str(tmpdir)
+    measure2 = Measurement(plugin=plugin,
+                           root_task=RootTask(default_path=str(tmpdir)),
+                           name='Dummy', id='002')
+    plugin.enqueued_measurements.add(measurement)
+    plugin.enqueued_measurements.add(measure2)
+
+    processor.continuous_processing = True
+    processor.start_measurement(measurement)
+
+    def assert_both_running():
+        assert processor.engine and processor.workers
+        worker = processor.workers[0]
+        assert worker.engine
+        assert processor.engine.waiting.is_set()
+        assert worker.engine.waiting.is_set()
+    exopy_qtbot.wait_until(assert_both_running, timeout=20e3)
+
+    worker = processor.workers[0]
+    assert worker.running_measurement is measure2
+    assert worker.engine is not processor.engine
+    processor.engine.go_on.set()
+    worker.engine.go_on.set()
+
+    process_and_join_thread(exopy_qtbot, processor._thread)
+    assert measurement.status == 'COMPLETED'
+    assert measure2.status == 'COMPLETED'
+    assert not processor._claimed
+
+
+def test_claiming_measurements(processor, measurement, monkeypatch):
+    """Test that measurements sharing instruments are never run concurrently
+    and keep their order.
+
+    """
+    from exopy.measurement import processor as proc_module
+    plugin = processor.plugin
+    profiles = {'001': {'a'}, '002': {'a', 'b'}, '003': {'c'}, '004': {'b'}}
+    monkeypatch.setattr(proc_module, 'measurement_profiles',
+                        lambda m: set(profiles[m.id]))
+
+    plugin.enqueued_measurements.add(measurement)
+    meas = {'001': measurement}
+    for i in ('002', '003', '004'):
+        meas[i] = Measurement(plugin=plugin, root_task=RootTask(),
+                              name='Dummy', id=i)
+        plugin.enqueued_measurements.add(meas[i])
+
+    assert processor._claim_measurement(measurement) is measurement
+    assert processor._claim_measurement() is meas['003']
+    assert processor._claim_measurement() is None
+
+    measurement.status = 'COMPLETED'
+    processor._release_measurement(measurement)
+    assert processor._claim_measurement() is meas['002']
+    assert processor._claim_measurement() is None
+
+
 @pytest.mark.timeout(60)
 def test_running_measurement_whose_runtime_are_unavailable(
         processor, monkeypatch, measurement_with_tools, exopy_qtbot):
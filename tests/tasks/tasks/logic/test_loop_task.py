@@ -10,7 +10,11 @@
 
 """
 import gc
+import threading
+from collections import OrderedDict
 from multiprocessing import Event
+from threading import Timer
+from time import perf_counter, sleep
 
 import pytest
 import enaml
@@ -24,8 +28,15 @@ from exopy.tasks.tasks.logic.loop_iterable_interface\
     import IterableLoopInterface
 from exopy.tasks.tasks.logic.loop_linspace_interface\
     import LinspaceLoopInterface
+from exopy.tasks.tasks.logic.loop_streaming_interface\
+    import StreamingLoopInterface
+from exopy.tasks.tasks.logic.loop_npy_interface import NpyFileLoopInterface
+from exopy.tasks.tasks.logic.loop_rate_interface\
+    import FixedRateLoopInterface
 from exopy.tasks.tasks.logic.loop_exceptions_tasks\
     import BreakTask, ContinueTask
+from exopy.tasks.tasks.util.formula_task import FormulaTask
+from exopy.tasks.tasks.instr_task import InstrumentTask
 
 with enaml.imports():
     from exopy.tasks.tasks.logic.views.loop_view import LoopView
@@ -158,6 +169,8 @@ class TestLoopTask(object):
         self.root.add_child_task(0, self.task)
 
     def teardown(self):
+        # Terminate the worker processes left by the loops.
+        self.root.release_resources()
         del self.root.should_pause
         del self.root.should_stop
         # Ensure we collect the file descriptor of the events. Otherwise we can
@@ -402,6 +415,77 @@ class TestLoopTask(object):
         assert len(traceback) == 1
         assert 'root/Test-iterable' in traceback
 
+    def test_check_streaming_interface(self):
+        """Test checking a streaming interface.
+
+        """
+        self.task.interface = StreamingLoopInterface(iterable='range(3)')
+
+        test, traceback = self.task.check()
+        assert test
+        assert not traceback
+        assert self.task.get_from_database('Test_point_number') == 3
+        assert self.task.get_from_database('Test_value') == 0
+        assert not len(self.task.get_from_database('Test_loop_values'))
+
+        self.task.interface.iterable = '(i for i in range(2, 5))'
+        test, traceback = self.task.check()
+        assert test
+        assert self.task.get_from_database('Test_point_number') == -1
+        assert self.task.get_from_database('Test_value') == 2
+
+        self.task.interface.iterable = '1.0'
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-iterable' in traceback
+
+    def test_check_npy_interface(self, tmpdir):
+        """Test checking a .npy file interface.
+
+        """
+        path = str(tmpdir.join('values.npy'))
+        self.root.write_in_database('default_path', str(tmpdir))
+        self.task.interface = NpyFileLoopInterface(
+            path='{default_path}/values.npy')
+
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-path' in traceback
+
+        with open(path, 'w') as f:
+            f.write('not an array')
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-path' in traceback
+
+        np.save(path, np.array([]))
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-path' in traceback
+
+        np.save(path, np.linspace(0, 1, 5))
+        test, traceback = self.task.check()
+        assert test
+        assert not traceback
+        assert self.task.get_from_database('Test_point_number') == 5
+        assert self.task.get_from_database('Test_value') == 0.0
+
+    def test_check_rate_interface(self):
+        """Test checking the fixed rate interface.
+
+        """
+        self.task.interface = FixedRateLoopInterface(points='5',
+                                                     period='0.1')
+        test, traceback = self.task.check()
+        assert test
+        assert self.root.get_from_database('Test_point_number') == 5
+        assert self.root.get_from_database('Test_value') == 0.0
+
+        self.task.interface.period = '-1'
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-period' in traceback
+
     def test_check_execution_order(self, iterable_interface):
         """Test that the interface checks are run before the children checks.
 
@@ -436,6 +520,195 @@ class TestLoopTask(object):
         self.task.perform()
         assert self.root.get_from_database('Test_value') == 2.0
 
+    def test_perform_streaming(self):
+        """Test performing a loop on a generator.
+
+        """
+        self.task.interface = StreamingLoopInterface(
+            iterable='(i for i in range(2, 7))')
+        self.task.task = CheckTask(name='check')
+        self.root.prepare()
+
+        self.task.perform()
+        assert self.root.get_from_database('Test_index') == 5
+        assert self.root.get_from_database('Test_point_number') == -1
+        assert self.task.task.perform_called == 5
+        assert self.task.task.perform_value == 6
+
+        self.task.interface.iterable = 'range(3)'
+        self.task.perform()
+        assert self.root.get_from_database('Test_point_number') == 3
+
+    def test_perform_npy(self, tmpdir):
+        """Test performing a loop on a memory-mapped .npy file.
+
+        """
+        path = str(tmpdir.join('values.npy'))
+        np.save(path, np.arange(6.0).reshape((3, 2)))
+        self.task.interface = NpyFileLoopInterface(path=path)
+        self.task.task = CheckTask(name='check')
+        self.root.prepare()
+
+        self.task.perform()
+        assert self.root.get_from_database('Test_point_number') == 3
+        np.testing.assert_array_equal(self.task.task.perform_value, [4., 5.])
+        loop_values = self.root.get_from_database('Test_loop_values')
+        assert isinstance(loop_values, np.ndarray)
+        assert not loop_values.flags.writeable
+        assert np.shares_memory(loop_values, self.task.task.perform_value)
+
+    def test_check_processes(self, iterable_interface):
+        """Test that tasks using instruments are not run in worker processes.
+
+        """
+        self.task.interface = iterable_interface
+        self.task.processes = 2
+        self.task.add_child_task(0, InstrumentTask(name='instr'))
+        test, traceback = self.task.check()
+        assert not test
+        assert 'root/Test-processes' in traceback
+
+    def test_perform_processes(self, iterable_interface):
+        """Test performing a loop in worker processes.
+
+        """
+        self.task.interface = iterable_interface
+        self.task.processes = 2
+        self.task.timing = True
+        formulas = OrderedDict([('square', '{Test_value}**2 + {offset}')])
+        self.task.add_child_task(0, FormulaTask(name='f', formulas=formulas))
+        self.root.database.set_value('root', 'offset', 1)
+        self.root.prepare()
+
+        written = []
+        self.root.database.observe('notifier', written.append)
+        self.task.perform()
+        squares = [v for p, v in written if p == 'root/Test/f_square']
+        assert squares == [i**2 + 1 for i in range(11)]
+        assert self.root.get_from_database('Test_index') == 11
+        assert self.root.get_from_database('Test_value') == 10
+        assert self.root.get_from_database('Test_elapsed_time') != 1.0
+
+    def test_perform_processes_reuse_workers(self, iterable_interface):
+        """Test that the worker processes are reused by later executions.
+
+        """
+        self.task.interface = iterable_interface
+        self.task.processes = 2
+        formulas = OrderedDict([('square', '{Test_value}**2 + {offset}')])
+        self.task.add_child_task(0, FormulaTask(name='f', formulas=formulas))
+        self.root.database.set_value('root', 'offset', 1)
+        self.root.prepare()
+
+        self.task.perform()
+        pools = self.root.resources['process_pools']
+        pool = pools['root/Test']
+
+        # The values of the entries read by the children are updated.
+        written = []
+        self.root.database.observe('notifier', written.append)
+        self.root.write_in_database('offset', 2)
+        self.task.perform()
+        assert pools['root/Test'] is pool
+        squares = [v for p, v in written if p == 'root/Test/f_square']
+        assert squares == [i**2 + 2 for i in range(11)]
+
+        self.root.release_resources()
+        assert not pools
+        with pytest.raises(ValueError):
+            pool.apply_async(abs, (1,))
+
+    def test_perform_processes_break(self, iterable_interface):
+        """Test breaking out of a loop performed in worker processes.
+
+        """
+        self.task.interface = iterable_interface
+        self.task.processes = 2
+        formulas = OrderedDict([('square', '{Test_value}**2')])
+        self.task.add_child_task(0, FormulaTask(name='f', formulas=formulas))
+        self.task.add_child_task(1, BreakTask(name='Break',
+                                              condition='{Test_index} == 6'))
+        self.root.prepare()
+
+        self.task.perform()
+        assert self.root.get_from_database('Test_index') == 6
+        assert self.root.get_from_database('Test_value') == 5
+        assert self.task.children[0].get_from_database('f_square') == 25
+        # The workers still running iterations were terminated.
+        assert not self.root.resources['process_pools']
+
+    def test_perform_processes_stop(self, iterable_interface):
+        """Test that a loop performed in worker processes honors stop.
+
+        """
+        self.task.interface = iterable_interface
+        self.task.processes = 2
+        self.task.add_child_task(0, CheckTask(name='check'))
+        self.root.prepare()
+        self.root.should_stop.set()
+
+        self.task.perform()
+        assert self.root.get_from_database('Test_index') == 1
+
+    def test_perform_rate(self):
+        """Test performing a loop at a fixed rate.
+
+        """
+        self.task.interface = FixedRateLoopInterface(points='5',
+                                                     period='0.05')
+        starts = []
+        values = []
+
+        def record(task, value):
+            starts.append(perf_counter())
+            values.append(task.get_from_database('Test_value'))
+            # Make the third iteration overrun the slot of the fourth.
+            if len(starts) == 3:
+                sleep(0.07)
+
+        self.task.add_child_task(0, CheckTask(name='check', custom=record))
+        self.root.prepare()
+
+        self.task.perform()
+        np.testing.assert_array_equal(
+            self.root.get_from_database('Test_loop_values'),
+            np.arange(5)*0.05)
+        assert self.root.get_from_database('Test_overruns') == 1
+        assert self.root.get_from_database('Test_skipped') == 1
+        assert self.root.get_from_database('Test_lag') == \
+            pytest.approx(0.02, abs=0.01)
+        # The missed slot is skipped and the iterations stay on the grid.
+        assert values == pytest.approx([0, 0.05, 0.1, 0.2])
+        for start, value in zip(starts, values):
+            assert start - starts[0] == pytest.approx(value, abs=0.01)
+
+    def test_perform_rate_pause(self):
+        """Test that pausing a loop performed at a fixed rate shifts the grid.
+
+        """
+        self.task.interface = FixedRateLoopInterface(points='5',
+                                                     period='0.05')
+        starts = []
+
+        def record(task, value):
+            starts.append(perf_counter())
+            # Pause during the third iteration.
+            if len(starts) == 3:
+                self.root.should_pause.set()
+                Timer(0.2, self.root.should_pause.clear).start()
+
+        self.task.add_child_task(0, CheckTask(name='check', custom=record))
+        self.root.prepare()
+        self.root.paused = Event()
+        self.root.resumed = Event()
+        self.root.thread_id = threading.current_thread().ident
+
+        self.task.perform()
+        assert len(starts) == 5
+        assert self.root.get_from_database('Test_overruns') == 0
+        assert starts[3] - starts[2] >= 0.2
+        assert starts[4] - starts[3] == pytest.approx(0.05, abs=0.01)
+
     def test_perform3(self, iterable_interface):
         """Test performing a simple loop no timing. Break.
 
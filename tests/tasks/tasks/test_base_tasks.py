@@ -10,8 +10,9 @@
 
 """
 import pytest
-from atom.api import Value, List
+from atom.api import Value, List, Str
 from exopy.tasks.tasks.base_tasks import RootTask, SimpleTask, ComplexTask
+from exopy.tasks.tasks.validators import Feval
 
 
 class SignalListener(object):
@@ -322,6 +323,27 @@ def test_traverse():
     assert flat == [root, task1, task3]
 
 
+def test_list_read_entries():
+    """Test listing the entries referenced by a task and its children.
+
+    """
+    class Reader(SimpleTask):
+        """Task declaring members to format and eval.
+
+        """
+        form = Str().tag(fmt=True)
+
+        feval = Str().tag(feval=Feval())
+
+    task1 = ComplexTask(name='task1')
+    task1.add_child_task(0, Reader(name='task2', form='{a}/{b}',
+                                   feval='2*{c}'))
+    task1.add_child_task(1, Reader(name='task3', form='{a}'))
+
+    assert task1.children[1].list_read_entries() == {'a'}
+    assert task1.list_read_entries() == {'a', 'b', 'c'}
+
+
 def test_access_exceptions():
     """Test adding, modifying and removing an access exception after creation.
 
@@ -245,6 +245,72 @@ def test_flattening_database():
     database.prepare_to_run()
 
 
+def test_exiting_running_mode():
+    """Check that the edition mode is restored after running.
+
+    """
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1)
+    database.create_node('root', 'node1')
+    database.set_value('root/node1', 'val2', 'a')
+
+    database.prepare_to_run()
+    database.set_volatile_entries([('root/node1', 'val2')])
+    database.set_value('root/node1', 'val2', 'b')
+
+    database.exit_running_mode()
+    assert not database.running
+    assert database.get_value('root/node1', 'val2') == 'a'
+    database.create_node('root', 'node2')
+    database.delete_value('root', 'val1')
+
+    database.prepare_to_run()
+    assert database.get_value('root/node1', 'val2') == 'a'
+    database.exit_running_mode()
+    database.exit_running_mode()
+    assert 'node2' in database.list_nodes()['root'].data
+
+
+def test_volatile_entries():
+    """Test declaring the entries which can change during execution.
+
+    """
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1)
+    database.create_node('root', 'node1')
+    database.set_value('root/node1', 'val2', 'a')
+    with raises(RuntimeError):
+        database.set_volatile_entries([])
+
+    database.prepare_to_run()
+    indexes = database.get_entries_indexes('root/node1', ['val1', 'val2'])
+    assert not database.are_constant(indexes.values())
+
+    database.set_volatile_entries([('root/node1', 'val2')])
+    assert database.are_constant([indexes['val1']])
+    assert not database.are_constant(indexes.values())
+
+
+def test_copy_accessible_values():
+    """Test copying the values accessible from a node in running mode.
+
+    """
+    database = TaskDatabase()
+    database.set_value('root', 'val1', 1)
+    database.set_value('root', 'val3', 3)
+    database.create_node('root', 'node1')
+    database.set_value('root/node1', 'val1', 'a')
+    database.create_node('root/node1', 'node2')
+    database.set_value('root/node1/node2', 'val2', 2)
+    database.create_node('root', 'node3')
+    database.set_value('root/node3', 'val4', 4)
+    database.add_access_exception('root', 'root/node3', 'val4')
+    database.prepare_to_run()
+
+    assert database.copy_accessible_values('root/node1') ==\
+        {'val1': 'a', 'val3': 3, 'val4': 4}
+
+
 def test_index_op_on_flat_database1():
     """Test operation on flat database relying on indexes.
 
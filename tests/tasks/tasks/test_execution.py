@@ -11,20 +11,45 @@
 """
 import gc
 import os
+from collections import OrderedDict
 import threading
 from multiprocessing import Event
 from time import sleep
 
+import numpy as np
 import pytest
 from atom.api import Str, set_default
 from enaml.application import deferred_call
 
 from exopy.tasks.tasks.base_tasks import RootTask, ComplexTask
 from exopy.tasks.tasks.validators import Feval, SkipEmpty
+from exopy.tasks.tasks.util.formula_task import FormulaTask
+from exopy.tasks.tasks.instr_task import InstrumentTask
 
 from exopy.testing.tasks.util import CheckTask, ExceptionTask
 
 
+class SafeCheckTask(CheckTask):
+    """CheckTask declaring that it can be run concurrently.
+
+    """
+    concurrency_safe = True
+
+
+class SafeInstrumentTask(InstrumentTask):
+    """InstrumentTask declaring that it can be run concurrently.
+
+    """
+    concurrency_safe = True
+
+
+class InheritingCheckTask(SafeCheckTask):
+    """Subclass of a concurrency safe task which did not declare itself so.
+
+    """
+    pass
+
+
 class TestTaskExecution(object):
     """Test the execution of a hierarchy of tasks.
 
@@ -141,6 +166,48 @@ class TestTaskExecution(object):
         assert 'root/test' in tb
 
     @pytest.mark.timeout(10)
+    def test_root_prepare_constant_entries(self):
+        """Test that the root identifies the constant entries when preparing.
+
+        """
+        root = self.root
+        aux = CheckTask(name='test', database_entries={'val': 1})
+        root.add_child_task(0, aux)
+        root.prepare()
+
+        database = root.database
+        indexes = database.get_entries_indexes('root', ['default_path',
+                                                        'meas_name',
+                                                        'test_val'])
+        assert database.are_constant([indexes['default_path'],
+                                      indexes['meas_name']])
+        assert not database.are_constant([indexes['test_val']])
+        assert aux.format_string('{meas_name}') == 'M'
+        assert aux._format_cache['{meas_name}'] == ('M', None)
+
+    def test_root_exit_running_state(self):
+        """Test that a root can be edited and run again after running.
+
+        """
+        root = self.root
+        aux = CheckTask(name='test', database_entries={'val': 1})
+        root.add_child_task(0, aux)
+        root.run_time = {'dummy': {}}
+        root.prepare()
+        assert aux.format_string('{meas_name}') == 'M'
+        root.release_resources()
+
+        root.exit_running_state()
+        assert not root.database.running
+        assert not aux._format_cache and not root.run_time
+        root.write_in_database('meas_name', 'N')
+        assert aux.format_string('{meas_name}') == 'N'
+        aux2 = CheckTask(name='test2')
+        root.add_child_task(1, aux2)
+
+        root.perform()
+        assert aux.perform_called == 1 and aux2.perform_called == 1
+
     def test_root_perform_empty(self):
         """Test running an empty RootTask.
 
@@ -216,6 +283,95 @@ class TestTaskExecution(object):
         assert not root.should_stop.is_set()
         assert aux.perform_called == 1
 
+    @pytest.mark.timeout(10)
+    def test_root_perform_auto_parallel(self):
+        """Test running concurrently the independent children of a task.
+
+        """
+        root = self.root
+        barrier = threading.Barrier(2, timeout=5)
+        task = ComplexTask(name='comp', auto_parallel=True)
+        a = SafeCheckTask(name='a', custom=lambda t, x: barrier.wait(),
+                          database_entries={'val': 1})
+        b = SafeCheckTask(name='b', custom=lambda t, x: barrier.wait())
+        form = FormulaTask(name='form',
+                           formulas=OrderedDict([('res', '{a_val}')]))
+        c = CheckTask(name='c', wait={'activated': True})
+        root.add_child_task(0, task)
+        for i, child in enumerate((a, b, form, c)):
+            task.add_child_task(i, child)
+
+        assert root.perform()
+        assert task._auto_batches == [[a, b], [form], [c]]
+        assert a.perform_called == b.perform_called == 1
+        assert form.get_from_database('form_res') == 1
+        assert c.perform_called == 1
+        assert root.active_threads_counter.count == 1
+
+    def test_auto_parallel_instruments(self):
+        """Test that tasks using the same instrument are not run concurrently.
+
+        """
+        task = ComplexTask(name='comp', auto_parallel=True)
+        tasks = [SafeInstrumentTask(name='i%d' % i,
+                                    selected_instrument=(p, 'd', 'c', 's'))
+                 for i, p in enumerate(('p1', 'p2', 'p1'))]
+        self.root.add_child_task(0, task)
+        for i, child in enumerate(tasks):
+            task.add_child_task(i, child)
+
+        assert task._build_auto_batches() == [tasks[:2], tasks[2:]]
+
+    def test_auto_parallel_unsafe_tasks(self):
+        """Test that tasks which may have side effects are run alone.
+
+        """
+        task = ComplexTask(name='comp', auto_parallel=True)
+        unsafe = ComplexTask(name='unsafe')
+        unsafe.add_child_task(0, CheckTask(name='d'))
+        safe = ComplexTask(name='safe')
+        safe.add_child_task(0, SafeCheckTask(name='e'))
+        children = [SafeCheckTask(name='a'), CheckTask(name='b'),
+                    SafeCheckTask(name='c'), unsafe, safe,
+                    SafeCheckTask(name='f')]
+        self.root.add_child_task(0, task)
+        for i, child in enumerate(children):
+            task.add_child_task(i, child)
+
+        a, b, c, unsafe, safe, f = children
+        assert task._build_auto_batches() == [[a], [b], [c], [unsafe],
+                                              [safe, f]]
+
+    def test_auto_parallel_safety_not_inherited(self):
+        """Test that subclasses of safe tasks have to declare it again.
+
+        """
+        task = ComplexTask(name='comp', auto_parallel=True)
+        children = [SafeCheckTask(name='a'), InheritingCheckTask(name='b'),
+                    SafeCheckTask(name='c'), SafeCheckTask(name='d')]
+        self.root.add_child_task(0, task)
+        for i, child in enumerate(children):
+            task.add_child_task(i, child)
+
+        a, b, c, d = children
+        assert task._build_auto_batches() == [[a], [b], [c, d]]
+
+    @pytest.mark.timeout(10)
+    def test_root_perform_auto_parallel_exc(self):
+        """Test that an exception raised in a worker thread stops the
+        measurement.
+
+        """
+        root = self.root
+        task = ComplexTask(name='comp', auto_parallel=True)
+        task.add_child_task(0, CheckTask(name='a'))
+        task.add_child_task(1, ExceptionTask(name='b'))
+        root.add_child_task(0, task)
+
+        assert not root.perform()
+        assert root.should_stop.is_set()
+        assert 'unhandled' in root.errors
+
     @pytest.mark.timeout(10)
     def test_root_perform_parallel(self):
         """Test running a simple task in parallel.
@@ -241,6 +397,48 @@ class TestTaskExecution(object):
         assert not root.should_stop.is_set()
         assert aux.perform_called == 1
 
+    @pytest.mark.timeout(30)
+    def test_root_perform_offloaded(self):
+        """Test running a task in a helper process.
+
+        """
+        root = self.root
+        root.write_in_database('x', np.arange(2.0**18))
+        heavy = FormulaTask(name='heavy',
+                            formulas=OrderedDict([('sum', 'np.sum({x})'),
+                                                  ('double', '2*{x}')]),
+                            parallel={'activated': True, 'pool': 'test',
+                                      'process': True})
+        root.add_child_task(0, heavy)
+        light = FormulaTask(name='light',
+                            formulas=OrderedDict([('res', '{heavy_sum}')]))
+        root.add_child_task(1, light)
+        root.perform()
+
+        assert not root.should_stop.is_set()
+        assert 'root/heavy' in root.resources['process_helpers']
+        assert root.get_from_database('light_res') == np.sum(np.arange(2**18))
+        np.testing.assert_array_equal(root.get_from_database('heavy_double'),
+                                      2*np.arange(2.0**18))
+        assert not root.resources['process_helpers']['root/heavy']\
+            ._process.is_alive()
+
+    @pytest.mark.timeout(30)
+    def test_root_perform_offloaded_exc(self):
+        """Test handling an exception occuring in a helper process.
+
+        """
+        root = self.root
+        task = FormulaTask(name='failing',
+                           formulas=OrderedDict([('res', '1/0')]),
+                           parallel={'activated': True, 'pool': 'test',
+                                     'process': True})
+        root.add_child_task(0, task)
+        root.perform()
+
+        assert root.should_stop.is_set()
+        assert 'ZeroDivisionError' in root.errors['unhandled']
+
     @pytest.mark.timeout(10)
     def test_root_perform_parallel_in_finalization(self):
         """Ensure that the ThreadResources release does not prevent to start
@@ -343,6 +541,54 @@ class TestTaskExecution(object):
         assert wait.perform_called == 1
         assert not root.resources['active_threads']['test']
 
+    @pytest.mark.timeout(10)
+    def test_root_perform_wait_auto(self):
+        """Test running a task waiting only on the tasks writing the entries it
+        reads.
+
+        Notes
+        -----
+        par and par2 run in their own pools and block. form reads an entry
+        written by par, so releasing par should allow form and aux to run
+        while par2 is still blocked.
+
+        """
+        root = self.root
+
+        event1 = threading.Event()
+        event2 = threading.Event()
+        event3 = threading.Event()
+
+        par = CheckTask(name='test', custom=lambda t, x: event1.wait(),
+                        database_entries={'val': 1})
+        par.parallel = {'activated': True, 'pool': 'test'}
+        par2 = CheckTask(name='test2', custom=lambda t, x: event2.wait(),
+                         database_entries={'val': 2})
+        par2.parallel = {'activated': True, 'pool': 'test2'}
+        form = FormulaTask(name='form',
+                           formulas=OrderedDict([('res', '{test_val}')]))
+        assert form.wait.get('auto')
+        aux = CheckTask(name='signal', custom=lambda t, x: event3.set())
+        root.add_child_task(0, par)
+        root.add_child_task(1, par2)
+        root.add_child_task(2, form)
+        root.add_child_task(3, aux)
+
+        t = threading.Thread(target=root.perform)
+        t.start()
+        sleep(0.5)
+        assert not event3.is_set()
+        event1.set()
+        assert event3.wait(5)
+        assert root.get_from_database('form_res') == 1
+        assert root.resources['active_threads']['test2']
+        event2.set()
+        t.join()
+
+        assert not root.should_stop.is_set()
+        assert par2.perform_called == 1
+        assert aux.perform_called == 1
+
     @pytest.mark.timeout(10)
     def test_root_perform_no_wait_single(self):
         """Test running a simple task waiting on a single pool.
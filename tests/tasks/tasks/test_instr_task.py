@@ -9,11 +9,19 @@
 """Test for the instrument task.
 
 """
-from atom.api import Str
+import gc
+from multiprocessing import Event
+from threading import Barrier
+
+import pytest
+from atom.api import Str, Bool, Value
 
 from exopy.tasks.tasks.base_tasks import RootTask
 from exopy.tasks.tasks.validators import Feval
-from exopy.tasks.tasks.instr_task import (InstrumentTask,
+from exopy.instruments.connection_pool import ConnectionPool
+from exopy.instruments.tracing import TracedDriver
+from exopy.tasks.tasks.instr_task import (InstrumentTask, INFOS_CHECKS,
+                                          InfosChecksCache,
                                           PROFILE_DEPENDENCY_ID,
                                           DRIVER_DEPENDENCY_ID)
 
@@ -36,6 +44,9 @@ class FalseStarter(object):
     def start(self, driver_cls, connection, settings):
         return object()
 
+    def reset(self, driver):
+        pass
+
     def stop(self, driver):
         FalseStarter.stop_called = True
 
@@ -54,6 +65,12 @@ class TestInstrumentTask(object):
         class InTask(InstrumentTask):
             feval = Str('1').tag(feval=Feval())
 
+            locked = Bool()
+
+            def perform(self):
+                instrs = self.root.resources['instrs']
+                self.locked = instrs._instr_locks['p']._is_owned()
+
         self.task = InTask(name='Dummy',
                            selected_instrument=('p', 'd', 'c', 's'))
         r.add_child_task(0, self.task)
@@ -141,6 +158,68 @@ class TestInstrumentTask(object):
         assert self.err_path in tb
         assert 'Message' in tb[self.err_path]
 
+    def test_instr_task_check_shared_tests(self, tmpdir):
+        """Test that identical connection tests are run once, concurrently
+        with the others and that successes are cached.
+
+        """
+        class CountingStarter(FalseStarter):
+
+            calls = []
+
+            barrier = Barrier(2, timeout=10)
+
+            def check_infos(self, driver_cls, connection, settings):
+                self.calls.append(connection)
+                self.barrier.wait()
+                return self.should_pass, 'Message'
+
+        root = self.task.root
+        root.default_path = str(tmpdir)
+        root.run_time[p_id]['p']['connections'] = {'c': {'a': 1},
+                                                   'c2': {'a': 2}}
+        starter = CountingStarter()
+        root.run_time[d_id]['d'] = (object, starter)
+        task_cls = type(self.task)
+        root.add_child_task(1, task_cls(name='Dummy2',
+                                        selected_instrument=('p', 'd', 'c',
+                                                             's')))
+        root.add_child_task(2, task_cls(name='Dummy3',
+                                        selected_instrument=('p', 'd', 'c2',
+                                                             's')))
+
+        INFOS_CHECKS.clear()
+        res, tb = root.check(test_instr=True)
+        assert res, tb
+        assert len(starter.calls) == 2
+        res, tb = self.task.check(test_instr=True)
+        assert res and len(starter.calls) == 2
+
+        # Failures are reported once and then forgotten.
+        INFOS_CHECKS.clear()
+        starter.should_pass = False
+        starter.barrier = Barrier(1)
+        assert not self.task.check(test_instr=True)[0]
+        assert not self.task.check(test_instr=True)[0]
+        assert len(starter.calls) == 5
+
+    def test_infos_checks_prefetch_per_root(self):
+        """Test that the tests are run in advance once per root task.
+
+        """
+        cache = InfosChecksCache()
+        root = RootTask()
+        assert cache.should_prefetch(root)
+        assert not cache.should_prefetch(root)
+        assert cache.should_prefetch(RootTask())
+
+        # A dead root is forgotten and cannot be confused with a new one.
+        del root
+        gc.collect()
+        new = RootTask()
+        assert cache.should_prefetch(new)
+        assert [r() for r in cache._prefetched] == [new]
+
     def test_instr_task_prepare(self):
         """Test preparing the task.
 
@@ -149,6 +228,146 @@ class TestInstrumentTask(object):
         assert self.task.driver
         assert self.task.perform_
 
+    def test_root_prepare_start_drivers_concurrently(self):
+        """Test that the root starts the drivers of distinct profiles
+        concurrently.
+
+        """
+        barrier = Barrier(2, timeout=10)
+
+        class BarrierStarter(FalseStarter):
+
+            def start(self, driver_cls, connection, settings):
+                barrier.wait()
+                return object()
+
+        root = self.task.root
+        root.run_time[d_id]['d'] = (object, BarrierStarter())
+        root.run_time[p_id]['p2'] = {'connections': {'c': {}}, 'settings': {}}
+        task2 = type(self.task)(name='Dummy2',
+                                selected_instrument=('p2', 'd', 'c', None))
+        root.add_child_task(1, task2)
+
+        root.prepare()
+        assert self.task.driver and task2.driver
+        assert self.task.driver is not task2.driver
+        assert not root.resources['instrs'].collecting
+
+    def test_root_prepare_overridden_prepare(self):
+        """Test that the driver is started in prepare when a subclass
+        overrides it.
+
+        """
+        class PrepTask(type(self.task)):
+
+            prepared_driver = Value()
+
+            def prepare(self):
+                super(PrepTask, self).prepare()
+                self.prepared_driver = self.driver
+
+        root = self.task.root
+        task2 = PrepTask(name='Dummy2',
+                         selected_instrument=('p', 'd', 'c2', 's'))
+        root.add_child_task(1, task2)
+
+        root.prepare()
+        assert task2.prepared_driver is not None
+        assert task2.prepared_driver is task2.driver
+
+    def test_root_prepare_start_drivers_failure(self):
+        """Test that the failure to start a driver is reported per instrument
+        before executing anything.
+
+        """
+        class FailingStarter(FalseStarter):
+
+            def start(self, driver_cls, connection, settings):
+                raise IOError('No instrument')
+
+        root = self.task.root
+        root.run_time[d_id]['d'] = (object, FailingStarter())
+        with pytest.raises(RuntimeError):
+            root.prepare()
+        assert 'No instrument' in root.errors['instrument-p']
+
+    def test_root_perform_start_drivers_failure(self):
+        """Test that the execution stops cleanly when a driver fails to start.
+
+        """
+        class FailingStarter(FalseStarter):
+
+            def start(self, driver_cls, connection, settings):
+                raise IOError('No instrument')
+
+        root = self.task.root
+        root.run_time[d_id]['d'] = (object, FailingStarter())
+        for event in ('should_pause', 'should_stop', 'paused', 'resumed'):
+            setattr(root, event, Event())
+
+        assert not root.perform()
+        assert 'No instrument' in root.errors['instrument-p']
+        assert 'unhandled' in root.errors
+        assert root.should_stop.is_set()
+
+    def test_root_prepare_trace_instruments(self, tmpdir):
+        """Test that the drivers are traced when requested and that the trace
+        is dumped.
+
+        """
+        class Driver(object):
+
+            def query(self):
+                return 'ok'
+
+        class DriverStarter(FalseStarter):
+
+            def start(self, driver_cls, connection, settings):
+                return Driver()
+
+        root = self.task.root
+        root.run_time[d_id]['d'] = (Driver, DriverStarter())
+        root.should_trace_instruments = True
+        root.default_path = str(tmpdir)
+        root.database_entries = {'default_path': '', 'meas_name': 'M',
+                                 'meas_id': '001'}
+        root.prepare()
+        instrs = root.resources['instrs']
+        assert isinstance(self.task.driver, TracedDriver)
+        assert not isinstance(instrs[self.task.selected_instrument][0],
+                              TracedDriver)
+
+        assert self.task.driver.query() == 'ok'
+        assert instrs.tracer.summary()['p']['count'] == 1
+
+        root._dump_instruments_trace(instrs.tracer)
+        assert tmpdir.join('M_001.instr_trace.csv').check()
+
+    def test_instr_task_cached_query(self):
+        """Test querying through the instrument cache.
+
+        """
+        values = iter(range(10))
+        assert self.task.cached_query('idn', lambda: next(values)) == 0
+        assert self.task.cached_query('idn', lambda: next(values)) == 0
+        self.task.invalidate_cache(['idn'])
+        assert self.task.cached_query('idn', lambda: next(values)) == 1
+        self.task.invalidate_cache()
+        assert self.task.cached_query('idn', lambda: next(values)) == 2
+        instrs = self.task.root.resources['instrs']
+        assert instrs.get_cache_stats() == {'p': (1, 3)}
+
+    def test_instr_task_perform_locked(self):
+        """Test that the instrument is locked while performing.
+
+        """
+        instrs = self.task.root.resources['instrs']
+        self.task.stoppable = False
+        self.task.prepare()
+        self.task.perform_()
+        assert self.task.locked
+        assert instrs.get_wait_times()['p'][1] == 1
+
     def test_instr_task_start_driver1(self):
         """Test starting a driver.
 
@@ -176,6 +395,41 @@ class TestInstrumentTask(object):
         self.task.start_driver()
         assert self.task.driver
 
+    def test_instr_task_start_driver_pooled(self):
+        """Test reusing a driver kept open since a previous measurement.
+
+        """
+        pool = ConnectionPool()
+        instrs = self.task.root.resources['instrs']
+        instrs.pool = pool
+        self.task.start_driver()
+        d = self.task.driver
+
+        instrs.release()
+        assert pool.profiles == ['p']
+
+        del instrs[self.task.selected_instrument]
+        self.task.start_driver()
+        assert self.task.driver is d
+        assert not pool.profiles
+
+    def test_instr_task_start_driver_pooled_edited_profile(self):
+        """Test that a pooled driver is not reused once its profile changed.
+
+        """
+        pool = ConnectionPool()
+        instrs = self.task.root.resources['instrs']
+        instrs.pool = pool
+        self.task.start_driver()
+        d = self.task.driver
+        instrs.release()
+        del instrs[self.task.selected_instrument]
+
+        self.task.root.run_time[p_id]['p']['connections']['c'] = {'a': 2}
+        self.task.start_driver()
+        assert self.task.driver is not d
+        assert not pool.profiles
+
     def test_instr_task_test_driver(self):
         """Test getting a temporary access to a driver.
 
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the tools used to perform tasks in other processes.
+
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pytest
+
+from exopy.tasks.tasks.base_tasks import RootTask, ComplexTask
+from exopy.tasks.tasks.offloading import (collect_build_dependencies,
+                                          share_arrays, unshare_arrays,
+                                          build_worker_root,
+                                          SHARED_MEMORY_THRESHOLD,
+                                          SharedMemory)
+from exopy.tasks.tasks.logic.loop_task import LoopTask
+from exopy.tasks.tasks.logic.loop_iterable_interface\
+    import IterableLoopInterface
+from exopy.tasks.tasks.util.formula_task import FormulaTask
+
+
+def test_collect_build_dependencies():
+    """Test collecting the classes of tasks and interfaces.
+
+    """
+    loop = LoopTask(name='loop', interface=IterableLoopInterface())
+    loop.add_child_task(0, ComplexTask(name='complex'))
+    deps = collect_build_dependencies(loop.traverse())
+    assert deps['exopy.task'] == {'exopy.LoopTask': LoopTask,
+                                  'exopy.ComplexTask': ComplexTask}
+    assert deps['exopy.tasks.interface'] ==\
+        {'exopy.LoopTask:exopy.IterableLoopInterface': IterableLoopInterface}
+
+
+@pytest.mark.skipif(SharedMemory is None, reason='Requires Python 3.8')
+def test_sharing_arrays():
+    """Test transferring large arrays through shared memory.
+
+    """
+    large = np.arange(SHARED_MEMORY_THRESHOLD // 8, dtype=float)
+    shared = share_arrays({'large': large, 'small': np.ones(2), 'a': 1})
+    assert not isinstance(shared['large'], np.ndarray)
+    assert isinstance(shared['small'], np.ndarray)
+
+    unshared = unshare_arrays(shared)
+    np.testing.assert_array_equal(unshared['large'], large)
+    assert unshared['a'] == 1
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(shared['large'].name)
+
+
+def test_build_worker_root():
+    """Test rebuilding tasks under a worker root.
+
+    """
+    task = FormulaTask(name='f', formulas=OrderedDict([('res', '2*{a}')]))
+    RootTask().add_child_task(0, task)
+    task.update_preferences_from_members()
+    root = build_worker_root([task.preferences.dict()],
+                             collect_build_dependencies([task]),
+                             {'a': 1, 'b': 2}, ['a'], None, None)
+    assert root.database.running
+    root.children[0].perform()
+    assert root.get_from_database('f_res') == 2
+
+    # Input entries are never considered constant.
+    root.database.set_value('root', 'a', 2)
+    root.children[0].perform()
+    assert root.get_from_database('f_res') == 4
@@ -12,7 +12,11 @@ Given how messy it is to properly test thread-safety I don't try and just
 check that in single thread things work.
 
 """
-from exopy.tasks.tasks.shared_resources import SharedCounter, SharedDict
+from threading import Thread, Event, current_thread
+from time import sleep
+
+from exopy.tasks.tasks.shared_resources import (SharedCounter, SharedDict,
+                                                InstrsResource)
 
 
 def test_shared_counter():
@@ -51,3 +55,113 @@ def test_shared_dict():
 
     for i in sdict:
         pass
+
+
+def test_instrs_lock():
+    """Test serializing the accesses to an instrument.
+
+    """
+    instrs = InstrsResource()
+    acquired = Event()
+    release = Event()
+
+    def hold():
+        with instrs.lock('p'):
+            acquired.set()
+            release.wait()
+
+    thread = Thread(target=hold)
+    thread.start()
+    acquired.wait()
+
+    # Another instrument is not blocked and the lock is re-entrant.
+    with instrs.lock('p2'):
+        with instrs.lock('p2'):
+            pass
+
+    waiter = Thread(target=hold)
+    acquired.clear()
+    waiter.start()
+    assert not acquired.wait(0.05)
+    release.set()
+    thread.join()
+    waiter.join()
+
+    times = instrs.get_wait_times()
+    assert times['p'][1] == 2 and times['p'][0] > 0.04
+    assert times['p2'][1] == 2
+
+    instrs.release()
+    assert not instrs.get_wait_times()
+
+
+def test_instrs_start_deferred():
+    """Test starting the deferred drivers, profile by profile.
+
+    """
+    class FakeTask(object):
+
+        def __init__(self, profile, started, fail=False):
+            self.selected_instrument = (profile, 'd', 'c', 's')
+            self.started = started
+            self.fail = fail
+
+        def start_driver(self):
+            if self.fail:
+                raise ValueError('Failed')
+            self.started.append((self, current_thread().ident))
+
+    instrs = InstrsResource()
+    assert instrs.start_deferred() == {}
+
+    started = []
+    tasks = [FakeTask('p', started), FakeTask('p2', started),
+             FakeTask('p', started), FakeTask('p3', started, True)]
+    with instrs.collect_starts():
+        assert instrs.collecting
+        for t in tasks:
+            instrs.defer_start(t)
+    assert not instrs.collecting
+
+    errors = instrs.start_deferred()
+    assert list(errors) == ['p3'] and 'Failed' in errors['p3']
+    assert len(started) == 3
+    # Tasks sharing a profile are started in order.
+    p_tasks = [t for t, _ in started if t.selected_instrument[0] == 'p']
+    assert p_tasks == [tasks[0], tasks[2]]
+    assert not instrs.start_deferred()
+
+
+def test_instrs_query_cache():
+    """Test caching queries, invalidating them and their expiry.
+
+    """
+    instrs = InstrsResource()
+    calls = []
+
+    def query():
+        calls.append(1)
+        return len(calls)
+
+    assert instrs.cached_query('p', 'range', query) == 1
+    assert instrs.cached_query('p', 'range', query) == 1
+    assert instrs.cached_query('p2', 'range', query) == 2
+    assert instrs.get_cache_stats() == {'p': (1, 1), 'p2': (0, 1)}
+
+    instrs.invalidate('p', ['range'])
+    assert instrs.cached_query('p', 'range', query) == 3
+    instrs.invalidate('p')
+    instrs.invalidate('unknown')
+    assert instrs.cached_query('p', 'range', query) == 4
+
+    assert instrs.cached_query('p', 'idn', query, ttl=1e-6) == 5
+    sleep(0.01)
+    assert instrs.cached_query('p', 'idn', query) == 6
+
+    # Reset (on resume) discards the values but not the statistics.
+    instrs.reset()
+    assert instrs.cached_query('p2', 'range', query) == 7
+    assert instrs.get_cache_stats()['p2'] == (0, 2)
+
+    instrs.release()
+    assert not instrs.get_cache_stats()
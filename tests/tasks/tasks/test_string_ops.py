@@ -142,6 +142,23 @@ class TestFormatting(object):
         assert self.root._format_cache
         assert test in self.root._format_cache
 
+    def test_formatting_constant_entries(self):
+        """Test that strings depending only on constant entries are formatted
+        once.
+
+        """
+        database = self.root.database
+        database.prepare_to_run()
+        database.set_volatile_entries([('root', 'val1')])
+        test = 'progress is {val2}'
+        assert self.root.format_string(test) == 'progress is 10.0'
+        assert self.root._format_cache[test] == ('progress is 10.0', None)
+
+        test = 'progress is {val1}/{val2}'
+        assert self.root.format_string(test) == 'progress is 1/10.0'
+        database.set_value('root', 'val1', 2)
+        assert self.root.format_string(test) == 'progress is 2/10.0'
+
 
 class TestEvaluation(object):
     """Test evaluating strings and caching in running mode.
@@ -253,3 +270,19 @@ class TestEvaluation(object):
         test = 'np.abs({val1})[{val2}]'
         formatted = self.root.format_and_eval_string(test)
         assert formatted == 2.0
+
+    def test_eval_constant_entries(self):
+        """Test that evaluation results are never cached even when depending
+        only on constant entries.
+
+        """
+        database = self.root.database
+        database.prepare_to_run()
+        database.set_volatile_entries([('root', 'val1')])
+        test = '2*{val2}'
+        assert self.root.format_and_eval_string(test) == 20.0
+        assert self.root._eval_cache[test][1] is not None
+
+        test = 'np.random.normal(0, {val2})'
+        values = {self.root.format_and_eval_string(test) for i in range(5)}
+        assert len(values) > 1
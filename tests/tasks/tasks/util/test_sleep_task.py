@@ -10,6 +10,7 @@
 
 """
 import gc
+from time import perf_counter
 
 import pytest
 import enaml
@@ -83,6 +84,18 @@ class TestSleepTask(object):
         self.task.perform()
         assert self.task.get_from_database('Test_time') == 6.0
 
+    def test_perform_stopped(self):
+        """Test that the sleep is interrupted when the measurement is stopped.
+
+        """
+        self.task.time = '10'
+        self.root.prepare()
+        self.root.should_stop.set()
+
+        tic = perf_counter()
+        self.task.perform()
+        assert perf_counter() - tic < 1
+
 
 @pytest.mark.ui
 def test_view(exopy_qtbot):
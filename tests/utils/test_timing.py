@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright 2015-2018 by Exopy Authors, see AUTHORS for more details.
+#
+# Distributed under the terms of the BSD license.
+#
+# The full license is in the file LICENCE, distributed with this software.
+# -----------------------------------------------------------------------------
+"""Test the accurate sleeping functions.
+
+"""
+from threading import Event
+from time import perf_counter
+
+from exopy.utils.timing import sleep_until, precise_sleep
+
+
+def test_sleep_until():
+    """Test sleeping till a deadline.
+
+    """
+    deadline = perf_counter() + 0.01
+    assert sleep_until(deadline) == 0.0
+    assert perf_counter() >= deadline
+
+    assert sleep_until(perf_counter() - 1) >= 1
+
+
+def test_sleep_until_interrupted():
+    """Test that a set stop event interrupts the sleep.
+
+    """
+    stop = Event()
+    stop.set()
+    tic = perf_counter()
+    assert sleep_until(tic + 10, stop) == 0.0
+    assert perf_counter() - tic < 1
+
+
+def test_precise_sleep():
+    """Test sleeping for a given duration.
+
+    """
+    tic = perf_counter()
+    precise_sleep(0.005)
+    assert perf_counter() - tic >= 0.005